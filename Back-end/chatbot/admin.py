@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Chat, Message, UserSummary, AIModelConfig
+from .models import Chat, Message, UserSummary, AIModelConfig, Document, EmbeddingVersion
 
 
 @admin.register(Chat)
@@ -58,3 +58,20 @@ class AIModelConfigAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(Document)
+class DocumentAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'user', 'language', 'status', 'progress', 'chunk_count', 'created_at')
+    list_filter = ('status', 'file_type', 'language', 'created_at')
+    search_fields = ('name', 'user__username', 'user__email')
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(EmbeddingVersion)
+class EmbeddingVersionAdmin(admin.ModelAdmin):
+    list_display = ('model_name', 'status', 'coverage', 'backfilled', 'collection_key', 'activated_at', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('model_name',)
+    readonly_fields = ('collection_key', 'backfill_cursor', 'backfilled', 'coverage', 'lease_owner',
+                       'lease_until', 'created_at', 'updated_at', 'activated_at')
@@ -3,11 +3,14 @@ AI Service Integration Layer (LangChain ≥1.1)
 Integrates Groq (via LangChain), LLaMA, and Chroma vector DB for RAG.
 """
 
-import os
 import time
 import logging
-from typing import Dict, List, Optional, Tuple
+import threading
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from asgiref.sync import sync_to_async
 from dotenv import load_dotenv
+from django.conf import settings
+from django.db import DatabaseError
 
 # Core LangChain imports
 from langchain_core.documents import Document
@@ -15,53 +18,239 @@ from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.runnables import RunnableWithMessageHistory
 from langchain_core.chat_history import InMemoryChatMessageHistory
 from langchain_core.runnables import RunnableLambda
-# Vector stores and embeddings
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
 
 # Chat model (Groq)
-from langchain_groq import ChatGroq
-
-# Chroma client
-from chromadb import Client
-from chromadb.config import Settings
 
 # Models
 from .models import AIModelConfig
+from .documents import chunk_text
+from .embeddings import build_embeddings
+from .ingestion import IngestionQueue, PendingDocument, write_pending_documents
+from .embedding_versions import DualWriteStore, build_version_store, current_versions
+from .retrieval_gate import retrieval_gate
+from .llm_clients import chat_clients, chat_model
+from .lexical_index import LexicalIndex, LexicalIndexedStore, reciprocal_rank_fusion
+from .vector_stores import (
+    build_vector_store, collection_config, hydrate_documents, partition_filter, payload_text,
+    search_with_relevance, store_config,
+)
 
 logger = logging.getLogger(__name__)
 load_dotenv()
 
 
 # ======================================================
-# 🔹 Embeddings
+# 🔹 Lazy RAG resources
 # ======================================================
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2")
+DEFAULT_MODEL_NAME = "llama-3.3-70b-versatile"
+SUMMARY_MODEL_NAME = "llama-3.3-70b-versatile"
+# (model, temperature, max_tokens) of the chat clients every request path uses
+CHAT_CLIENT_KEYS = [(DEFAULT_MODEL_NAME, 0.7, 2000), (SUMMARY_MODEL_NAME, 0.5, 1000)]
+
+
+def chat_client_keys() -> List[Tuple[str, float, Optional[int]]]:
+    """Default client keys plus those of the active ``AIModelConfig`` rows."""
+    keys = list(CHAT_CLIENT_KEYS)
+    try:
+        for config in AIModelConfig.objects.filter(is_active=True):
+            keys.append((config.name, config.temperature, config.max_tokens))
+            keys.append((config.name, 0.7, 2000))  # preferred_model in generate_response
+    except DatabaseError as e:
+        logger.warning(f"⚠️ AI model configs unavailable ({e}); warming default clients only")
+    return keys
+
+
+class RAGResources:
+    """
+    Thread-safe holder for the embeddings, vector store, lexical index,
+    retriever, default chat model and ingestion queue.
+
+    Nothing heavy is imported or built until the first access, so processes
+    that never touch RAG (migrations, management commands, tests) boot at
+    plain Django cost. Call ``warmup()`` to build everything eagerly.
+
+    Embeddings and the vector store follow the active ``EmbeddingVersion``;
+    during a migration the store dual-writes into the new version. The
+    versions are re-read every ``EMBEDDING_VERSION_CHECK_SECONDS`` and a
+    cutover rebuilds both.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._embeddings = None
+        self._vector_store = None
+        self._lexical_index = None
+        self._retriever = None
+        self._model = None
+        self._ingestion = None
+        self._versions = None
+        self._versions_checked = 0.0
+
+    def _get(self, attr: str, builder):
+        value = getattr(self, attr)
+        if value is None:
+            with self._lock:
+                value = getattr(self, attr)
+                if value is None:
+                    value = builder()
+                    setattr(self, attr, value)
+        return value
+
+    def _load_versions(self):
+        if self._versions is None:
+            try:
+                self._versions = current_versions()
+            except DatabaseError as e:
+                # Migrations not applied yet: use the configured model and the original collection
+                logger.warning(f"⚠️ Embedding versions unavailable ({e}); using {settings.EMBEDDING_MODEL_NAME}")
+                return None
+            self._versions_checked = time.monotonic()
+        return self._versions
+
+    @property
+    def embedding_model(self) -> str:
+        """Model the current embeddings encode with."""
+        versions = self._versions
+        return versions[0].model_name if versions else settings.EMBEDDING_MODEL_NAME
+
+    def _build_embeddings(self):
+        self._load_versions()
+        return build_embeddings(self.embedding_model)
+
+    def _build_vector_store(self):
+        return self.build_store(self.embeddings)
+
+    def build_store(self, embeddings):
+        """
+        The store ``vector_store`` is (active version, dual-write during a
+        migration, lexical index) over ``embeddings``; None when only
+        precomputed vectors are written, as by ``reindex_messages --workers``.
+        """
+        versions = self._load_versions()
+        if versions is None:
+            store = build_vector_store(embeddings)
+        else:
+            active, migrating = versions
+            store = build_vector_store(embeddings, version_key=active.collection_key)
+            if migrating is not None:
+                logger.info(f"🔀 Dual-writing to {migrating.model_name} ({migrating.coverage:.1%} backfilled)")
+                store = DualWriteStore(store, build_version_store(migrating))
+        if settings.RAG_RETRIEVAL_MODE != "dense":
+            # The lexical index does not depend on the embedding model
+            store = LexicalIndexedStore(store, self.lexical_index)
+        return store
+
+    def _build_lexical_index(self):
+        return LexicalIndex(settings.RAG_LEXICAL_INDEX_PATH)
+
+    def _check_versions(self) -> None:
+        """Rebuild embeddings and store when the active or migrating version changed."""
+        if self._versions is None:
+            return
+        interval = settings.EMBEDDING_VERSION_CHECK_SECONDS
+        if time.monotonic() - self._versions_checked < interval:
+            return
+        self._versions_checked = time.monotonic()
+        try:
+            versions = current_versions()
+        except DatabaseError as e:
+            logger.warning(f"⚠️ Could not check embedding versions: {e}")
+            return
+        def keys(pair):
+            return tuple(version.pk if version else None for version in pair)
+
+        with self._lock:
+            if self._versions is None or keys(versions) == keys(self._versions):
+                return
+            logger.info(f"🔀 Embedding versions changed; active model is now {versions[0].model_name}")
+            self._versions = versions
+            self._embeddings = None
+            self._vector_store = None
+            self._retriever = None
+
+    def _build_retriever(self):
+        config = store_config(self.vector_store)
+        return self.vector_store.as_retriever(
+            search_type="similarity_score_threshold",
+            search_kwargs={"k": config.top_k, "score_threshold": config.score_threshold},
+        )
 
-# ======================================================
-# 🔹 Initialize Chroma Vector DB
-# ======================================================
-CHROMA_DIR = "./chroma_db"
-client = Client(Settings(anonymized_telemetry=False))
-
-vector_store = Chroma(
-    client=client,
-    collection_name="ai_memory",
-    persist_directory=CHROMA_DIR,
-    embedding_function=embeddings
-)
+    def _build_model(self):
+        return chat_model(DEFAULT_MODEL_NAME, temperature=0.7, max_tokens=2000)
+
+    def _build_ingestion(self):
+        return IngestionQueue(
+            write=lambda items: write_pending_documents(self.vector_store, items, model=self.embedding_model),
+            batch_size=settings.RAG_INGEST_BATCH_SIZE,
+            max_age_ms=settings.RAG_INGEST_MAX_AGE_MS,
+            max_pending=settings.RAG_INGEST_MAX_PENDING,
+            put_timeout=settings.RAG_INGEST_PUT_TIMEOUT,
+            synchronous=settings.RAG_INGEST_MODE == "sync",
+        )
 
-retriever = vector_store.as_retriever(search_kwargs={"k": 3})
+    @property
+    def embeddings(self):
+        self._check_versions()
+        return self._get("_embeddings", self._build_embeddings)
+
+    @property
+    def vector_store(self):
+        self._check_versions()
+        return self._get("_vector_store", self._build_vector_store)
+
+    @property
+    def lexical_index(self) -> LexicalIndex:
+        return self._get("_lexical_index", self._build_lexical_index)
+
+    @property
+    def retriever(self):
+        return self._get("_retriever", self._build_retriever)
+
+    @property
+    def model(self):
+        return self._get("_model", self._build_model)
+
+    @property
+    def ingestion(self) -> IngestionQueue:
+        return self._get("_ingestion", self._build_ingestion)
+
+    def warmup(self) -> float:
+        """Build every resource now and return the elapsed time in seconds."""
+        start = time.time()
+        self.embeddings
+        self.vector_store
+        self.retriever
+        self.model
+        chat_clients.warmup(chat_client_keys())
+        elapsed = round(time.time() - start, 2)
+        logger.info(f"🔥 RAG resources warmed up in {elapsed}s")
+        return elapsed
+
+    def reset(self) -> None:
+        """Drop every built resource so the next access rebuilds it."""
+        with self._lock:
+            if self._ingestion is not None:
+                self._ingestion.close()
+            self._ingestion = None
+            self._embeddings = None
+            self._vector_store = None
+            self._lexical_index = None
+            self._retriever = None
+            self._model = None
+            self._versions = None
+
+
+resources = RAGResources()
+
+_LAZY_ATTRIBUTES = ("embeddings", "vector_store", "lexical_index", "retriever", "model")
+
+
+def __getattr__(name: str):
+    # Keep ``ai_service.vector_store`` & co. working without import-time cost.
+    if name in _LAZY_ATTRIBUTES:
+        return getattr(resources, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# ======================================================
-# 🔹 Chat Model (Groq)
-# ======================================================
-model = ChatGroq(
-    model="llama-3.3-70b-versatile",
-    api_key=os.getenv("GROQ_API_KEY"),
-    temperature=0.7,
-    max_tokens=2000,
-)
 
 # ======================================================
 # 🔹 Conversational Memory (new v1.x API)
@@ -120,11 +309,10 @@ class LangChainProvider(BaseAIProvider):
     """Groq AI provider (LangChain v1.x compatible)"""
 
     def __init__(self, config: Optional[AIModelConfig] = None):
-        model_name = config.name if config else "llama-3.3-70b-versatile"
-        self.model = ChatGroq(
-            model=model_name,
-            api_key=os.getenv("GROQ_API_KEY")
-        )
+        if config is None:
+            self.model = chat_model(DEFAULT_MODEL_NAME)
+        else:
+            self.model = chat_model(config.name, config.temperature, config.max_tokens)
 
     def generate_response(self, messages: List[Dict], language="en"):
         text_input = "\n".join(f"{m['role'].capitalize()}: {m['content']}" for m in messages)
@@ -134,17 +322,274 @@ class LangChainProvider(BaseAIProvider):
         return response.content, len(response.content.split()), elapsed
 
 
+# ======================================================
+# 🔹 Document metadata
+# ======================================================
+RETRIEVAL_SCOPES = ("user", "chat", "global")
+RETRIEVAL_MODES = ("dense", "lexical_first", "hybrid")
+# Message roles written to the vector store (see views.send_message)
+INDEXED_ROLES = ("user", "assistant")
+
+
+def message_document_id(message_id: int, chunk: int = 0) -> str:
+    # The first chunk keeps the plain id, so existence checks need no chunk count
+    return f"message-{message_id}" if chunk == 0 else f"message-{message_id}-{chunk}"
+
+
+def message_metadata(message) -> Dict:
+    """Partition metadata stored with every vector ingested from a Message."""
+    return {
+        "user_id": message.chat.user_id,
+        "chat_id": message.chat_id,
+        "message_id": message.id,
+        "role": message.role,
+        "language": message.language,
+        "created_at": message.created_at.timestamp(),
+    }
+
+
+def message_chunks(message) -> List[Document]:
+    """
+    Split a message into overlapping chunks of at most ``CHUNK_SIZE``
+    characters (the embedding model truncates longer input), each tagged
+    with the message metadata plus its ``chunk`` index, character ``offset``
+    and ``length`` (enough to hydrate it from the database).
+    """
+    metadata = message_metadata(message)
+    return [
+        Document(
+            page_content=text,
+            metadata={**metadata, "chunk": index, "offset": offset, "length": len(text)},
+            id=message_document_id(message.id, index),
+        )
+        for index, (offset, text) in enumerate(
+            chunk_text([message.content], settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+        )
+    ]
+
+
 # ======================================================
 # 🔹 AIService (central RAG logic)
 # ======================================================
 class AIService:
 
     @staticmethod
-    def add_document(text: str) -> None:
-        """Store text in Chroma vector DB."""
-        doc = Document(page_content=text)
-        vector_store.add_documents([doc])
-        logger.info(f"✅ Added document: {text[:60]}...")
+    def embed_query(text: str) -> List[float]:
+        """
+        Embed a user message once so the vector can be passed to both
+        ``generate_response`` (search) and ``add_document`` (upsert).
+        """
+        try:
+            return resources.embeddings.embed_query(text)
+        except Exception as e:
+            logger.error(f"❌ Embedding error: {e}")
+            raise AIServiceException(str(e))
+
+    @staticmethod
+    async def aembed_query(text: str) -> List[float]:
+        """``embed_query`` in a worker thread, off the event loop."""
+        return await sync_to_async(AIService.embed_query)(text)
+
+    @staticmethod
+    def add_document(
+        text: str,
+        metadata: Optional[Dict] = None,
+        doc_id: Optional[str] = None,
+        embedding: Optional[List[float]] = None,
+    ) -> None:
+        """Queue text (tagged with partition metadata) for batched storage in the Chroma vector DB."""
+        doc = Document(page_content=text, metadata=metadata or {}, id=doc_id)
+        resources.ingestion.submit(PendingDocument(doc, embedding, resources.embedding_model if embedding else None))
+        logger.info(f"✅ Queued document: {text[:60]}...")
+
+    @staticmethod
+    def index_message(message, embedding: Optional[List[float]] = None) -> None:
+        """
+        Queue every chunk of ``message`` for the vector store as one group,
+        so the chunks are embedded in a single batch. ``embedding`` (the
+        vector of the full text) is reused when the message is one chunk.
+        """
+        chunks = message_chunks(message)
+        if len(chunks) == 1 and embedding is not None:
+            items = [PendingDocument(chunks[0], embedding, resources.embedding_model)]
+        else:
+            items = [PendingDocument(chunk) for chunk in chunks]
+        resources.ingestion.submit_many(items)
+        logger.info(f"✅ Queued {len(items)} chunk(s) of message {message.id}")
+
+    @staticmethod
+    async def aindex_message(message, embedding: Optional[List[float]] = None) -> None:
+        """``index_message`` in a worker thread (queueing can block when the queue is full)."""
+        await sync_to_async(AIService.index_message)(message, embedding=embedding)
+
+    @staticmethod
+    def retrieve(
+        query: str,
+        user_id: Optional[int] = None,
+        chat_id: Optional[int] = None,
+        language: Optional[str] = None,
+        scope: str = "user",
+        k: Optional[int] = None,
+        embedding: Optional[List[float]] = None,
+    ) -> List[Document]:
+        """
+        Search the vector store within the caller's partition.
+
+        ``scope`` is ``user`` (the user's messages and documents in
+        ``language``, plus shared documents), ``chat``
+        (only ``chat_id``) or ``global`` (everything). Without a user there
+        is no partition to search, so nothing is returned unless the scope is
+        ``global``. Pass ``embedding`` to reuse an already computed query vector.
+        ``k`` defaults to the collection's ``top_k``; hits below its
+        ``score_threshold`` relevance are dropped.
+
+        ``RAG_RETRIEVAL_MODE`` chooses the search: ``dense`` (vectors),
+        ``lexical_first`` (BM25 hits scoring at least ``RAG_LEXICAL_MIN_SCORE``,
+        vectors only when there are none) or ``hybrid`` (both, fused by rank).
+        """
+        if scope not in RETRIEVAL_SCOPES:
+            raise ValueError(f"Unknown retrieval scope '{scope}'. Use one of {RETRIEVAL_SCOPES}.")
+        mode = settings.RAG_RETRIEVAL_MODE
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown RAG_RETRIEVAL_MODE '{mode}'. Use one of {RETRIEVAL_MODES}.")
+        if scope == "global":
+            where = partition_filter(language=language)
+        elif user_id is None:
+            return []
+        else:
+            where = partition_filter(
+                user_id=user_id,
+                chat_id=chat_id if scope == "chat" else None,
+                language=language,
+                include_shared=scope == "user",
+            )
+        store = resources.vector_store
+        config = store_config(store)
+        k = k or config.top_k
+        lexical = []
+        if mode != "dense":
+            lexical = [hit.document() for hit in resources.lexical_index.search(query, k=k, where=where)
+                       if mode == "hybrid" or hit.score >= settings.RAG_LEXICAL_MIN_SCORE]
+            if mode == "lexical_first" and lexical:
+                return hydrate_documents(lexical)
+
+        if embedding is None:
+            embedding = store.embeddings.embed_query(query)
+        pairs = search_with_relevance(store, embedding, k=k, filter=where)
+        docs = [doc for doc, relevance in pairs if relevance >= config.score_threshold]
+        if mode == "hybrid":
+            docs = reciprocal_rank_fusion([docs, lexical], k)
+        return hydrate_documents(docs)
+
+    @staticmethod
+    def _context(
+        user_message: str,
+        language: str,
+        user_id: Optional[int],
+        chat_id: Optional[int],
+        scope: str,
+        query_embedding: Optional[List[float]],
+    ) -> str:
+        """Retrieved context for ``user_message`` (empty when the gate skips retrieval)."""
+        # 2️⃣ Retrieve context from the caller's partition of the vector store,
+        #    unless the gate says the chat history is enough
+        decision = retrieval_gate.check(user_message, query_embedding, resources.embedding_model)
+        docs = []
+        if decision.retrieve:
+            docs = AIService.retrieve(
+                user_message,
+                user_id=user_id,
+                chat_id=chat_id,
+                language=language,
+                scope=scope,
+                embedding=query_embedding,
+            )
+        else:
+            logger.debug(f"🚦 Skipped retrieval ({decision.reason})")
+        retrieval_gate.record(decision, hits=len(docs))
+        if isinstance(docs, list):
+            context_text = "\n".join([d.page_content for d in docs])
+        else:
+            context_text = str(docs)
+
+        print("\n📚 --- Context used for this query ---")
+        print(context_text[:500] + ("..." if len(context_text) > 500 else ""))
+        return context_text
+
+    @staticmethod
+    def _chain(model_name: str, context_text: str):
+        """RAG + memory chain answering with ``context_text``."""
+        # 1️⃣ Initialize model
+        model = chat_model(model_name, temperature=0.7, max_tokens=2000)
+
+        # 3️⃣ Define prompt expecting context, question, language
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", "You are a helpful assistant. Use the given context and chat history to respond clearly."),
+            ("human", "Context:\n{context}\n\nQuestion: {question}\nAnswer in {language}:")
+        ])
+
+        # 4️⃣ Define a subchain that adds context before the prompt
+        def enrich_input(x):
+            """Add the retrieved context to inputs before passing to the prompt."""
+            return {
+                "context": context_text,  # inject context here
+                "question": x["question"],
+                "language": x["language"]
+            }
+
+        enriched_chain = RunnableLambda(enrich_input) | prompt | model
+
+        # 5️⃣ Add memory
+        return RunnableWithMessageHistory(
+            enriched_chain,
+            get_session_history,
+            input_messages_key="question",
+            history_messages_key="chat_history",
+        )
+
+    @staticmethod
+    def _conversation(
+        messages: List[Dict],
+        language: str,
+        preferred_model: Optional[str],
+        user_id: Optional[int],
+        chat_id: Optional[int],
+        scope: str,
+        query_embedding: Optional[List[float]],
+    ):
+        """Build the RAG + memory chain for the last message; return it with its inputs and model name."""
+        user_message = messages[-1]["content"]
+        model_name = preferred_model or DEFAULT_MODEL_NAME
+        context_text = AIService._context(user_message, language, user_id, chat_id, scope, query_embedding)
+        inputs = {
+            "question": user_message,
+            "language": language,
+        }
+        return AIService._chain(model_name, context_text), inputs, model_name
+
+    @staticmethod
+    async def _aconversation(
+        messages: List[Dict],
+        language: str,
+        preferred_model: Optional[str],
+        user_id: Optional[int],
+        chat_id: Optional[int],
+        scope: str,
+        query_embedding: Optional[List[float]],
+    ):
+        """``_conversation`` for async callers: retrieval runs in a worker thread."""
+        user_message = messages[-1]["content"]
+        model_name = preferred_model or DEFAULT_MODEL_NAME
+        context_text = await sync_to_async(AIService._context)(
+            user_message, language, user_id, chat_id, scope, query_embedding
+        )
+        inputs = {
+            "question": user_message,
+            "language": language,
+        }
+        # The client registry reads AIModelConfig rows, which needs a sync context
+        conversation = await sync_to_async(AIService._chain)(model_name, context_text)
+        return conversation, inputs, model_name
 
     @staticmethod
     def generate_response(
@@ -152,61 +597,18 @@ class AIService:
         language: str = "en",
         session_id: str = "default",
         preferred_model: Optional[str] = None,
+        user_id: Optional[int] = None,
+        chat_id: Optional[int] = None,
+        scope: str = "user",
+        query_embedding: Optional[List[float]] = None,
     ):
-        """Generate response using Groq + Chroma RAG + memory."""
+        """Generate response using Groq + Chroma RAG (scoped to the caller's partition) + memory."""
         try:
-            user_message = messages[-1]["content"]
-            model_name = preferred_model or "llama-3.3-70b-versatile"
-
-            # 1️⃣ Initialize model
-            model = ChatGroq(
-                model=model_name,
-                api_key=os.getenv("GROQ_API_KEY"),
-                temperature=0.7,
-                max_tokens=2000,
-            )
-
-            # 2️⃣ Retrieve context from vector store
-            docs = retriever.invoke(user_message)
-            if isinstance(docs, list):
-                context_text = "\n".join([d.page_content for d in docs])
-            else:
-                context_text = str(docs)
-
-            print("\n📚 --- Context used for this query ---")
-            print(context_text[:500] + ("..." if len(context_text) > 500 else ""))
-
-            # 3️⃣ Define prompt expecting context, question, language
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", "You are a helpful assistant. Use the given context and chat history to respond clearly."),
-                ("human", "Context:\n{context}\n\nQuestion: {question}\nAnswer in {language}:")
-            ])
-
-            # 4️⃣ Define a subchain that adds context before the prompt
-            def enrich_input(x):
-                """Add the retrieved context to inputs before passing to the prompt."""
-                return {
-                    "context": context_text,  # inject context here
-                    "question": x["question"],
-                    "language": x["language"]
-                }
-
-            enriched_chain = RunnableLambda(enrich_input) | prompt | model
-
-            # 5️⃣ Add memory
-            conversation = RunnableWithMessageHistory(
-                enriched_chain,
-                get_session_history,
-                input_messages_key="question",
-                history_messages_key="chat_history",
+            conversation, inputs, model_name = AIService._conversation(
+                messages, language, preferred_model, user_id, chat_id, scope, query_embedding
             )
 
             # 6️⃣ Invoke chain
-            inputs = {
-                "question": user_message,
-                "language": language,
-            }
-            
             print("\n⚙️ Running RAG + Memory pipeline...")
             start = time.time()
             response = conversation.invoke(
@@ -225,30 +627,117 @@ class AIService:
         except Exception as e:
             logger.error(f"❌ AIService error: {e}")
             raise AIServiceException(str(e))
-    
+
     @staticmethod
-    def generate_user_summary(user_messages: list, language: str = "en") -> str:
+    def stream_response(
+        messages: List[Dict],
+        language: str = "en",
+        session_id: str = "default",
+        preferred_model: Optional[str] = None,
+        user_id: Optional[int] = None,
+        chat_id: Optional[int] = None,
+        scope: str = "user",
+        query_embedding: Optional[List[float]] = None,
+    ) -> Iterator[str]:
         """
-        Generate a user summary from their message history.
-        
-        Args:
-            user_messages: List of user message texts
-            language: Language for the summary ('en' or 'ar')
-        
-        Returns:
-            JSON string with structure:
-            {
-                "summary": "User summary text",
-                "topics": ["topic1", "topic2"],
-                "Common queries": ["query1", "query2"]
-            }
+        Streaming ``generate_response``: yield the answer's text as the
+        model produces it. Retrieval runs on the first ``next()``; errors
+        raise ``AIServiceException`` from the iteration. The chat memory
+        is updated once the stream is exhausted.
         """
         try:
-            # Combine messages into context
-            messages_context = "\n".join(user_messages[:50])  # Limit to last 50 messages
-            
-            # Create prompt for summary generation
-            prompt = f"""Based on the following user messages, generate a comprehensive summary in {language}.
+            conversation, inputs, model_name = AIService._conversation(
+                messages, language, preferred_model, user_id, chat_id, scope, query_embedding
+            )
+            start = time.time()
+            first_token = None
+            for chunk in conversation.stream(inputs, config={"configurable": {"session_id": session_id}}):
+                text = getattr(chunk, "content", chunk)
+                if not text:
+                    continue
+                if first_token is None:
+                    first_token = round(time.time() - start, 2)
+                yield text
+        except Exception as e:
+            logger.error(f"❌ AIService stream error: {e}")
+            raise AIServiceException(str(e))
+        logger.info(
+            f"🧠 AI streamed response in {round(time.time() - start, 2)}s "
+            f"(first token after {first_token}s) using {model_name}"
+        )
+
+    @staticmethod
+    async def agenerate_response(
+        messages: List[Dict],
+        language: str = "en",
+        session_id: str = "default",
+        preferred_model: Optional[str] = None,
+        user_id: Optional[int] = None,
+        chat_id: Optional[int] = None,
+        scope: str = "user",
+        query_embedding: Optional[List[float]] = None,
+    ):
+        """
+        ``generate_response`` for ASGI views: the model call is awaited on
+        the shared async HTTP pool, so no thread waits on the API.
+        """
+        try:
+            conversation, inputs, model_name = await AIService._aconversation(
+                messages, language, preferred_model, user_id, chat_id, scope, query_embedding
+            )
+            start = time.time()
+            response = await conversation.ainvoke(
+                inputs,
+                config={"configurable": {"session_id": session_id}},
+            )
+            elapsed = round(time.time() - start, 2)
+            content = getattr(response, "content", str(response))
+            logger.info(f"🧠 AI generated response in {elapsed}s using {model_name}")
+            return content, model_name, len(content.split()), elapsed
+        except Exception as e:
+            logger.error(f"❌ AIService error: {e}")
+            raise AIServiceException(str(e))
+
+    @staticmethod
+    async def astream_response(
+        messages: List[Dict],
+        language: str = "en",
+        session_id: str = "default",
+        preferred_model: Optional[str] = None,
+        user_id: Optional[int] = None,
+        chat_id: Optional[int] = None,
+        scope: str = "user",
+        query_embedding: Optional[List[float]] = None,
+    ) -> AsyncIterator[str]:
+        """Async ``stream_response``."""
+        try:
+            conversation, inputs, model_name = await AIService._aconversation(
+                messages, language, preferred_model, user_id, chat_id, scope, query_embedding
+            )
+            start = time.time()
+            first_token = None
+            async for chunk in conversation.astream(inputs, config={"configurable": {"session_id": session_id}}):
+                text = getattr(chunk, "content", chunk)
+                if not text:
+                    continue
+                if first_token is None:
+                    first_token = round(time.time() - start, 2)
+                yield text
+        except Exception as e:
+            logger.error(f"❌ AIService stream error: {e}")
+            raise AIServiceException(str(e))
+        logger.info(
+            f"🧠 AI streamed response in {round(time.time() - start, 2)}s "
+            f"(first token after {first_token}s) using {model_name}"
+        )
+
+    @staticmethod
+    def _summary_prompt(user_messages: list, language: str) -> str:
+        # Combine messages into context
+        messages_context = "\n".join(user_messages[:50])  # Limit to last 50 messages
+        
+        # Create prompt for summary generation
+        return f"""Based on the following user messages, generate a comprehensive summary in {language}.
             
 User Messages:
 {messages_context}
@@ -265,13 +754,28 @@ Respond ONLY with valid JSON in this exact format:
     "Common queries": ["query1", "query2", ...]
 }}"""
 
+    @staticmethod
+    def generate_user_summary(user_messages: list, language: str = "en") -> str:
+        """
+        Generate a user summary from their message history.
+        
+        Args:
+            user_messages: List of user message texts
+            language: Language for the summary ('en' or 'ar')
+        
+        Returns:
+            JSON string with structure:
+            {
+                "summary": "User summary text",
+                "topics": ["topic1", "topic2"],
+                "Common queries": ["query1", "query2"]
+            }
+        """
+        try:
+            prompt = AIService._summary_prompt(user_messages, language)
+
             # Use the AI model to generate summary
-            model = ChatGroq(
-                model="llama-3.3-70b-versatile",
-                api_key=os.getenv("GROQ_API_KEY"),
-                temperature=0.5,  # Lower temperature for more consistent output
-                max_tokens=1000,
-            )
+            model = chat_model(SUMMARY_MODEL_NAME, temperature=0.5, max_tokens=1000)  # lower temperature for consistent JSON
             
             response = model.invoke(prompt)
             content = getattr(response, "content", str(response))
@@ -281,4 +785,17 @@ Respond ONLY with valid JSON in this exact format:
             
         except Exception as e:
             logger.error(f"❌ Error generating user summary: {e}")
-            raise AIServiceException(str(e))
\ No newline at end of file
+            raise AIServiceException(str(e))
+
+    @staticmethod
+    async def agenerate_user_summary(user_messages: list, language: str = "en") -> str:
+        """Async ``generate_user_summary``."""
+        try:
+            model = await sync_to_async(chat_model)(SUMMARY_MODEL_NAME, temperature=0.5, max_tokens=1000)
+            response = await model.ainvoke(AIService._summary_prompt(user_messages, language))
+            content = getattr(response, "content", str(response))
+            logger.info(f"✅ Generated user summary for {len(user_messages)} messages")
+            return content
+        except Exception as e:
+            logger.error(f"❌ Error generating user summary: {e}")
+            raise AIServiceException(str(e))
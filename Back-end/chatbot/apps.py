@@ -4,3 +4,25 @@ from django.apps import AppConfig
 class ChatbotConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'chatbot'
+
+    def ready(self):
+        # Pooled chat clients are rebuilt when their model config changes
+        from django.db.models.signals import post_delete, post_save
+        from .llm_clients import config_changed
+        from .models import AIModelConfig
+        post_save.connect(config_changed, sender=AIModelConfig, dispatch_uid='llm_clients_config_saved')
+        post_delete.connect(config_changed, sender=AIModelConfig, dispatch_uid='llm_clients_config_deleted')
+
+        # Warmup and the periodic jobs belong to processes serving requests, not to
+        # migrate, other management commands, tests or the autoreloader's parent
+        from .background import is_server_process, start_background_jobs, start_warmup
+        if not is_server_process():
+            return
+
+        # Optional model warmup, in the background: it queries the database, which
+        # app initialisation must not do
+        start_warmup()
+
+        # Periodic maintenance, reconcile and embedding backfill, each run by one
+        # process at a time
+        start_background_jobs()
@@ -0,0 +1,337 @@
+"""
+Async (ASGI-native) chat views
+
+DRF views are synchronous: under ASGI each one runs in a worker thread that
+stays blocked for the whole model call. These views are native coroutines
+with the same request and response bodies as their DRF counterparts. They
+use the async ORM and await the model on the shared async HTTP pool, so a
+generation in flight holds no thread and one process serves many at once.
+
+Endpoints (JWT ``Authorization: Bearer`` header only):
+- POST /api/async/chats/{id}/send_message/ - like /api/chats/{id}/send_message/
+- POST /api/async/chats/{id}/stream_message/ - like /api/chats/{id}/stream_message/
+- POST /api/async/summaries/generate/ - like /api/summaries/generate/
+
+Served by the WSGI server too: Django runs each view on a new event loop,
+and the chat clients pool their async connections per loop. Only an ASGI
+server (see the README's uvicorn profile) runs them without a thread per
+request.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .ai_service import AIService, AIServiceException
+from .models import Chat, Message, UserSummary
+from .renderers import sse_event
+from .serializers import MessageCreateSerializer, MessageSerializer, UserSummarySerializer
+
+logger = logging.getLogger(__name__)
+
+# Model every chat turn is answered with (as in ChatViewSet.send_message)
+CHAT_MODEL_NAME = "llama-3.3-70b-versatile"
+
+
+# ======================================================
+# 🔹 Request handling
+# ======================================================
+def _request_data(request) -> dict:
+    if request.content_type == "application/json":
+        try:
+            return json.loads(request.body or b"{}")
+        except ValueError:
+            return {}
+    return request.POST.dict()
+
+
+def async_api_view(view):
+    """
+    Authenticate the JWT like DRF's ``JWTAuthentication`` and reply 401 in
+    DRF's format when it is missing or invalid. Header tokens are not sent
+    by browsers on their own, so CSRF protection is not needed.
+    """
+    @csrf_exempt
+    @require_POST
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            result = await sync_to_async(JWTAuthentication().authenticate)(request)
+        except AuthenticationFailed as e:
+            detail = e.detail if isinstance(e.detail, dict) else {"detail": e.detail}
+            return JsonResponse(detail, status=status.HTTP_401_UNAUTHORIZED)
+        if result is None:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        request.user = result[0]
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+# ======================================================
+# 🔹 Chat turns
+# ======================================================
+async def _start_turn(chat, content, language):
+    """Async ``ChatViewSet._start_turn``."""
+    user_message = await Message.objects.acreate(chat=chat, role='user', content=content, language=language)
+    history = [msg async for msg in Message.objects.filter(chat=chat, status=Message.STATUS_COMPLETE)
+               .order_by('-created_at')[:10]]
+    messages_for_ai = [{"role": msg.role, "content": msg.content} for msg in reversed(history)]
+    query_embedding = None
+    if settings.RAG_RETRIEVAL_MODE != 'lexical_first':
+        query_embedding = await AIService.aembed_query(content)
+    return user_message, messages_for_ai, query_embedding
+
+
+async def _finish_turn(chat, user_message, query_embedding, response_text,
+                       ai_model, language, tokens_used, response_time):
+    """
+    Async ``ChatViewSet._finish_turn``. Callers run it as a task behind
+    ``asyncio.shield`` and await that task when they are cancelled: once
+    the last token arrived the reply is complete, and a cancel between
+    saving and indexing it must not record it a second time as aborted.
+    """
+    await AIService.aindex_message(user_message, embedding=query_embedding)
+    ai_message = await Message.objects.acreate(
+        chat=chat,
+        role='assistant',
+        content=response_text,
+        ai_model=ai_model,
+        language=language,
+        tokens_used=tokens_used,
+        response_time=response_time,
+    )
+    await AIService.aindex_message(ai_message)
+    if not chat.title:
+        content = user_message.content
+        chat.title = content[:50] + ('...' if len(content) > 50 else '')
+        await chat.asave()
+    return ai_message
+
+
+async def _abort_turn(chat, user_message, query_embedding, partial_text, ai_model, language, response_time):
+    """Async ``ChatViewSet._abort_turn``."""
+    await AIService.aindex_message(user_message, embedding=query_embedding)
+    ai_message = await Message.objects.acreate(
+        chat=chat,
+        role='assistant',
+        content=partial_text,
+        ai_model=ai_model,
+        language=language,
+        tokens_used=len(partial_text.split()),
+        response_time=response_time,
+        status=Message.STATUS_ABORTED,
+    )
+    logger.info(f"🛑 Client left chat {chat.id}; saved {len(partial_text)} characters as aborted")
+    return ai_message
+
+
+async def _chat_turn_request(request, pk):
+    """The caller's chat and validated message fields, or an error response."""
+    try:
+        chat = await Chat.objects.aget(pk=pk, user=request.user)
+    except Chat.DoesNotExist:
+        return None, JsonResponse({"detail": "No Chat matches the given query."}, status=status.HTTP_404_NOT_FOUND)
+    serializer = MessageCreateSerializer(data=_request_data(request))
+    if not serializer.is_valid():
+        return None, JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+    return (chat, data['content'], data.get('language', chat.language), data.get('ai_model')), None
+
+
+@async_api_view
+async def send_message(request, pk):
+    """
+    Async ``ChatViewSet.send_message``. The answer is streamed from the
+    model and collected, so that when the client disconnects (Django then
+    cancels the view) the text generated so far is saved as ``aborted``.
+    """
+    turn, error = await _chat_turn_request(request, pk)
+    if error:
+        return error
+    chat, content, language, preferred_model = turn
+
+    user_message = finish = None
+    parts = []
+    start = time.time()
+    try:
+        user_message, messages_for_ai, query_embedding = await _start_turn(chat, content, language)
+        start = time.time()
+        async for text in AIService.astream_response(
+            messages=messages_for_ai,
+            language=language,
+            preferred_model=CHAT_MODEL_NAME,
+            user_id=request.user.id,
+            chat_id=chat.id,
+            query_embedding=query_embedding,
+        ):
+            parts.append(text)
+        response_text = ''.join(parts)
+        finish = asyncio.ensure_future(_finish_turn(
+            chat, user_message, query_embedding, response_text,
+            preferred_model, language, len(response_text.split()), round(time.time() - start, 2),
+        ))
+        ai_message = await asyncio.shield(finish)
+        return JsonResponse({
+            'user_message': MessageSerializer(user_message).data,
+            'ai_message': MessageSerializer(ai_message).data,
+            'model_used': CHAT_MODEL_NAME,
+        }, status=status.HTTP_201_CREATED)
+
+    except asyncio.CancelledError:
+        if finish is not None:
+            await finish
+        elif user_message is not None:
+            await _abort_turn(chat, user_message, query_embedding, ''.join(parts),
+                              preferred_model, language, round(time.time() - start, 2))
+        raise
+    except AIServiceException as e:
+        logger.error(f"AI service error: {str(e)}")
+        return JsonResponse({'error': f'AI service error: {str(e)}'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return JsonResponse({'error': 'An unexpected error occurred'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@async_api_view
+async def stream_message(request, pk):
+    """
+    Async ``ChatViewSet.stream_message``. An async iterator is streamed
+    as it is produced under ASGI, where a sync one would be buffered whole.
+    """
+    turn, error = await _chat_turn_request(request, pk)
+    if error:
+        return error
+    chat, content, language, preferred_model = turn
+
+    async def events():
+        user_message = stream = finish = None
+        parts = []
+        start = time.time()
+        try:
+            user_message, messages_for_ai, query_embedding = await _start_turn(chat, content, language)
+            yield sse_event('user_message', MessageSerializer(user_message).data)
+
+            start = time.time()
+            first_token_time = None
+            stream = AIService.astream_response(
+                messages=messages_for_ai,
+                language=language,
+                preferred_model=CHAT_MODEL_NAME,
+                user_id=request.user.id,
+                chat_id=chat.id,
+                query_embedding=query_embedding,
+            )
+            async for text in stream:
+                if first_token_time is None:
+                    first_token_time = round(time.time() - start, 2)
+                parts.append(text)
+                yield sse_event('token', {'text': text})
+
+            response_text = ''.join(parts)
+            finish = asyncio.ensure_future(_finish_turn(
+                chat, user_message, query_embedding, response_text,
+                preferred_model, language, len(response_text.split()), round(time.time() - start, 2),
+            ))
+            ai_message = await asyncio.shield(finish)
+            yield sse_event('done', {
+                'ai_message': MessageSerializer(ai_message).data,
+                'model_used': CHAT_MODEL_NAME,
+                'first_token_time': first_token_time,
+            })
+        except (asyncio.CancelledError, GeneratorExit):
+            # Django cancels the response when the client disconnects
+            if finish is not None:
+                await finish
+            elif stream is not None:
+                await stream.aclose()
+                await _abort_turn(chat, user_message, query_embedding, ''.join(parts),
+                                  preferred_model, language, round(time.time() - start, 2))
+            raise
+        except AIServiceException as e:
+            logger.error(f"AI service error: {str(e)}")
+            yield sse_event('error', {'error': f'AI service error: {str(e)}'})
+        except Exception as e:
+            logger.error(f"Unexpected error: {str(e)}")
+            yield sse_event('error', {'error': 'An unexpected error occurred'})
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# ======================================================
+# 🔹 User summaries
+# ======================================================
+@async_api_view
+async def generate_summary(request):
+    """Async ``UserSummaryViewSet.generate``."""
+    user = request.user
+    language = _request_data(request).get("language", getattr(user, "language_preference", "en"))
+
+    if language not in ["en", "ar"]:
+        return JsonResponse({"error": 'Invalid language. Must be "en" or "ar".'}, status=status.HTTP_400_BAD_REQUEST)
+
+    message_texts = [
+        content async for content in Message.objects.filter(
+            chat__user=user, role="user", language=language,
+        ).order_by("-created_at").values_list("content", flat=True)[:100]
+    ]
+    if not message_texts:
+        return JsonResponse({"error": "No messages found to generate summary."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        summary_text = await AIService.agenerate_user_summary(user_messages=message_texts, language=language)
+        json_string = re.sub(r"```(json)?", "", summary_text).strip()
+        summary_data = json.loads(json_string)
+
+        summary, created = await UserSummary.objects.aupdate_or_create(
+            user=user,
+            language=language,
+            defaults={
+                "summary_text": summary_data.get("summary", ""),
+                "topics": summary_data.get("topics", []),
+                "common_queries": summary_data.get("Common queries", []),
+                "chat_count": await Chat.objects.filter(user=user).acount(),
+                "message_count": len(message_texts),
+                "ai_model_used": "openai",  # could be dynamic
+            },
+        )
+        # ``user_username`` may load the user row
+        data = await sync_to_async(lambda: UserSummarySerializer(summary).data)()
+        return JsonResponse(
+            {
+                "message": "Summary generated successfully",
+                "summary": data,
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+    except AIServiceException as e:
+        logger.error(f"AI service error: {str(e)}")
+        return JsonResponse({"error": f"Failed to generate summary: {str(e)}"},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse AI response: {str(e)}")
+        return JsonResponse({"error": "AI response could not be parsed."},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    except Exception as e:
+        logger.error(f"Unexpected error generating summary: {str(e)}")
+        return JsonResponse({"error": "An unexpected error occurred."},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
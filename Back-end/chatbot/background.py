@@ -0,0 +1,165 @@
+"""
+Background work of server processes.
+
+Warming up models and the periodic vector store jobs (maintenance,
+reconcile, embedding backfill) only belong in processes that serve
+requests, not in ``migrate``, other management commands, the test runner
+or the autoreloader's parent. Each periodic job runs under a database
+lease, so however many web workers start its timer, one process at a
+time runs it. ``run_rag_maintenance`` runs the jobs in a dedicated
+process instead.
+"""
+
+import os
+import sys
+import time
+import socket
+import logging
+import threading
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_server_process = False
+
+
+def mark_server_process() -> None:
+    """Called by ``wsgi.py`` and ``asgi.py`` before Django is set up."""
+    global _server_process
+    _server_process = True
+
+
+def is_server_process() -> bool:
+    """Whether this process serves requests."""
+    if _server_process:
+        return True
+    # ``runserver`` sets up Django twice: the autoreloader's parent only
+    # watches files, its child (RUN_MAIN) serves
+    if sys.argv[1:2] == ["runserver"]:
+        return os.environ.get("RUN_MAIN") == "true" or "--noreload" in sys.argv
+    return False
+
+
+def process_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# ======================================================
+# 🔹 Leases
+# ======================================================
+def claim_lease(name: str, seconds: float, owner: Optional[str] = None) -> bool:
+    """Take or renew the lease on job ``name`` for ``seconds``; False while another process holds it."""
+    from django.db import IntegrityError, transaction
+    from django.db.models import Q
+    from django.utils import timezone
+    from .models import JobLease
+
+    owner = owner or process_id()
+    now = timezone.now()
+    until = now + timedelta(seconds=seconds)
+    if JobLease.objects.filter(name=name).filter(
+        Q(owner=owner) | Q(lease_until__lt=now) | Q(lease_until=None)
+    ).update(owner=owner, lease_until=until):
+        return True
+    try:
+        with transaction.atomic():
+            JobLease.objects.create(name=name, owner=owner, lease_until=until)
+    except IntegrityError:
+        return False
+    return True
+
+
+# ======================================================
+# 🔹 Warmup
+# ======================================================
+def warmup() -> None:
+    """Build the models enabled by ``RAG_WARMUP_ON_BOOT`` / ``LLM_WARMUP_ON_BOOT``."""
+    from django.conf import settings
+
+    # RAG resources are lazy by default; web workers can opt into eager loading
+    # (which also warms the chat clients)
+    if settings.RAG_WARMUP_ON_BOOT:
+        from .ai_service import resources
+        resources.warmup()
+    elif settings.LLM_WARMUP_ON_BOOT:
+        from .ai_service import chat_client_keys
+        from .llm_clients import chat_clients
+        chat_clients.warmup(chat_client_keys())
+
+
+def start_warmup() -> Optional[threading.Thread]:
+    """
+    Run ``warmup`` in a daemon thread, off app initialisation (it reads
+    ``EmbeddingVersion`` and ``AIModelConfig``). Requests arriving first
+    build what they need themselves; without the tables (not migrated yet)
+    the warmup is skipped.
+    """
+    from django.conf import settings
+    from django.db import DatabaseError, connection
+
+    if not (settings.RAG_WARMUP_ON_BOOT or settings.LLM_WARMUP_ON_BOOT):
+        return None
+
+    def run():
+        try:
+            warmup()
+        except DatabaseError as e:
+            logger.warning(f"⚠️ Skipped warmup, database not ready ({e}); run `manage.py migrate`")
+        except Exception as e:
+            logger.error(f"❌ Warmup failed: {e}")
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=run, name="rag-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+# ======================================================
+# 🔹 Periodic jobs
+# ======================================================
+def start_periodic(name: str, interval_seconds: float, job: Callable[[], None]) -> threading.Thread:
+    """
+    Call ``job()`` every ``interval_seconds`` in a daemon thread, whenever
+    this process holds the ``name`` lease. The holder renews it before
+    every run, and another process takes over once it lapses.
+    """
+    from django.db import connection
+
+    lease_seconds = 2 * interval_seconds + 60
+
+    def loop():
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                if claim_lease(name, lease_seconds):
+                    job()
+            except Exception as e:
+                logger.error(f"❌ Background job {name} failed: {e}")
+            finally:
+                connection.close()
+
+    thread = threading.Thread(target=loop, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+def start_background_jobs() -> Dict[str, threading.Thread]:
+    """Start the periodic jobs enabled in settings; return their threads by name."""
+    from django.conf import settings
+
+    threads = {}
+    # Dedup/TTL/quota maintenance of the vector store
+    if settings.RAG_MAINTENANCE_INTERVAL_HOURS:
+        from .maintenance import start_periodic_maintenance
+        threads["maintenance"] = start_periodic_maintenance(settings.RAG_MAINTENANCE_INTERVAL_HOURS)
+    # Repair of missing and orphaned message vectors
+    if settings.RAG_RECONCILE_INTERVAL_MINUTES:
+        from .reconcile import start_periodic_reconcile
+        threads["reconcile"] = start_periodic_reconcile(settings.RAG_RECONCILE_INTERVAL_MINUTES)
+    # Re-embedding of history while an embedding model migration is pending
+    if settings.RAG_BACKFILL_INTERVAL_SECONDS:
+        from .embedding_versions import start_background_backfill
+        threads["backfill"] = start_background_backfill(settings.RAG_BACKFILL_INTERVAL_SECONDS)
+    return threads
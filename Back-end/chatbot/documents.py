@@ -0,0 +1,347 @@
+"""
+Streaming document ingestion for the RAG vector store.
+
+A document is split into bounded segments (byte ranges of a text file,
+page ranges of a PDF) that are parsed in a process pool. Their text is fed
+through an overlapping chunker and embedded and upserted in batches, so
+memory depends on the segment and batch sizes, never on the file size.
+
+PDF and DOCX support need the ``pypdf`` and ``python-docx`` packages;
+uploads of a type whose parser is not installed are refused.
+"""
+
+import os
+import time
+import logging
+import threading
+from importlib.util import find_spec
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+TEXT_SEGMENT_BYTES = 1024 * 1024
+PDF_PAGES_PER_SEGMENT = 10
+# File type → (module its parser imports, package providing it)
+PARSER_PACKAGES = {".pdf": ("pypdf", "pypdf"), ".docx": ("docx", "python-docx")}
+
+
+class DocumentParseError(Exception):
+    """Raised when a document cannot be read"""
+    pass
+
+
+@dataclass(frozen=True)
+class Segment:
+    """A bounded piece of a document that one worker parses."""
+    path: str
+    file_type: str
+    start: int
+    end: int
+
+
+# ======================================================
+# 🔹 Parsing (runs in worker processes)
+# ======================================================
+def _require(module: str, package: str):
+    try:
+        return __import__(module)
+    except ImportError:
+        raise DocumentParseError(f"Reading this file type requires {package}: pip install {package}")
+
+
+def missing_parser(file_type: str) -> Optional[str]:
+    """Package to install before ``file_type`` files can be parsed, or None."""
+    module, package = PARSER_PACKAGES.get(file_type, (None, None))
+    if module is None or find_spec(module) is not None:
+        return None
+    return package
+
+
+def _read_text_range(path: str, start: int, end: int) -> str:
+    # Align both ends to UTF-8 character boundaries so adjacent segments
+    # concatenate to exactly the original text
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start + 3)
+    head = 0
+    if start > 0:
+        while head < min(3, len(data)) and (data[head] & 0xC0) == 0x80:
+            head += 1
+    tail = end - start
+    while tail < len(data) and (data[tail] & 0xC0) == 0x80:
+        tail += 1
+    return data[head:tail].decode("utf-8", errors="replace")
+
+
+def parse_segment(segment: Segment) -> str:
+    """Return the text of one segment."""
+    if segment.file_type == ".txt":
+        return _read_text_range(segment.path, segment.start, segment.end)
+    if segment.file_type == ".pdf":
+        pypdf = _require("pypdf", "pypdf")
+        reader = pypdf.PdfReader(segment.path)
+        pages = reader.pages[segment.start:segment.end]
+        return "\n".join(page.extract_text() or "" for page in pages) + "\n"
+    if segment.file_type == ".docx":
+        docx = _require("docx", "python-docx")
+        return "\n".join(paragraph.text for paragraph in docx.Document(segment.path).paragraphs)
+    raise DocumentParseError(f"Unsupported document type '{segment.file_type}'")
+
+
+def document_segments(path: str) -> List[Segment]:
+    """Split a document into segments without reading its content."""
+    file_type = Path(path).suffix.lower()
+    if file_type not in settings.SUPPORTED_DOCUMENT_TYPES:
+        raise DocumentParseError(
+            f"Unsupported document type '{file_type}'. Supported: {', '.join(settings.SUPPORTED_DOCUMENT_TYPES)}"
+        )
+    if file_type == ".txt":
+        size = os.path.getsize(path)
+        return [
+            Segment(path, file_type, start, min(start + TEXT_SEGMENT_BYTES, size))
+            for start in range(0, size, TEXT_SEGMENT_BYTES)
+        ]
+    if file_type == ".pdf":
+        pypdf = _require("pypdf", "pypdf")
+        try:
+            pages = len(pypdf.PdfReader(path).pages)
+        except Exception as e:
+            raise DocumentParseError(f"Could not read PDF: {e}")
+        return [
+            Segment(path, file_type, start, min(start + PDF_PAGES_PER_SEGMENT, pages))
+            for start in range(0, pages, PDF_PAGES_PER_SEGMENT)
+        ]
+    # A .docx is a zipped XML tree that python-docx loads whole; MAX_DOCUMENT_SIZE bounds it
+    return [Segment(path, file_type, 0, 1)]
+
+
+def iter_segment_texts(segments: List[Segment], pool: Optional[ProcessPoolExecutor] = None) -> Iterator[str]:
+    """
+    Yield segment texts in document order.
+
+    With a pool, at most ``2 * max_workers`` segments are parsed ahead of
+    the consumer, which keeps memory bounded for large documents.
+    """
+    if pool is None:
+        for segment in segments:
+            yield parse_segment(segment)
+        return
+
+    window = 2 * pool._max_workers
+    pending = deque()
+    remaining = iter(segments)
+    for segment in remaining:
+        pending.append(pool.submit(parse_segment, segment))
+        if len(pending) >= window:
+            break
+    while pending:
+        text = pending.popleft().result()
+        next_segment = next(remaining, None)
+        if next_segment is not None:
+            pending.append(pool.submit(parse_segment, next_segment))
+        yield text
+
+
+def build_parse_pool(workers: Optional[int] = None) -> Optional[ProcessPoolExecutor]:
+    """Process pool for parsing, or None to parse in the calling process."""
+    workers = settings.DOCUMENT_PARSE_WORKERS if workers is None else workers
+    if workers <= 1:
+        return None
+    # spawn: the caller may be a threaded web worker, where fork is unsafe
+    return ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+
+
+# ======================================================
+# 🔹 Chunking
+# ======================================================
+def _split_point(text: str, start: int, chunk_size: int) -> int:
+    # Prefer breaking on whitespace in the last fifth of the chunk
+    window_start = int(chunk_size * 0.8)
+    for index in range(chunk_size - 1, window_start - 1, -1):
+        if text[start + index].isspace():
+            return index + 1
+    return chunk_size
+
+
+def chunk_text(segments: Iterable[str], chunk_size: int = 1000, overlap: int = 200) -> Iterator[Tuple[int, str]]:
+    """
+    Yield ``(offset, chunk)`` pairs of at most ``chunk_size`` characters.
+
+    Consecutive chunks share ``overlap`` characters. Only the unconsumed
+    tail is buffered, so any number of segments can be streamed through;
+    within a segment a start index moves through the buffer, so each chunk
+    is sliced once.
+    """
+    if overlap >= chunk_size:
+        raise ValueError("overlap must be smaller than chunk_size")
+    buffer = ""
+    start = 0  # of the next chunk in ``buffer``
+    offset = 0  # of ``buffer`` in the text
+    emitted_until = 0
+    for segment in segments:
+        buffer = buffer[start:] + segment
+        offset += start
+        start = 0
+        while len(buffer) - start >= chunk_size:
+            end = _split_point(buffer, start, chunk_size)
+            chunk = buffer[start:start + end]
+            if not chunk.isspace():
+                yield offset + start, chunk
+            emitted_until = offset + start + end
+            start += max(1, end - overlap)
+    tail = buffer[start:]
+    if offset + start + len(tail) > emitted_until and tail.strip():
+        yield offset + start, tail
+
+
+# ======================================================
+# 🔹 Ingestion
+# ======================================================
+def document_chunk_id(document_id, index: int) -> str:
+    return f"document-{document_id}-{index}"
+
+
+def ingest_file(
+    path: str,
+    store,
+    document_id,
+    metadata: Optional[Dict] = None,
+    pool: Optional[ProcessPoolExecutor] = None,
+    progress: Optional[Callable[[float, int], None]] = None,
+    chunk_size: Optional[int] = None,
+    overlap: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> int:
+    """
+    Parse, chunk, embed and upsert one file; return the number of chunks.
+
+    ``progress(fraction, chunks)`` is called after every segment.
+    """
+    chunk_size = chunk_size or settings.CHUNK_SIZE
+    overlap = settings.CHUNK_OVERLAP if overlap is None else overlap
+    batch_size = batch_size or settings.DOCUMENT_EMBED_BATCH_SIZE
+    base_metadata = {**(metadata or {}), "document_id": document_id, "source": Path(path).name}
+
+    segments = document_segments(path)
+    done = 0
+    written = 0
+    batch: List[Tuple[int, int, str]] = []
+
+    def flush():
+        nonlocal written
+        if not batch:
+            return
+        texts = [text for _, _, text in batch]
+        store.add_embeddings(
+            texts=texts,
+            embeddings=store.embeddings.embed_documents(texts),
+            metadatas=[{**base_metadata, "chunk": index, "offset": offset} for index, offset, _ in batch],
+            ids=[document_chunk_id(document_id, index) for index, _, _ in batch],
+        )
+        written += len(batch)
+        batch.clear()
+
+    def counted(texts: Iterator[str]) -> Iterator[str]:
+        nonlocal done
+        for text in texts:
+            yield text
+            done += 1
+            if progress:
+                progress(done / len(segments), written + len(batch))
+
+    for index, (offset, text) in enumerate(chunk_text(counted(iter_segment_texts(segments, pool)), chunk_size, overlap)):
+        batch.append((index, offset, text))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    if progress:
+        progress(1.0, written)
+    return written
+
+
+def process_document(
+    document,
+    path: str,
+    store=None,
+    pool=None,
+    delete_file: bool = False,
+    on_progress: Optional[Callable[[float, int], None]] = None,
+) -> None:
+    """
+    Ingest the file behind a ``Document`` row, recording status and progress
+    on the row (and passing it to ``on_progress`` when given).
+    """
+    from .models import Document
+    from .vector_stores import SHARED_USER_ID
+
+    if store is None:
+        from .ai_service import resources
+        store = resources.vector_store
+
+    def report(fraction: float, chunks: int) -> None:
+        Document.objects.filter(pk=document.pk).update(progress=round(fraction, 4), chunk_count=chunks)
+        if on_progress:
+            on_progress(fraction, chunks)
+
+    Document.objects.filter(pk=document.pk).update(status="processing")
+    start = time.time()
+    metadata = {
+        "role": "document",
+        "language": document.language,
+        "created_at": document.created_at.timestamp(),
+    }
+    # Documents without an owner are shared knowledge, retrieved for every user
+    metadata["user_id"] = document.user_id if document.user_id is not None else SHARED_USER_ID
+    try:
+        chunks = ingest_file(path, store, document.pk, metadata, pool=pool, progress=report)
+    except Exception as e:
+        logger.error(f"❌ Failed to ingest document {document.pk} ({document.name}): {e}")
+        Document.objects.filter(pk=document.pk).update(status="failed", error=str(e))
+    else:
+        Document.objects.filter(pk=document.pk).update(status="complete", progress=1.0, chunk_count=chunks)
+        logger.info(f"📄 Ingested {document.name}: {chunks} chunks in {time.time() - start:.1f}s")
+    finally:
+        if delete_file:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    document.refresh_from_db()
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def schedule_document(document, path: str) -> None:
+    """
+    Ingest an uploaded document off the request path (one at a time per
+    process); in ``RAG_INGEST_MODE=sync`` it is ingested immediately.
+    """
+    global _executor
+    if settings.RAG_INGEST_MODE == "sync":
+        process_document(document, path, delete_file=True)
+        return
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="document-ingestion")
+
+    def run():
+        pool = build_parse_pool()
+        try:
+            process_document(document, path, pool=pool, delete_file=True)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            connection.close()
+
+    _executor.submit(run)
@@ -0,0 +1,185 @@
+"""
+Content-addressed embedding cache.
+
+Vectors are keyed by an xxhash of the normalized text plus the embedding
+model id, kept in an in-process LRU in front of a size-bounded SQLite
+file, so repeated text never goes through the transformer twice.
+"""
+
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+import numpy as np
+import xxhash
+from langchain_core.embeddings import Embeddings
+
+from .text_normalization import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(text: str, model_id: str) -> str:
+    return xxhash.xxh3_128_hexdigest(f"{model_id}\0{normalize_text(text)}".encode("utf-8"))
+
+
+class EmbeddingCache:
+    """
+    Two-level vector cache: an LRU dict in memory backed by SQLite.
+
+    The SQLite file is trimmed back below ``max_bytes`` by evicting the
+    least recently stored/read rows.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, lru_size: int = 4096):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.lru_size = lru_size
+        self.hits = 0
+        self.misses = 0
+        self._lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vector BLOB NOT NULL,"
+            " nbytes INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed ON embeddings (accessed)")
+        self._db.commit()
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()[0]
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """Return cached vectors for the keys that are present."""
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            pending = []
+            for key in unique:
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[key] = self._lru[key]
+                else:
+                    pending.append(key)
+
+            for start in range(0, len(pending), 500):
+                chunk = pending[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                    found[key] = vector
+                    self._remember(key, vector)
+                if rows:
+                    now = time.time()
+                    self._db.executemany(
+                        "UPDATE embeddings SET accessed = ? WHERE key = ?",
+                        [(now, key) for key, _ in rows],
+                    )
+            if pending:
+                self._db.commit()
+
+            self.hits += len(found)
+            self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, vectors: Dict[str, List[float]]) -> None:
+        if not vectors:
+            return
+        now = time.time()
+        rows = []
+        for key, vector in vectors.items():
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((key, blob, len(blob), now))
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, list(vector))
+            for row in rows:
+                cursor = self._db.execute(
+                    "INSERT OR IGNORE INTO embeddings (key, vector, nbytes, accessed) VALUES (?, ?, ?, ?)",
+                    row,
+                )
+                if cursor.rowcount:
+                    self._bytes += row[2]
+            self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        if self._bytes <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        while self._bytes > target:
+            rows = self._db.execute(
+                "SELECT key, nbytes FROM embeddings ORDER BY accessed LIMIT 256"
+            ).fetchall()
+            if not rows:
+                break
+            self._db.executemany("DELETE FROM embeddings WHERE key = ?", [(key,) for key, _ in rows])
+            self._bytes -= sum(nbytes for _, nbytes in rows)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "entries": entries,
+                "bytes": self._bytes,
+                "memory_entries": len(self._lru),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+            self._db.execute("DELETE FROM embeddings")
+            self._db.commit()
+            self._bytes = 0
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wrap an embeddings model so every text is encoded at most once.
+
+    Documents and queries share keys: the mpnet models used here encode
+    both identically, so a message embedded for retrieval is reused when
+    it is ingested and vice versa.
+    """
+
+    def __init__(self, underlying: Embeddings, cache: EmbeddingCache, model_id: str):
+        self.underlying = underlying
+        self.cache = cache
+        self.model_id = model_id
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [cache_key(text, self.model_id) for text in texts]
+        found = self.cache.get_many(keys)
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(computed)
+            found.update(computed)
+            logger.debug(f"Embedding cache: {len(missing)} misses out of {len(texts)} texts")
+
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
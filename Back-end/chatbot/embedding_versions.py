@@ -0,0 +1,335 @@
+"""
+Versioned vector store collections keyed by embedding model.
+
+Every embedding model gets its own collection, recorded as an
+``EmbeddingVersion`` row. Changing ``EMBEDDING_MODEL_NAME`` starts a
+migration instead of invalidating the store:
+
+* retrieval keeps using the active version while every write goes to the
+  active store and, re-embedded with the new model, to the new one
+  (``DualWriteStore``);
+* ``backfill`` re-embeds the active store's records into the new version
+  at a throttled rate, resuming from a cursor saved on the row;
+* once every record of the active store is present in the new version it
+  becomes active, and each process switches over at its next version check.
+
+The previous collection is kept (status ``retired``) so a rollback is a
+second migration that only backfills what changed.
+"""
+
+import os
+import re
+import time
+import socket
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from langchain_core.embeddings import Embeddings
+
+from .vector_stores import WrappedStore, build_vector_store, hydrate_texts
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_LEASE_SECONDS = 120
+
+
+# ======================================================
+# 🔹 Versions
+# ======================================================
+def version_key(model_name: str) -> str:
+    """Collection suffix for a model: readable slug plus a short hash."""
+    slug = re.sub(r"[^a-z0-9]+", "-", model_name.split("/")[-1].lower()).strip("-")
+    digest = hashlib.sha1(model_name.encode("utf-8")).hexdigest()[:8]
+    return f"{slug[:40]}-{digest}"
+
+
+def current_versions():
+    """
+    Return the active ``EmbeddingVersion`` and the migrating one (or None).
+
+    A migration is started when ``EMBEDDING_MODEL_NAME`` names a model
+    other than the active one.
+    """
+    from .models import EmbeddingVersion
+
+    active, _ = EmbeddingVersion.objects.get_or_create(
+        status="active",
+        defaults={"model_name": settings.EMBEDDING_MODEL_NAME, "coverage": 1.0},
+    )
+    migrating = EmbeddingVersion.objects.filter(status="migrating").first()
+    if migrating is None and settings.EMBEDDING_MODEL_NAME != active.model_name:
+        migrating = start_migration(settings.EMBEDDING_MODEL_NAME)
+    return active, migrating
+
+
+def active_model_name() -> str:
+    """Model of the active version (``EMBEDDING_MODEL_NAME`` before migrations have run)."""
+    try:
+        return current_versions()[0].model_name
+    except DatabaseError:
+        return settings.EMBEDDING_MODEL_NAME
+
+
+def start_migration(model_name: str):
+    """Create (or resume) the migrating version for ``model_name``."""
+    from .models import EmbeddingVersion
+
+    active = EmbeddingVersion.objects.filter(status="active").first()
+    if active is not None and active.model_name == model_name:
+        raise ValueError(f"{model_name} is already the active embedding model")
+    migrating = EmbeddingVersion.objects.filter(status="migrating").first()
+    if migrating is not None:
+        if migrating.model_name != model_name:
+            raise ValueError(f"A migration to {migrating.model_name} is already in progress")
+        return migrating
+    # A retired version keeps its collection (the baseline's key is ''), so the
+    # backfill only fills in what changed
+    version, _ = EmbeddingVersion.objects.get_or_create(
+        model_name=model_name,
+        defaults={"collection_key": version_key(model_name)},
+    )
+    EmbeddingVersion.objects.filter(pk=version.pk).update(
+        status="migrating",
+        backfill_cursor=0,
+        backfilled=0,
+        coverage=0.0,
+        lease_owner="",
+        lease_until=None,
+    )
+    version.refresh_from_db()
+    logger.info(f"🔀 Started embedding migration to {model_name} (collection key {version.collection_key})")
+    return version
+
+
+def abort_migration() -> bool:
+    """Drop the migrating version; its collection stays on disk. Returns whether there was one."""
+    from .models import EmbeddingVersion
+
+    deleted, _ = EmbeddingVersion.objects.filter(status="migrating").delete()
+    return bool(deleted)
+
+
+def cutover(version) -> None:
+    """Make ``version`` the active one and retire the previous one."""
+    from .models import EmbeddingVersion
+
+    with transaction.atomic():
+        EmbeddingVersion.objects.filter(status="active").update(status="retired")
+        EmbeddingVersion.objects.filter(pk=version.pk).update(
+            status="active", coverage=1.0, activated_at=timezone.now(), lease_owner="", lease_until=None,
+        )
+    logger.info(f"🔀 Retrieval cut over to embedding model {version.model_name}")
+
+
+def build_version_store(version, embeddings: Optional[Embeddings] = None):
+    """Vector store of ``version``; its model is loaded in-process unless ``embeddings`` is given."""
+    from .embeddings import build_embeddings
+
+    if embeddings is None:
+        # The shared embedding worker serves the active model only
+        embeddings = build_embeddings(version.model_name, remote=False)
+    return build_vector_store(embeddings, version_key=version.collection_key)
+
+
+# ======================================================
+# 🔹 Dual-write
+# ======================================================
+class DualWriteStore(WrappedStore):
+    """
+    Store used during a migration: reads and searches go to ``primary``
+    (the active version); writes and deletes go to both, and documents
+    written to ``secondary`` are re-embedded with its own model.
+
+    Anything else (``compact``, ``path``, ``_collection``...) is the primary's.
+    """
+
+    def __init__(self, primary, secondary):
+        super().__init__(primary)
+        self.secondary = secondary
+
+    def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        ids = self.primary.add_embeddings(texts, embeddings, metadatas, ids)
+        try:
+            self._mirror(texts, metadatas or [{}] * len(texts), ids)
+        except Exception as e:
+            # The backfill's final coverage check picks up anything missed here
+            logger.warning(f"⚠️ Dual-write to the new embedding version failed: {e}")
+        return ids
+
+    def _mirror(self, texts: List[str], metadatas: List[Dict], ids: List[str]) -> None:
+        # Stored texts may be empty (id-only payloads); embed the message text
+        full_texts = hydrate_texts(texts, metadatas)
+        rows = [index for index, text in enumerate(full_texts) if text]
+        if not rows:
+            return
+        vectors = self.secondary.embeddings.embed_documents([full_texts[index] for index in rows])
+        self.secondary.add_embeddings(
+            texts=[texts[index] for index in rows],
+            embeddings=vectors,
+            metadatas=[metadatas[index] for index in rows],
+            ids=[ids[index] for index in rows],
+        )
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        deleted = self.primary.delete(ids=ids, **kwargs)
+        self.secondary.delete(ids=ids, **kwargs)
+        return deleted
+
+
+# ======================================================
+# 🔹 Backfill
+# ======================================================
+@dataclass
+class BackfillReport:
+    scanned: int = 0
+    embedded: int = 0
+    coverage: float = 0.0
+    cut_over: bool = False
+    leased: bool = True
+
+
+def _claim(version, owner: str) -> bool:
+    """Take or renew the backfill lease so only one process backfills at a time."""
+    from .models import EmbeddingVersion
+
+    now = timezone.now()
+    return bool(
+        EmbeddingVersion.objects.filter(pk=version.pk, status="migrating")
+        .filter(Q(lease_owner="") | Q(lease_owner=owner) | Q(lease_until__lt=now) | Q(lease_until=None))
+        .update(lease_owner=owner, lease_until=now + timedelta(seconds=BACKFILL_LEASE_SECONDS))
+    )
+
+
+def _missing(source, target, batch_size: int) -> Tuple[int, int]:
+    """Count (missing, total) source records that should exist in ``target``."""
+    missing = total = 0
+    for page in source.iter_records(batch_size):
+        texts = hydrate_texts(page["documents"], page["metadatas"])
+        # Records whose message is gone are orphans for the reconciler, not backfill work
+        ids = [doc_id for doc_id, text in zip(page["ids"], texts) if text]
+        total += len(ids)
+        missing += len(ids) - len(target.existing_ids(ids))
+    return missing, total
+
+
+def _migration_stores():
+    from .ai_service import resources
+
+    store = resources.vector_store
+    if isinstance(store, DualWriteStore):
+        return store.primary, store.secondary
+    _, migrating = current_versions()
+    return store, build_version_store(migrating)
+
+
+def backfill(
+    source=None,
+    target=None,
+    batch_size: Optional[int] = None,
+    rate: Optional[float] = None,
+    max_batches: Optional[int] = None,
+    owner: Optional[str] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> BackfillReport:
+    """
+    Re-embed the active store's records into the migrating version.
+
+    Pages are read from the saved cursor; records already in the target
+    (dual-written or from an earlier run) are skipped, and at most ``rate``
+    records per second are embedded. At the end of a pass every source
+    record is checked against the target: at 100% coverage retrieval cuts
+    over, otherwise the next pass starts from the beginning. Returns early
+    when another process holds the lease or after ``max_batches`` pages.
+    """
+    from .models import EmbeddingVersion
+
+    report = BackfillReport()
+    _, version = current_versions()
+    if version is None:
+        report.coverage = 1.0
+        return report
+    owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+    if not _claim(version, owner):
+        report.leased = False
+        report.coverage = version.coverage
+        return report
+    if source is None or target is None:
+        source, target = _migration_stores()
+    batch_size = batch_size or settings.RAG_BACKFILL_BATCH_SIZE
+    rate = settings.RAG_BACKFILL_RATE if rate is None else rate
+
+    cursor = version.backfill_cursor
+    batches = 0
+    pass_embedded = 0
+    while max_batches is None or batches < max_batches:
+        page = next(iter(source.iter_records(batch_size, offset=cursor)), None)
+        if page is None:
+            missing, total = _missing(source, target, batch_size)
+            report.coverage = 1.0 if not total else 1 - missing / total
+            if not missing:
+                cutover(version)
+                report.cut_over = True
+                break
+            logger.info(f"🔁 Backfill pass complete with {missing} records missing; starting another pass")
+            EmbeddingVersion.objects.filter(pk=version.pk).update(backfill_cursor=0, coverage=report.coverage)
+            if not pass_embedded:
+                # Nothing could be embedded this pass; wait for the next run instead of spinning
+                break
+            cursor = pass_embedded = 0
+            continue
+
+        started = time.monotonic()
+        texts = hydrate_texts(page["documents"], page["metadatas"])
+        present = target.existing_ids(page["ids"])
+        rows = [
+            index for index, doc_id in enumerate(page["ids"])
+            if doc_id not in present and texts[index]
+        ]
+        if rows:
+            target.add_embeddings(
+                texts=[page["documents"][index] for index in rows],
+                embeddings=target.embeddings.embed_documents([texts[index] for index in rows]),
+                metadatas=[page["metadatas"][index] for index in rows],
+                ids=[page["ids"][index] for index in rows],
+            )
+        cursor += len(page["ids"])
+        batches += 1
+        pass_embedded += len(rows)
+        report.scanned += len(page["ids"])
+        report.embedded += len(rows)
+        report.coverage = min(cursor / max(1, source.count()), 0.999)
+        EmbeddingVersion.objects.filter(pk=version.pk).update(
+            backfill_cursor=cursor, backfilled=F("backfilled") + len(rows), coverage=report.coverage,
+        )
+        if not _claim(version, owner):
+            report.leased = False
+            break
+        if rate and rows:
+            sleep(max(0.0, len(rows) / rate - (time.monotonic() - started)))
+
+    logger.info(
+        f"🔁 Backfilled {report.embedded}/{report.scanned} records into {version.model_name} "
+        f"({report.coverage:.1%} coverage)"
+    )
+    return report
+
+
+def start_background_backfill(interval_seconds: float) -> threading.Thread:
+    """Run ``backfill`` every ``interval_seconds`` in a daemon thread while a migration is pending."""
+    from .background import start_periodic
+
+    return start_periodic("rag-embedding-backfill", interval_seconds, backfill)
@@ -0,0 +1,285 @@
+"""
+Shared embedding worker.
+
+One local process owns the embedding model and serves every web worker
+over a Unix socket. Concurrent encode requests are merged into
+micro-batches so the model runs a few batched forward passes instead of
+many single-row ones.
+
+On connecting, a client is told which model the worker serves, so a
+worker left running with the previous model after an embedding version
+cutover is not used for the new one.
+"""
+
+import os
+import time
+import queue
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from multiprocessing.connection import Client, Listener
+from typing import Callable, List, Optional
+
+from django.conf import settings
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# How long a client encodes locally before asking a mismatched worker again
+WORKER_RECHECK_SECONDS = 30.0
+
+
+def get_authkey() -> bytes:
+    """Shared secret for the worker socket, derived from SECRET_KEY."""
+    return hashlib.sha256(f"embedding-worker:{settings.SECRET_KEY}".encode()).digest()
+
+
+# ======================================================
+# 🔹 Micro-batching
+# ======================================================
+@dataclass
+class _Job:
+    texts: List[str]
+    future: Future = field(default_factory=Future)
+
+
+class MicroBatcher:
+    """
+    Collect encode requests from many threads and run them as batches.
+
+    A batch is flushed as soon as it holds ``max_batch_size`` texts or the
+    oldest request has waited ``max_wait_ms``.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], List[List[float]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        self.encode = encode
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.batches = 0
+        self.texts = 0
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        job = _Job(texts=list(texts))
+        if not job.texts:
+            job.future.set_result([])
+        else:
+            self._queue.put(job)
+        return job.future
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return self.submit(texts).result()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first: _Job):
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.monotonic() + self.max_wait
+        stop = False
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if job is None:
+                stop = True
+                break
+            batch.append(job)
+            size += len(job.texts)
+        return batch, stop
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            batch, stop = self._collect(job)
+            texts = [text for job in batch for text in job.texts]
+            try:
+                vectors = self.encode(texts)
+            except Exception as e:
+                for job in batch:
+                    job.future.set_exception(e)
+            else:
+                offset = 0
+                for job in batch:
+                    job.future.set_result(vectors[offset:offset + len(job.texts)])
+                    offset += len(job.texts)
+                self.batches += 1
+                self.texts += len(texts)
+            if stop:
+                return
+
+
+# ======================================================
+# 🔹 Worker process
+# ======================================================
+class EmbeddingWorker:
+    """Serve an embeddings model to other processes over a Unix socket."""
+
+    def __init__(
+        self,
+        socket_path: str,
+        embeddings: Embeddings,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        authkey: Optional[bytes] = None,
+        model_name: str = "",
+    ):
+        self.socket_path = socket_path
+        self.model_name = model_name
+        self.batcher = MicroBatcher(embeddings.embed_documents, max_batch_size, max_wait_ms)
+        self._authkey = authkey or get_authkey()
+        self._listener: Optional[Listener] = None
+        self._closed = threading.Event()
+
+    def start(self) -> None:
+        """Bind the socket; call ``serve_forever`` to accept clients."""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._listener = Listener(self.socket_path, family="AF_UNIX", authkey=self._authkey)
+        logger.info(f"🧮 Embedding worker listening on {self.socket_path}")
+
+    def serve_forever(self) -> None:
+        if self._listener is None:
+            self.start()
+        while not self._closed.is_set():
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                if self._closed.is_set():
+                    break
+                raise
+            except Exception as e:
+                logger.warning(f"Rejected embedding client: {e}")
+                continue
+            threading.Thread(target=self._serve_client, args=(conn,), daemon=True).start()
+
+    def _serve_client(self, conn) -> None:
+        with conn:
+            try:
+                conn.send(("model", self.model_name))
+            except OSError:
+                return
+            while True:
+                try:
+                    texts = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    conn.send(("ok", self.batcher.embed(texts)))
+                except Exception as e:
+                    logger.error(f"❌ Embedding worker error: {e}")
+                    conn.send(("error", str(e)))
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._listener is not None:
+            self._listener.close()
+        self.batcher.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+# ======================================================
+# 🔹 Client
+# ======================================================
+class WorkerModelMismatch(RuntimeError):
+    """The embedding worker serves another model than the client expects."""
+
+
+class RemoteEmbeddings(Embeddings):
+    """
+    LangChain embeddings backed by the shared embedding worker.
+
+    With ``model_name`` the model the worker reports on connect must match.
+    Otherwise, or while the worker cannot be reached, texts are encoded by
+    the embeddings ``fallback()`` returns (in-process) and the worker is
+    asked again after ``WORKER_RECHECK_SECONDS``; without a fallback the
+    request fails.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        authkey: Optional[bytes] = None,
+        model_name: Optional[str] = None,
+        fallback: Optional[Callable[[], Embeddings]] = None,
+    ):
+        self.socket_path = socket_path
+        self.model_name = model_name
+        self._authkey = authkey
+        self._local = threading.local()
+        self._fallback_factory = fallback
+        self._fallback: Optional[Embeddings] = None
+        self._fallback_lock = threading.Lock()
+        self._fallback_until = 0.0
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.socket_path, family="AF_UNIX", authkey=self._authkey or get_authkey())
+            _, served = conn.recv()
+            if self.model_name and served != self.model_name:
+                conn.close()
+                raise WorkerModelMismatch(
+                    f"Embedding worker at {self.socket_path} serves '{served}', not '{self.model_name}'"
+                )
+            self._local.conn = conn
+        return conn
+
+    def _local_embeddings(self, reason: Exception) -> Embeddings:
+        if self._fallback_factory is None:
+            raise reason
+        with self._fallback_lock:
+            if self._fallback is None:
+                self._fallback = self._fallback_factory()
+            logger.warning(f"⚠️ {reason}; encoding in-process for {WORKER_RECHECK_SECONDS:.0f}s")
+            self._fallback_until = time.monotonic() + WORKER_RECHECK_SECONDS
+            return self._fallback
+
+    def _request(self, texts: List[str]):
+        conn = self._connection()
+        conn.send(texts)
+        return conn.recv()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if time.monotonic() < self._fallback_until:
+            return self._fallback.embed_documents(list(texts))
+        try:
+            try:
+                status, payload = self._request(list(texts))
+            except (EOFError, OSError):
+                # Worker restarted: reconnect once
+                self._local.conn = None
+                status, payload = self._request(list(texts))
+        except WorkerModelMismatch as e:
+            return self._local_embeddings(e).embed_documents(list(texts))
+        except (EOFError, OSError) as e:
+            # The worker is an optional sidecar: its absence must not fail the request
+            self._local.conn = None
+            reason = ConnectionError(f"Embedding worker at {self.socket_path} unavailable ({e})")
+            return self._local_embeddings(reason).embed_documents(list(texts))
+        if status != "ok":
+            raise RuntimeError(f"Embedding worker error: {payload}")
+        return [list(map(float, vector)) for vector in payload]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
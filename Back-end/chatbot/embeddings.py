@@ -0,0 +1,155 @@
+"""
+Embedding model construction for the RAG pipeline.
+Builds either an in-process sentence-transformers model (PyTorch fp32,
+ONNX fp32 or ONNX int8) or a client for the shared embedding worker
+(see ``embedding_worker.py``).
+"""
+
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+# ======================================================
+# 🔹 ONNX export
+# ======================================================
+def _onnx_dir(model_name: str) -> Path:
+    cache_dir = Path(getattr(settings, 'EMBEDDING_ONNX_CACHE_DIR', 'onnx_models'))
+    return cache_dir / model_name.replace("/", "__")
+
+
+def _find_onnx_file(target: Path, file_name: str) -> Optional[str]:
+    for candidate in (f"onnx/{file_name}", file_name):
+        if (target / candidate).exists():
+            return candidate
+    return None
+
+
+def export_onnx_model(model_name: str, quantize: bool = False) -> Tuple[str, str]:
+    """
+    Export ``model_name`` to ONNX (optionally int8 dynamic-quantized) once
+    and cache it under ``EMBEDDING_ONNX_CACHE_DIR``.
+
+    Returns the local model directory and the ONNX file to load from it.
+    Requires ``optimum[onnxruntime]``.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    target = _onnx_dir(model_name)
+    fp32_file = _find_onnx_file(target, "model.onnx")
+    if fp32_file is None:
+        logger.info(f"📦 Exporting {model_name} to ONNX in {target}")
+        model = SentenceTransformer(model_name, backend="onnx", device="cpu")
+        model.save(str(target))
+        fp32_file = _find_onnx_file(target, "model.onnx")
+    if not quantize:
+        return str(target), fp32_file
+
+    quantization = getattr(settings, 'EMBEDDING_ONNX_QUANTIZATION', 'avx2')
+    int8_name = f"model_qint8_{quantization}.onnx"
+    int8_file = _find_onnx_file(target, int8_name)
+    if int8_file is None:
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        logger.info(f"📦 Quantizing {model_name} to int8 ({quantization})")
+        model = SentenceTransformer(
+            str(target), backend="onnx", device="cpu", model_kwargs={"file_name": fp32_file}
+        )
+        export_dynamic_quantized_onnx_model(model, quantization, str(target))
+        int8_file = _find_onnx_file(target, int8_name)
+    return str(target), int8_file
+
+
+# ======================================================
+# 🔹 Factories
+# ======================================================
+def build_local_embeddings(model_name: str, backend: Optional[str] = None):
+    """
+    Load the sentence-transformers model inside the current process.
+
+    ``backend`` defaults to ``EMBEDDING_BACKEND`` and is one of
+    ``torch`` (fp32), ``onnx`` (fp32) or ``onnx-int8``.
+    """
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    backend = backend or getattr(settings, 'EMBEDDING_BACKEND', 'torch')
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Use one of {EMBEDDING_BACKENDS}.")
+    if backend == "torch":
+        return HuggingFaceEmbeddings(model_name=model_name)
+
+    model_dir, file_name = export_onnx_model(model_name, quantize=backend == "onnx-int8")
+    return HuggingFaceEmbeddings(
+        model_name=model_dir,
+        model_kwargs={
+            "backend": "onnx",
+            "device": "cpu",
+            "model_kwargs": {"file_name": file_name},
+        },
+    )
+
+
+def build_embeddings(model_name: str, remote: bool = True):
+    """
+    Return the embeddings used by the vector store.
+
+    When ``EMBEDDING_SERVICE_SOCKET`` is set, encoding is delegated to the
+    local embedding worker so all web workers share one model copy; pass
+    ``remote=False`` for a model the worker does not serve. While the
+    worker serves another model (not yet restarted after an embedding
+    version cutover), ``model_name`` is loaded in-process instead. With
+    ``EMBEDDING_CACHE_ENABLED`` the result is wrapped in the
+    content-addressed embedding cache.
+    """
+    socket_path = getattr(settings, 'EMBEDDING_SERVICE_SOCKET', '')
+    if socket_path and remote:
+        from .embedding_worker import RemoteEmbeddings
+        logger.info(f"🔌 Using embedding worker at {socket_path}")
+        embeddings = RemoteEmbeddings(
+            socket_path, model_name=model_name, fallback=lambda: build_local_embeddings(model_name),
+        )
+    else:
+        embeddings = build_local_embeddings(model_name)
+
+    if getattr(settings, 'EMBEDDING_CACHE_ENABLED', False):
+        from .embedding_cache import CachedEmbeddings, EmbeddingCache
+        cache = EmbeddingCache(
+            settings.EMBEDDING_CACHE_PATH,
+            max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+            lru_size=settings.EMBEDDING_CACHE_LRU_SIZE,
+        )
+        model_id = f"{model_name}:{getattr(settings, 'EMBEDDING_BACKEND', 'torch')}"
+        embeddings = CachedEmbeddings(embeddings, cache, model_id)
+    return embeddings
+
+
+# ======================================================
+# 🔹 Parity
+# ======================================================
+def cosine_drift(reference: Sequence[Sequence[float]], candidate: Sequence[Sequence[float]]) -> Dict[str, float]:
+    """
+    Compare two sets of embeddings row by row.
+
+    Returns the mean and minimum cosine similarity plus the mean and
+    maximum drift (``1 - cosine``) of ``candidate`` against ``reference``.
+    """
+    import numpy as np
+
+    a = np.asarray(reference, dtype=np.float64)
+    b = np.asarray(candidate, dtype=np.float64)
+    if a.shape != b.shape:
+        raise ValueError(f"Embedding shapes differ: {a.shape} vs {b.shape}")
+    norms = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    cosine = (a * b).sum(axis=1) / np.where(norms == 0, 1.0, norms)
+    drift = 1.0 - cosine
+    return {
+        "mean_cosine": float(cosine.mean()),
+        "min_cosine": float(cosine.min()),
+        "mean_drift": float(drift.mean()),
+        "max_drift": float(drift.max()),
+    }
@@ -0,0 +1,154 @@
+"""
+HNSW parameter sweep for the Chroma memory collection.
+
+Every (M, ef_construction) pair gets a throwaway collection holding a copy
+of the corpus vectors; ef_search is then varied in place on it. Each point
+is measured against exact (brute-force) neighbours for recall@k, single-
+query p50/p99 latency and the size of the persisted index.
+"""
+
+import time
+import shutil
+import tempfile
+from dataclasses import dataclass
+from itertools import product
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from .maintenance import directory_size
+from .vector_stores import build_chroma_client
+
+EXACT_BLOCK_ROWS = 16384
+
+
+@dataclass
+class SweepPoint:
+    max_neighbors: int
+    ef_construction: int
+    ef_search: int
+    recall: float
+    p50_ms: float
+    p99_ms: float
+    index_bytes: int
+    build_seconds: float
+
+
+def load_vectors(store, limit: int = 0, batch_size: int = 1000) -> np.ndarray:
+    """Stored vectors of ``store`` as a float32 matrix (at most ``limit`` rows when set)."""
+    blocks = []
+    total = 0
+    for page in store.iter_records(batch_size):
+        blocks.append(np.asarray(page["embeddings"], dtype=np.float32))
+        total += len(page["ids"])
+        if limit and total >= limit:
+            break
+    if not blocks:
+        return np.zeros((0, 0), dtype=np.float32)
+    vectors = np.concatenate(blocks)
+    return vectors[:limit] if limit else vectors
+
+
+def exact_neighbors(vectors: np.ndarray, queries: np.ndarray, k: int, space: str = "l2") -> np.ndarray:
+    """Row indices of the true ``k`` nearest neighbours of each query under ``space``."""
+    if space == "cosine":
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    k = min(k, len(vectors))
+    best = np.zeros((len(queries), 0), dtype=np.int64)
+    best_distance = np.zeros((len(queries), 0), dtype=np.float32)
+    for start in range(0, len(vectors), EXACT_BLOCK_ROWS):
+        block = vectors[start:start + EXACT_BLOCK_ROWS]
+        if space == "l2":
+            distance = (
+                (queries ** 2).sum(axis=1, keepdims=True)
+                - 2 * queries @ block.T
+                + (block ** 2).sum(axis=1)
+            )
+        else:
+            distance = -(queries @ block.T)
+        rows = np.broadcast_to(np.arange(start, start + len(block)), distance.shape)
+        candidates = np.concatenate([best, rows], axis=1)
+        distance = np.concatenate([best_distance, distance], axis=1)
+        order = np.argsort(distance, axis=1)[:, :k]
+        best = np.take_along_axis(candidates, order, axis=1)
+        best_distance = np.take_along_axis(distance, order, axis=1)
+    return best
+
+
+def _index_size(path: Path) -> int:
+    # HNSW segment directories only; the SQLite file also holds the write log
+    return sum(directory_size(child) for child in path.iterdir() if child.is_dir())
+
+
+def sweep(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    max_neighbors: Sequence[int],
+    ef_construction: Sequence[int],
+    ef_search: Sequence[int],
+    space: str = "l2",
+    batch_size: int = 1000,
+    workdir: Optional[str] = None,
+    progress: Optional[Callable[[SweepPoint], None]] = None,
+) -> List[SweepPoint]:
+    """
+    Measure every parameter point of the grid on ``vectors``.
+
+    Collections are built in ``workdir`` (a temporary directory by
+    default, removed afterwards) so the live database is never touched.
+    """
+    truth = exact_neighbors(vectors, queries, k, space)
+    ids = [str(row) for row in range(len(vectors))]
+    path = Path(workdir or tempfile.mkdtemp(prefix="hnsw-sweep-"))
+    client = build_chroma_client(str(path))
+    points = []
+    try:
+        for m, efc in product(max_neighbors, ef_construction):
+            name = f"sweep-m{m}-efc{efc}"
+            before = _index_size(path)
+            started = time.perf_counter()
+            collection = client.create_collection(name, configuration={"hnsw": {
+                "space": space, "max_neighbors": m, "ef_construction": efc, "ef_search": max(ef_search),
+            }})
+            for start in range(0, len(vectors), batch_size):
+                collection.add(ids=ids[start:start + batch_size], embeddings=vectors[start:start + batch_size])
+            build_seconds = time.perf_counter() - started
+            index_bytes = _index_size(path) - before
+
+            for ef in ef_search:
+                collection.modify(configuration={"hnsw": {"ef_search": ef}})
+                collection.query(query_embeddings=[queries[0]], n_results=1, include=[])  # warm up
+                latencies = []
+                hits = 0
+                for query, expected in zip(queries, truth):
+                    started = time.perf_counter()
+                    found = collection.query(query_embeddings=[query], n_results=len(expected), include=[])
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    hits += len(set(int(i) for i in found["ids"][0]) & set(expected.tolist()))
+                point = SweepPoint(
+                    max_neighbors=m,
+                    ef_construction=efc,
+                    ef_search=ef,
+                    recall=hits / max(truth.size, 1),
+                    p50_ms=float(np.percentile(latencies, 50)),
+                    p99_ms=float(np.percentile(latencies, 99)),
+                    index_bytes=index_bytes,
+                    build_seconds=build_seconds,
+                )
+                points.append(point)
+                if progress:
+                    progress(point)
+            client.delete_collection(name)
+    finally:
+        if workdir is None:
+            shutil.rmtree(path, ignore_errors=True)
+    return points
+
+
+def recommend(points: List[SweepPoint], target_recall: float) -> Optional[SweepPoint]:
+    """Fastest (p99) point reaching ``target_recall``, preferring the smaller index on ties."""
+    eligible = [point for point in points if point.recall >= target_recall]
+    return min(eligible, key=lambda point: (point.p99_ms, point.index_bytes)) if eligible else None
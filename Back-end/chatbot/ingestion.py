@@ -0,0 +1,202 @@
+"""
+Background ingestion queue for the RAG vector store.
+
+Documents submitted from the request path are buffered and written in
+batches by a single background thread, so embedding and vector store
+writes no longer add latency to ``send_message``.
+"""
+
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Union
+
+from langchain_core.documents import Document
+
+from .vector_stores import payload_text
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+@dataclass
+class PendingDocument:
+    """A queued document and, when already known, its embedding (and the model that produced it)."""
+    document: Document
+    embedding: Optional[List[float]] = None
+    model: Optional[str] = None
+
+
+# What an ``IngestionQueue`` carries; its ``write`` callback decides which
+QueueItem = Union[Document, PendingDocument]
+
+
+def write_pending_documents(store, items: List[PendingDocument], model: Optional[str] = None) -> None:
+    """
+    Upsert a batch into ``store``.
+
+    Documents without a precomputed vector are embedded together in one
+    call; the others are written as-is, so nothing is embedded twice.
+    Vectors computed by a model other than ``model`` (queued before an
+    embedding cutover) are recomputed. The stored text follows
+    ``RAG_PAYLOAD_MODE`` (see ``payload_text``).
+    """
+    if model is not None:
+        for item in items:
+            if item.model is not None and item.model != model:
+                item.embedding = None
+    missing = [item for item in items if item.embedding is None]
+    if missing:
+        vectors = store.embeddings.embed_documents([item.document.page_content for item in missing])
+        for item, vector in zip(missing, vectors):
+            item.embedding = vector
+    store.add_embeddings(
+        texts=[payload_text(item.document) for item in items],
+        embeddings=[item.embedding for item in items],
+        metadatas=[item.document.metadata for item in items],
+        ids=[item.document.id for item in items],
+    )
+
+
+class IngestionQueue:
+    """
+    Bounded queue that writes documents (or ``PendingDocument`` items) in batches.
+
+    A batch is written once it holds ``batch_size`` documents or its oldest
+    document is ``max_age_ms`` old; documents queued together with
+    ``submit_many`` always land in the same batch. When ``max_pending``
+    submissions are waiting, ``submit`` blocks for up to ``put_timeout``
+    seconds and then writes inline (backpressure instead of unbounded memory).
+    With ``synchronous=True`` every submission is written immediately, which
+    keeps tests deterministic.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[List[QueueItem]], None],
+        batch_size: int = 32,
+        max_age_ms: float = 500,
+        max_pending: int = 1000,
+        put_timeout: float = 1.0,
+        synchronous: bool = False,
+    ):
+        self.write = write
+        self.batch_size = max(1, batch_size)
+        self.max_age = max(0.0, max_age_ms) / 1000
+        self.max_pending = max_pending
+        self.put_timeout = put_timeout
+        self.synchronous = synchronous
+        self.submitted = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.inline_writes = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    # ------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------
+    def submit(self, document: QueueItem) -> None:
+        self.submit_many([document])
+
+    def submit_many(self, documents: List[QueueItem]) -> None:
+        """Queue documents that must be written in the same batch (e.g. chunks of one message)."""
+        if not documents:
+            return
+        self.submitted += len(documents)
+        if self.synchronous or self._closed:
+            self._write_batch(list(documents))
+            return
+
+        self._ensure_worker()
+        try:
+            self._queue.put((time.monotonic(), list(documents)), timeout=self.put_timeout)
+        except queue.Full:
+            self.inline_writes += 1
+            logger.warning(f"⚠️ Ingestion queue full, writing {len(documents)} documents inline")
+            self._write_batch(list(documents))
+
+    def flush(self) -> None:
+        """Block until every document submitted so far has been written."""
+        if self._queue is not None and self._pid == os.getpid():
+            self._queue.join()
+
+    def close(self) -> None:
+        """Flush pending documents and stop the background thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            self._queue.put((time.monotonic(), _STOP))
+            self._thread.join()
+
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    # ------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------
+    def _ensure_worker(self) -> None:
+        # Threads do not survive fork (gunicorn --preload): start one per process
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._queue = queue.Queue(maxsize=self.max_pending)
+            self._thread = threading.Thread(target=self._run, name="rag-ingestion", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _write_batch(self, documents: List[QueueItem]) -> None:
+        try:
+            self.write(documents)
+        except Exception as e:
+            self.failed += len(documents)
+            logger.error(f"❌ Failed to ingest {len(documents)} documents: {e}")
+        else:
+            self.written += len(documents)
+            self.batches += 1
+
+    def _run(self) -> None:
+        while True:
+            enqueued_at, group = self._queue.get()
+            if group is _STOP:
+                self._queue.task_done()
+                return
+
+            # Each queue entry is a group of documents that is never split
+            batch = list(group)
+            entries = 1
+            stop = False
+            deadline = enqueued_at + self.max_age
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    _, group = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if group is _STOP:
+                    stop = True
+                    break
+                batch.extend(group)
+                entries += 1
+
+            self._write_batch(batch)
+            for _ in range(entries + stop):
+                self._queue.task_done()
+            if stop:
+                return
@@ -0,0 +1,273 @@
+"""
+BM25 inverted index over the text of ingested documents.
+
+Names, codes and exact phrases are found more precisely, and without a
+transformer forward pass, by matching terms than by nearest-neighbour
+search. Postings live in a SQLite file, so the index survives restarts,
+every worker process sees the same index, and a query only reads the
+posting lists of its own terms. ``LexicalIndexedStore`` keeps it in step
+with every write and delete made through the shared vector store;
+``build_index`` fills it from an existing store.
+"""
+
+import json
+import math
+import heapq
+import sqlite3
+import logging
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from .text_normalization import tokenize
+from .vector_stores import WrappedStore, hydrate_texts
+
+logger = logging.getLogger(__name__)
+
+# BM25 term-frequency saturation and length normalisation
+K1 = 1.2
+B = 0.75
+# Metadata fields a search can be restricted to (see ``partition_filter``)
+PARTITION_FIELDS = ("user_id", "chat_id", "language")
+# Rank offset of reciprocal rank fusion
+RRF_CONSTANT = 60
+
+
+@dataclass
+class LexicalHit:
+    id: str
+    score: float
+    text: str
+    metadata: Dict
+
+    def document(self) -> Document:
+        return Document(id=self.id, page_content=self.text, metadata=self.metadata)
+
+
+def _where_sql(where: Optional[Dict]) -> Tuple[str, List[Any]]:
+    """Translate a ``partition_filter`` clause into SQL on the docs table."""
+    if not where:
+        return "", []
+    clauses = where["$and"] if set(where) == {"$and"} else [{key: value} for key, value in where.items()]
+    sql, params = [], []
+    for clause in clauses:
+        (field, value), = clause.items()
+        if isinstance(value, dict) and set(value) == {"$eq"}:
+            value = value["$eq"]
+        if field in PARTITION_FIELDS and isinstance(value, dict) and set(value) == {"$in"} and value["$in"]:
+            # The user's partition plus shared knowledge
+            sql.append(f"d.{field} IN ({', '.join('?' * len(value['$in']))})")
+            params.extend(value["$in"])
+            continue
+        if field not in PARTITION_FIELDS or isinstance(value, (dict, list)):
+            raise ValueError(
+                f"Lexical search only filters on equality or $in of {', '.join(PARTITION_FIELDS)}"
+            )
+        sql.append(f"d.{field} = ?")
+        params.append(value)
+    return " AND " + " AND ".join(sql), params
+
+
+class LexicalIndex:
+    """BM25 index of document chunks keyed by the vector store's ids."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " doc INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, length INTEGER NOT NULL,"
+            " user_id INTEGER, chat_id INTEGER, language TEXT,"
+            " text TEXT NOT NULL, metadata TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " term TEXT NOT NULL, doc INTEGER NOT NULL, tf INTEGER NOT NULL,"
+            " PRIMARY KEY (term, doc)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc);"
+            "CREATE TABLE IF NOT EXISTS totals (name TEXT PRIMARY KEY, value INTEGER NOT NULL);"
+        )
+        self._db.commit()
+
+    def _bump(self, docs: int, tokens: int) -> None:
+        self._db.executemany(
+            "INSERT INTO totals (name, value) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+            [("docs", docs), ("tokens", tokens)],
+        )
+
+    def _remove(self, ids: Sequence[str]) -> None:
+        for start in range(0, len(ids), 500):
+            batch = list(ids[start:start + 500])
+            marks = ",".join("?" * len(batch))
+            rows = self._db.execute(f"SELECT doc, length FROM docs WHERE id IN ({marks})", batch).fetchall()
+            if not rows:
+                continue
+            docs = [doc for doc, _ in rows]
+            doc_marks = ",".join("?" * len(docs))
+            self._db.execute(f"DELETE FROM postings WHERE doc IN ({doc_marks})", docs)
+            self._db.execute(f"DELETE FROM docs WHERE doc IN ({doc_marks})", docs)
+            self._bump(-len(rows), -sum(length for _, length in rows))
+
+    def add(
+        self,
+        ids: Sequence[str],
+        texts: Sequence[Optional[str]],
+        metadatas: Optional[Sequence[Optional[Dict]]] = None,
+        payloads: Optional[Sequence[str]] = None,
+    ) -> int:
+        """
+        Index (or re-index) documents and return how many have terms.
+
+        ``texts`` are tokenized; ``payloads`` (default: the texts) are what
+        a hit returns, so id-only message payloads stay empty here too and
+        are hydrated from the database like vector hits.
+        """
+        metadatas = metadatas or [None] * len(ids)
+        payloads = payloads if payloads is not None else texts
+        added = 0
+        with self._lock, self._db:
+            self._remove(ids)
+            for doc_id, text, metadata, payload in zip(ids, texts, metadatas, payloads):
+                terms = Counter(tokenize(text or ""))
+                if not terms:
+                    continue
+                metadata = metadata or {}
+                length = sum(terms.values())
+                doc = self._db.execute(
+                    "INSERT INTO docs (id, length, user_id, chat_id, language, text, metadata) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (doc_id, length, *(metadata.get(field) for field in PARTITION_FIELDS),
+                     payload or "", json.dumps(metadata)),
+                ).lastrowid
+                self._db.executemany(
+                    "INSERT INTO postings (term, doc, tf) VALUES (?, ?, ?)",
+                    [(term, doc, tf) for term, tf in terms.items()],
+                )
+                self._bump(1, length)
+                added += 1
+        return added
+
+    def delete(self, ids: Sequence[str]) -> None:
+        with self._lock, self._db:
+            self._remove(ids)
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM postings")
+            self._db.execute("DELETE FROM docs")
+            self._db.execute("DELETE FROM totals")
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def search(self, query: str, k: int = 4, where: Optional[Dict] = None) -> List[LexicalHit]:
+        """
+        Top ``k`` BM25 hits for ``query`` within the ``where`` partition.
+
+        Scores are divided by the score of a document of average length
+        holding every query term once, and capped at 1.0, so unknown query
+        terms and partial matches pull the score down.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        clause, params = _where_sql(where)
+        with self._lock:
+            totals = dict(self._db.execute("SELECT name, value FROM totals").fetchall())
+            docs, tokens = totals.get("docs", 0), totals.get("tokens", 0)
+            if not docs:
+                return []
+            average_length = tokens / docs
+            scores: Dict[int, float] = defaultdict(float)
+            best = 0.0
+            for term in terms:
+                df = self._db.execute("SELECT COUNT(*) FROM postings WHERE term = ?", (term,)).fetchone()[0]
+                idf = math.log(1 + (docs - df + 0.5) / (df + 0.5))
+                best += idf
+                if not df:
+                    continue
+                rows = self._db.execute(
+                    "SELECT p.doc, p.tf, d.length FROM postings p JOIN docs d ON d.doc = p.doc "
+                    f"WHERE p.term = ?{clause}",
+                    [term, *params],
+                )
+                for doc, tf, length in rows:
+                    scores[doc] += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average_length))
+            if not scores:
+                return []
+            top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            marks = ",".join("?" * len(top))
+            rows = {
+                doc: (doc_id, text, metadata)
+                for doc, doc_id, text, metadata in self._db.execute(
+                    f"SELECT doc, id, text, metadata FROM docs WHERE doc IN ({marks})", [doc for doc, _ in top]
+                )
+            }
+        return [
+            LexicalHit(id=rows[doc][0], score=min(score / best, 1.0), text=rows[doc][1], metadata=json.loads(rows[doc][2]))
+            for doc, score in top
+        ]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Document]], k: int) -> List[Document]:
+    """Merge ranked lists by summing ``1 / (RRF_CONSTANT + rank)`` per document id."""
+    scores: Dict[str, float] = defaultdict(float)
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            scores[doc.id] += 1 / (RRF_CONSTANT + rank + 1)
+            documents.setdefault(doc.id, doc)
+    return [documents[doc_id] for doc_id in sorted(scores, key=scores.get, reverse=True)[:k]]
+
+
+# ======================================================
+# 🔹 Keeping the index in step with the vector store
+# ======================================================
+class LexicalIndexedStore(WrappedStore):
+    """Vector store whose writes and deletes are mirrored into a ``LexicalIndex``."""
+
+    def __init__(self, primary, index: LexicalIndex):
+        super().__init__(primary)
+        self.index = index
+
+    def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        ids = self.primary.add_embeddings(texts, embeddings, metadatas, ids)
+        try:
+            metadatas = metadatas or [{}] * len(texts)
+            self.index.add(ids, hydrate_texts(texts, metadatas), metadatas, payloads=texts)
+        except Exception as e:
+            logger.warning(f"⚠️ Lexical index update failed (run build_lexical_index to repair): {e}")
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        deleted = self.primary.delete(ids=ids, **kwargs)
+        if ids:
+            self.index.delete(ids)
+        return deleted
+
+
+def build_index(store, index: LexicalIndex, batch_size: int = 1000) -> int:
+    """Index every record of ``store`` (message payloads hydrated from the database)."""
+    total = 0
+    for page in store.iter_records(batch_size):
+        total += index.add(
+            page["ids"],
+            hydrate_texts(page["documents"], page["metadatas"]),
+            page["metadatas"],
+            payloads=page["documents"],
+        )
+    logger.info(f"🔤 Lexical index holds {index.count()} documents ({total} indexed now)")
+    return total
@@ -0,0 +1,232 @@
+"""
+Process-wide registry of ChatGroq clients.
+
+Building a ``ChatGroq`` creates a new Groq SDK client with its own HTTP
+connection pool, so constructing one per message paid DNS, TCP and TLS
+setup on every request. Clients are instead cached per
+``(model, temperature, max_tokens)`` and share one keep-alive pool per
+process. A client is rebuilt only when its ``AIModelConfig`` row changes:
+immediately in the process that saved it (signal) and within
+``LLM_CONFIG_CHECK_SECONDS`` everywhere else.
+
+Async connections are pooled per event loop (see ``LoopLocalTransport``),
+since the async views also run under WSGI, one event loop per request.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import httpx
+from django.conf import settings
+from django.db import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+GROQ_API_BASE = "https://api.groq.com"
+# Boot must not stall on an unreachable API
+PRECONNECT_TIMEOUT = 5.0
+
+ClientKey = Tuple[str, float, Optional[int]]
+
+
+class LoopLocalTransport(httpx.AsyncBaseTransport):
+    """
+    Async transport with one connection pool per event loop.
+
+    A pooled connection only works on the loop that opened it. An ASGI
+    server runs every request on one loop, but the WSGI server and
+    ``runserver`` run each async view on a new loop (``async_to_sync``)
+    that is closed afterwards. Pools of closed loops are dropped.
+    """
+
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._lock = threading.Lock()
+        self._transports: Dict[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport] = {}
+
+    def _transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for closed in [other for other in self._transports if other.is_closed()]:
+                del self._transports[closed]
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = self._transports[loop] = httpx.AsyncHTTPTransport(**self._kwargs)
+            return transport
+
+    def pools(self) -> int:
+        with self._lock:
+            return len(self._transports)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        with self._lock:
+            transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+class ChatClientRegistry:
+    """Thread-safe cache of chat model clients over shared HTTP pools."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clients: Dict[ClientKey, object] = {}
+        self._http_client = None
+        self._http_async_client = None
+        self._config_stamps: Optional[Dict[str, float]] = None
+        self._configs_checked = 0.0
+
+    # ------------------------------------------------------------------
+    # HTTP pools
+    # ------------------------------------------------------------------
+    def _limits(self):
+        return httpx.Limits(
+            max_connections=settings.GROQ_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.GROQ_MAX_CONNECTIONS,
+            keepalive_expiry=settings.GROQ_KEEPALIVE_SECONDS,
+        )
+
+    @property
+    def http_client(self):
+        with self._lock:
+            if self._http_client is None:
+                self._http_client = httpx.Client(limits=self._limits(), timeout=settings.GROQ_TIMEOUT)
+            return self._http_client
+
+    @property
+    def http_async_client(self):
+        # One client for every chat client; its connections are pooled per event loop
+        with self._lock:
+            if self._http_async_client is None:
+                self._http_async_client = httpx.AsyncClient(
+                    transport=LoopLocalTransport(limits=self._limits()),
+                    timeout=settings.GROQ_TIMEOUT,
+                )
+            return self._http_async_client
+
+    # ------------------------------------------------------------------
+    # Clients
+    # ------------------------------------------------------------------
+    def _api_key(self, model: str) -> Optional[str]:
+        from .models import AIModelConfig
+
+        try:
+            row = AIModelConfig.objects.filter(name=model).only("api_key").first()
+        except DatabaseError:
+            row = None
+        return (row.api_key if row and row.api_key else None) or os.getenv("GROQ_API_KEY")
+
+    def _build(self, key: ClientKey):
+        from langchain_groq import ChatGroq
+
+        model, temperature, max_tokens = key
+        logger.info(f"🔌 Building chat client for {model} (temperature={temperature}, max_tokens={max_tokens})")
+        return ChatGroq(
+            model=model,
+            api_key=self._api_key(model),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+        )
+
+    def get(self, model: str, temperature: float = 0.7, max_tokens: Optional[int] = None):
+        """Cached client for these parameters, built on first use."""
+        self._check_configs()
+        key = (model, float(temperature), max_tokens)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._clients[key] = self._build(key)
+        return client
+
+    def invalidate(self, model: Optional[str] = None) -> int:
+        """Drop the clients of ``model`` (all when None); the pools are kept."""
+        with self._lock:
+            keys = [key for key in self._clients if model is None or key[0] == model]
+            for key in keys:
+                del self._clients[key]
+        if keys:
+            logger.info(f"🔌 Dropped {len(keys)} chat client(s) for {model or 'every model'}")
+        return len(keys)
+
+    def _check_configs(self) -> None:
+        """Rebuild clients whose ``AIModelConfig`` row was saved by another process."""
+        now = time.monotonic()
+        if now - self._configs_checked < settings.LLM_CONFIG_CHECK_SECONDS:
+            return
+        self._configs_checked = now
+        from .models import AIModelConfig
+
+        try:
+            stamps = {
+                name: updated_at.timestamp()
+                for name, updated_at in AIModelConfig.objects.values_list("name", "updated_at")
+            }
+        except DatabaseError as e:
+            logger.warning(f"⚠️ Could not check AI model configs: {e}")
+            return
+        with self._lock:
+            previous, self._config_stamps = self._config_stamps, stamps
+        if previous is None:
+            return
+        for name in set(previous) | set(stamps):
+            if previous.get(name) != stamps.get(name):
+                self.invalidate(name)
+
+    # ------------------------------------------------------------------
+    # Boot
+    # ------------------------------------------------------------------
+    def warmup(self, keys: Iterable[ClientKey]) -> float:
+        """
+        Build the given clients and open a pooled connection to the API,
+        so the first message does not pay for DNS, TCP and TLS setup.
+        """
+        start = time.time()
+        for model, temperature, max_tokens in keys:
+            try:
+                self.get(model, temperature, max_tokens)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not build chat client for {model}: {e}")
+        try:
+            # Any response leaves an open TLS connection in the pool
+            self.http_client.get(
+                f"{GROQ_API_BASE}/openai/v1/models",
+                headers={"Authorization": f"Bearer {os.getenv('GROQ_API_KEY', '')}"},
+                timeout=PRECONNECT_TIMEOUT,
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not pre-connect to {GROQ_API_BASE}: {e}")
+        elapsed = round(time.time() - start, 2)
+        logger.info(f"🔥 Chat clients warmed up in {elapsed}s")
+        return elapsed
+
+    def close(self) -> None:
+        with self._lock:
+            self._clients.clear()
+            if self._http_client is not None:
+                self._http_client.close()
+            self._http_client = None
+            self._http_async_client = None
+
+
+chat_clients = ChatClientRegistry()
+
+
+def chat_model(model: str, temperature: float = 0.7, max_tokens: Optional[int] = None):
+    """Shared ChatGroq client for these parameters."""
+    return chat_clients.get(model, temperature, max_tokens)
+
+
+def config_changed(sender, instance, **kwargs) -> None:
+    """``post_save``/``post_delete`` receiver for ``AIModelConfig``."""
+    chat_clients.invalidate(instance.name)
@@ -0,0 +1,323 @@
+"""
+Maintenance for the RAG vector store: deduplication, TTL and quota
+eviction, and compact index rebuilds.
+
+Every user message is ingested, so without maintenance the store keeps
+every "hi" and "thanks" forever. ``run_maintenance`` plans removals from
+the stored records and vectors (nothing is re-embedded), deletes them in
+batches and can then rebuild the index without the deleted rows.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+from .text_normalization import normalize_text
+from .vector_stores import SHARED_USER_ID, collection_config, hydrate_texts, iter_collection, unwrap
+
+logger = logging.getLogger(__name__)
+
+DELETE_BATCH_SIZE = 500
+NEAR_DUPLICATE_BLOCK = 1024
+
+
+@dataclass
+class MaintenanceReport:
+    scanned: int = 0
+    exact_duplicates: int = 0
+    near_duplicates: int = 0
+    expired: int = 0
+    over_quota: int = 0
+    removed: int = 0
+    rebuilt: bool = False
+    bytes_before: int = 0
+    bytes_after: int = 0
+    dry_run: bool = False
+    removed_ids: Set[str] = field(default_factory=set, repr=False)
+
+    @property
+    def bytes_reclaimed(self) -> int:
+        return max(0, self.bytes_before - self.bytes_after)
+
+
+@dataclass
+class _Record:
+    id: str
+    text: str
+    user_id: Optional[int]
+    language: Optional[str]
+    created_at: float
+    vector: Optional[np.ndarray] = None
+
+
+# ======================================================
+# 🔹 Storage helpers
+# ======================================================
+def storage_path(store) -> Optional[Path]:
+    """Directory holding ``store`` on disk (None for in-memory stores)."""
+    path = getattr(store, "path", None)
+    if path is not None:
+        return Path(path)
+    client = getattr(store, "_client", None)
+    if client is not None:
+        persist_directory = client.get_settings().persist_directory
+        return Path(persist_directory) if persist_directory else None
+    return None
+
+
+def directory_size(path: Optional[Path]) -> int:
+    if path is None or not path.exists():
+        return 0
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def rebuild_index(store, batch_size: int = 1000) -> None:
+    """
+    Rewrite the store without its deleted rows.
+
+    The NumPy store compacts its matrix and sidecar in place. Chroma is
+    copied into a fresh collection built with the configured HNSW
+    parameters (``store.config``, see ``collection_config``) which then
+    takes over the original name; other processes holding the old
+    collection must reopen it, so run this while web workers are stopped.
+    """
+    store = unwrap(store)
+    if hasattr(store, "compact"):
+        store.compact()
+        return
+
+    client = store._client
+    source = store._collection
+    name = source.name
+    rebuild_name = f"{name}-rebuild"
+    try:
+        client.delete_collection(rebuild_name)
+    except Exception:
+        pass
+
+    config = getattr(store, "config", None) or collection_config(name)
+    target = client.create_collection(
+        rebuild_name,
+        metadata=source.metadata,
+        configuration={"hnsw": config.hnsw()},
+    )
+    for page in iter_collection(source, batch_size):
+        target.upsert(
+            ids=page["ids"],
+            embeddings=page["embeddings"],
+            documents=page["documents"],
+            metadatas=[meta or None for meta in page["metadatas"]],
+        )
+    client.delete_collection(name)
+    target.modify(name=name)
+    store._chroma_collection = target
+    logger.info(f"🧱 Rebuilt Chroma collection {name} with {target.count()} records")
+
+
+# ======================================================
+# 🔹 Planning
+# ======================================================
+def _load_records(store, with_vectors: bool, batch_size: int) -> List[_Record]:
+    records = []
+    for page in store.iter_records(batch_size):
+        # Id-only payloads are compared on the message text from the database
+        texts = hydrate_texts(page["documents"], page["metadatas"])
+        for index, doc_id in enumerate(page["ids"]):
+            metadata = page["metadatas"][index] or {}
+            vector = None
+            if with_vectors:
+                vector = np.asarray(page["embeddings"][index], dtype=np.float32)
+                norm = np.linalg.norm(vector)
+                vector = vector / norm if norm else vector
+            records.append(_Record(
+                id=doc_id,
+                text=texts[index] or "",
+                user_id=metadata.get("user_id"),
+                language=metadata.get("language"),
+                created_at=float(metadata.get("created_at") or 0),
+                vector=vector,
+            ))
+    return records
+
+
+def _near_duplicates(records: List[_Record], threshold: float) -> Set[str]:
+    """
+    Greedy near-duplicate removal within one partition, newest first.
+
+    A record is dropped when its cosine similarity to an already kept
+    (newer) record reaches ``threshold``. Work is done in blocks so memory
+    stays at ``NEAR_DUPLICATE_BLOCK`` rows against the kept matrix.
+    """
+    removed: Set[str] = set()
+    kept = np.empty((0, len(records[0].vector)), dtype=np.float32)
+    for start in range(0, len(records), NEAR_DUPLICATE_BLOCK):
+        block = records[start:start + NEAR_DUPLICATE_BLOCK]
+        vectors = np.stack([record.vector for record in block])
+        candidate = np.ones(len(block), dtype=bool)
+        if len(kept):
+            candidate &= (vectors @ kept.T).max(axis=1) < threshold
+        within = vectors @ vectors.T
+        keep_rows = []
+        for row in np.flatnonzero(candidate):
+            if keep_rows and within[row, keep_rows].max() >= threshold:
+                continue
+            keep_rows.append(row)
+        keep_set = set(keep_rows)
+        removed.update(record.id for row, record in enumerate(block) if row not in keep_set)
+        kept = np.concatenate([kept, vectors[keep_rows]])
+    return removed
+
+
+def plan_removals(
+    store,
+    dedup: bool = True,
+    near_threshold: Optional[float] = None,
+    ttl_days: Optional[float] = None,
+    max_per_user: Optional[int] = None,
+    now: Optional[float] = None,
+    batch_size: int = 1000,
+) -> MaintenanceReport:
+    """
+    Decide which records to remove without touching the store.
+
+    Rules apply in order: records older than ``ttl_days`` expire; within
+    each (user, language) partition exact duplicates of the normalized text
+    and then vectors at least ``near_threshold`` similar to a newer record
+    are dropped; finally each user keeps only the newest ``max_per_user``
+    records. The newest copy of a duplicate is always the one kept.
+    """
+    report = MaintenanceReport()
+    records = _load_records(store, with_vectors=bool(near_threshold), batch_size=batch_size)
+    report.scanned = len(records)
+    records.sort(key=lambda record: record.created_at, reverse=True)
+
+    if ttl_days:
+        cutoff = (now or time.time()) - ttl_days * 86400
+        expired = {record.id for record in records if record.created_at and record.created_at < cutoff}
+        report.expired = len(expired)
+        report.removed_ids |= expired
+        records = [record for record in records if record.id not in expired]
+
+    partitions: Dict[tuple, List[_Record]] = defaultdict(list)
+    for record in records:
+        partitions[(record.user_id, record.language)].append(record)
+
+    for partition in partitions.values():
+        if dedup:
+            seen = set()
+            unique = []
+            for record in partition:
+                key = normalize_text(record.text).casefold()
+                if key and key in seen:
+                    report.exact_duplicates += 1
+                    report.removed_ids.add(record.id)
+                else:
+                    seen.add(key)
+                    unique.append(record)
+            partition[:] = unique
+        if near_threshold and partition:
+            near = _near_duplicates(partition, near_threshold)
+            report.near_duplicates += len(near)
+            report.removed_ids |= near
+
+    if max_per_user:
+        per_user: Dict[int, int] = defaultdict(int)
+        for record in records:
+            if record.id in report.removed_ids or record.user_id in (None, SHARED_USER_ID):
+                continue
+            per_user[record.user_id] += 1
+            if per_user[record.user_id] > max_per_user:
+                report.over_quota += 1
+                report.removed_ids.add(record.id)
+
+    return report
+
+
+# ======================================================
+# 🔹 Running
+# ======================================================
+def run_maintenance(
+    store,
+    dedup: bool = True,
+    near_threshold: Optional[float] = None,
+    ttl_days: Optional[float] = None,
+    max_per_user: Optional[int] = None,
+    rebuild: bool = False,
+    dry_run: bool = False,
+    batch_size: int = 1000,
+) -> MaintenanceReport:
+    """Plan and apply removals, optionally rebuild, and report what was reclaimed."""
+    path = storage_path(store)
+    bytes_before = directory_size(path)
+    report = plan_removals(
+        store,
+        dedup=dedup,
+        near_threshold=near_threshold,
+        ttl_days=ttl_days,
+        max_per_user=max_per_user,
+        batch_size=batch_size,
+    )
+    report.bytes_before = report.bytes_after = bytes_before
+    report.dry_run = dry_run
+    if dry_run:
+        return report
+
+    from .reconcile import mark_evicted
+
+    ids = sorted(report.removed_ids)
+    for start in range(0, len(ids), DELETE_BATCH_SIZE):
+        batch = ids[start:start + DELETE_BATCH_SIZE]
+        store.delete(ids=batch)
+        # Otherwise the next re-index or reconcile pass would add them back
+        mark_evicted(batch)
+    report.removed = len(ids)
+
+    if rebuild and (ids or hasattr(store, "compact")):
+        rebuild_index(store, batch_size)
+        report.rebuilt = True
+    report.bytes_after = directory_size(path)
+
+    logger.info(
+        f"🧹 Vector store maintenance: removed {report.removed}/{report.scanned} "
+        f"(exact {report.exact_duplicates}, near {report.near_duplicates}, "
+        f"expired {report.expired}, quota {report.over_quota}), "
+        f"reclaimed {report.bytes_reclaimed} bytes"
+    )
+    return report
+
+
+def maintenance_options() -> Dict:
+    """Default ``run_maintenance`` options from settings."""
+    from django.conf import settings
+
+    return {
+        "dedup": settings.RAG_DEDUP_ENABLED,
+        "near_threshold": settings.RAG_DEDUP_NEAR_THRESHOLD or None,
+        "ttl_days": settings.RAG_TTL_DAYS or None,
+        "max_per_user": settings.RAG_MAX_DOCUMENTS_PER_USER or None,
+        "rebuild": settings.RAG_MAINTENANCE_REBUILD,
+    }
+
+
+def start_periodic_maintenance(interval_hours: float) -> threading.Thread:
+    """Run ``run_maintenance`` on the shared store every ``interval_hours`` in a daemon thread."""
+    from .background import start_periodic
+
+    def job():
+        from .ai_service import resources
+
+        resources.ingestion.flush()
+        run_maintenance(resources.vector_store, **maintenance_options())
+
+    return start_periodic("rag-maintenance", interval_hours * 3600, job)
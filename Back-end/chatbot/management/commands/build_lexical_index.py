@@ -0,0 +1,25 @@
+"""
+Management command to fill the BM25 lexical index from the vector store
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from chatbot.ai_service import resources
+from chatbot.lexical_index import build_index
+
+
+class Command(BaseCommand):
+    help = ('Index the text of every vector store record for lexical retrieval '
+            '(RAG_RETRIEVAL_MODE=lexical_first or hybrid keeps it up to date afterwards)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Empty the index first')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        index = resources.lexical_index
+        if options['rebuild']:
+            index.clear()
+        self.stdout.write(f'Indexing into {settings.RAG_LEXICAL_INDEX_PATH}...')
+        total = build_index(resources.vector_store, index, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Indexed {total} records ({index.count()} in the index)'))
@@ -0,0 +1,45 @@
+"""
+Management command to snapshot and restore the RAG Chroma collection
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from chatbot.vector_stores import (
+    build_chroma_client, snapshot_collection, snapshot_hnsw, restore_collection,
+)
+
+
+class Command(BaseCommand):
+    help = 'Save the Chroma memory collection (vectors included) to a directory, or restore it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['save', 'restore'])
+        parser.add_argument('path', help='Snapshot directory')
+        parser.add_argument('--collection', default=settings.CHROMA_COLLECTION_NAME)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        client = build_chroma_client()
+        name = options['collection']
+
+        if options['action'] == 'save':
+            try:
+                collection = client.get_collection(name)
+            except Exception:
+                raise CommandError(f'Collection "{name}" does not exist in {settings.CHROMA_PERSIST_DIR}')
+            total = snapshot_collection(collection, options['path'], options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'✓ Saved {total} records from "{name}" to {options["path"]}'))
+        else:
+            try:
+                hnsw = snapshot_hnsw(options['path'])
+            except FileNotFoundError:
+                raise CommandError(f'No snapshot found at {options["path"]}')
+            # A new collection gets the index parameters it was saved with
+            collection = client.get_or_create_collection(name, configuration={'hnsw': hnsw} if hnsw else None)
+            try:
+                total = restore_collection(collection, options['path'])
+            except FileNotFoundError:
+                raise CommandError(f'No snapshot found at {options["path"]}')
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Restored {total} records into "{name}" ({collection.count()} total)'
+            ))
@@ -0,0 +1,50 @@
+"""
+Management command to deduplicate, expire and compact the RAG vector store
+"""
+
+from django.core.management.base import BaseCommand
+from chatbot.ai_service import resources
+from chatbot.maintenance import maintenance_options, run_maintenance
+
+
+class Command(BaseCommand):
+    help = 'Remove duplicate, expired and over-quota documents from the vector store and rebuild its index'
+
+    def add_arguments(self, parser):
+        defaults = maintenance_options()
+        parser.add_argument('--no-dedup', action='store_true', help='Keep exact duplicates')
+        parser.add_argument('--near-threshold', type=float, default=defaults['near_threshold'] or 0,
+                            help='Cosine similarity at which documents count as near-duplicates (0 = off)')
+        parser.add_argument('--ttl-days', type=float, default=defaults['ttl_days'] or 0,
+                            help='Evict documents older than this many days (0 = off)')
+        parser.add_argument('--max-per-user', type=int, default=defaults['max_per_user'] or 0,
+                            help='Keep only the newest N documents per user (0 = off)')
+        parser.add_argument('--rebuild', action='store_true', default=defaults['rebuild'],
+                            help='Rebuild the index without deleted rows (stop web workers first for Chroma)')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be removed')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        report = run_maintenance(
+            resources.vector_store,
+            dedup=not options['no_dedup'] and maintenance_options()['dedup'],
+            near_threshold=options['near_threshold'] or None,
+            ttl_days=options['ttl_days'] or None,
+            max_per_user=options['max_per_user'] or None,
+            rebuild=options['rebuild'],
+            dry_run=options['dry_run'],
+            batch_size=options['batch_size'],
+        )
+
+        self.stdout.write(f'Scanned: {report.scanned}')
+        self.stdout.write(f'Exact duplicates: {report.exact_duplicates}')
+        self.stdout.write(f'Near duplicates: {report.near_duplicates}')
+        self.stdout.write(f'Expired: {report.expired}')
+        self.stdout.write(f'Over quota: {report.over_quota}')
+        if report.dry_run:
+            self.stdout.write(self.style.SUCCESS(f'✓ Dry run: {len(report.removed_ids)} vectors would be removed'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Removed {report.removed} vectors, reclaimed {report.bytes_reclaimed / 1024:.1f} KiB'
+            + (' (index rebuilt)' if report.rebuilt else '')
+        ))
@@ -0,0 +1,62 @@
+"""
+Management command to copy the RAG memory between vector store backends
+"""
+
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from chatbot.ai_service import resources
+from chatbot.numpy_store import STORAGE_DTYPES, compressed_copy
+from chatbot.vector_stores import build_vector_store, copy_vector_store
+
+BACKENDS = ['chroma', 'numpy']
+
+
+class Command(BaseCommand):
+    help = 'Copy stored vectors between backends (e.g. Chroma → NumPy) to benchmark them on the same data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=BACKENDS, default='chroma')
+        parser.add_argument('--target', choices=BACKENDS, default='numpy')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dtype', choices=STORAGE_DTYPES,
+                            help='NumPy target only: storage dtype (default NUMPY_STORE_DTYPE)')
+        parser.add_argument('--pca-dim', type=int,
+                            help='NumPy target only: project vectors to this many dimensions with a fitted PCA')
+        parser.add_argument('--pca-sample', type=int, default=10000,
+                            help='Number of stored vectors the PCA is fitted on')
+
+    def handle(self, *args, **options):
+        if options['source'] == options['target']:
+            raise CommandError('Source and target backends must differ.')
+        compress = options['dtype'] or options['pca_dim']
+        if compress and options['target'] != 'numpy':
+            raise CommandError('--dtype and --pca-dim only apply to a NumPy target.')
+
+        # Vectors are copied as stored; the embedding model is only needed for text queries
+        embeddings = resources.embeddings
+        source = build_vector_store(embeddings, options['source'])
+
+        start = time.time()
+        if compress:
+            try:
+                target = compressed_copy(
+                    source,
+                    settings.NUMPY_STORE_DIR,
+                    embeddings,
+                    dtype=options['dtype'] or settings.NUMPY_STORE_DTYPE,
+                    pca_dim=options['pca_dim'],
+                    rescore=settings.NUMPY_STORE_RESCORE,
+                    sample_size=options['pca_sample'],
+                    batch_size=options['batch_size'],
+                )
+            except ValueError as e:
+                raise CommandError(str(e))
+            total = target.count()
+        else:
+            target = build_vector_store(embeddings, options['target'])
+            total = copy_vector_store(source, target, options['batch_size'])
+        elapsed = time.time() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Copied {total} records from {options["source"]} to {options["target"]} in {elapsed:.1f}s'
+        ))
@@ -0,0 +1,60 @@
+"""
+Management command to compare an embedding backend against the PyTorch baseline
+"""
+
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from chatbot.embeddings import EMBEDDING_BACKENDS, build_local_embeddings, cosine_drift
+
+SAMPLE_SENTENCES = [
+    "Hello, how are you today?",
+    "Can you summarize our previous conversation about machine learning?",
+    "What is the difference between a list and a tuple in Python?",
+    "I need help resetting my password.",
+    "Translate this paragraph into Arabic, please.",
+    "مرحبا، كيف يمكنني مساعدتك اليوم؟",
+    "ما هي أفضل طريقة لتعلم البرمجة؟",
+    "شكرا جزيلا على المساعدة",
+]
+
+
+class Command(BaseCommand):
+    help = 'Report cosine drift and encode time of an embedding backend versus torch fp32'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', choices=EMBEDDING_BACKENDS, default='onnx-int8')
+        parser.add_argument('--file', help='Text file with one sentence per line (defaults to built-in samples)')
+        parser.add_argument('--max-drift', type=float, default=0.02,
+                            help='Fail if the maximum drift (1 - cosine) exceeds this value')
+
+    def _encode(self, backend, sentences):
+        embeddings = build_local_embeddings(settings.EMBEDDING_MODEL_NAME, backend=backend)
+        embeddings.embed_documents(sentences[:1])  # exclude one-off session setup from timing
+        start = time.time()
+        vectors = embeddings.embed_documents(sentences)
+        return vectors, time.time() - start
+
+    def handle(self, *args, **options):
+        sentences = SAMPLE_SENTENCES
+        if options['file']:
+            with open(options['file'], encoding='utf-8') as f:
+                sentences = [line.strip() for line in f if line.strip()]
+        if not sentences:
+            raise CommandError('No sentences to compare.')
+
+        backend = options['backend']
+        self.stdout.write(f'Encoding {len(sentences)} sentences with torch and {backend}...')
+        reference, reference_time = self._encode('torch', sentences)
+        candidate, candidate_time = self._encode(backend, sentences)
+        report = cosine_drift(reference, candidate)
+
+        self.stdout.write(f'  torch:      {reference_time * 1000:.1f} ms')
+        self.stdout.write(f'  {backend}: {candidate_time * 1000:.1f} ms '
+                          f'({reference_time / max(candidate_time, 1e-9):.2f}x)')
+        self.stdout.write(f'  mean cosine: {report["mean_cosine"]:.5f}  min cosine: {report["min_cosine"]:.5f}')
+        self.stdout.write(f'  mean drift:  {report["mean_drift"]:.5f}  max drift:  {report["max_drift"]:.5f}')
+
+        if report['max_drift'] > options['max_drift']:
+            raise CommandError(f'Max drift {report["max_drift"]:.5f} exceeds {options["max_drift"]}')
+        self.stdout.write(self.style.SUCCESS(f'✓ {backend} is within {options["max_drift"]} of torch'))
@@ -0,0 +1,78 @@
+"""
+Management command to measure recall@k of compressed vector layouts
+"""
+
+import tempfile
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from chatbot.ai_service import resources
+from chatbot.numpy_store import RESCORE_FACTOR, compressed_copy, evaluate_recall
+
+
+class Command(BaseCommand):
+    help = ('Copy the vector store into float16/int8 (optionally PCA-projected) NumPy layouts and report '
+            'recall@k against exact float32 search, bytes per vector and search latency')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, default=10)
+        parser.add_argument('--queries', type=int, default=200,
+                            help='Number of stored vectors sampled as queries')
+        parser.add_argument('--dtypes', nargs='+', default=['float16', 'int8'],
+                            choices=['float32', 'float16', 'int8'])
+        parser.add_argument('--pca-dims', nargs='*', type=int, default=[],
+                            help='Also evaluate each dtype after a PCA to these dimensions')
+        parser.add_argument('--pca-sample', type=int, default=10000,
+                            help='Number of stored vectors the PCA is fitted on')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        embeddings = resources.embeddings
+        k = options['k']
+        with tempfile.TemporaryDirectory(prefix='vector-eval-') as tmp:
+            tmp = Path(tmp)
+            self.stdout.write('Copying the vector store into a float32 baseline...')
+            baseline = compressed_copy(resources.vector_store, str(tmp / 'baseline'), embeddings,
+                                       dtype='float32', rescore=False, batch_size=options['batch_size'])
+            if not baseline.count():
+                raise CommandError('The vector store is empty.')
+            queries = baseline.sample_vectors(options['queries'], seed=options['seed'])
+            _, baseline_latency = evaluate_recall(baseline, baseline, queries, k)
+
+            self.stdout.write(
+                f'{baseline.count()} vectors of {baseline.code_dim} dimensions, '
+                f'{len(queries)} queries, recall@{k}\n'
+            )
+            self.stdout.write(f'{"layout":<22}{"bytes/vector":>13}{"recall":>9}{"latency":>12}')
+            self.stdout.write(
+                f'{"float32 (exact)":<22}{baseline.bytes_per_vector:>13}{1.0:>9.3f}{baseline_latency:>9.2f} ms'
+            )
+
+            for pca_dim in [0] + options['pca_dims']:
+                for dtype in options['dtypes']:
+                    if not pca_dim and dtype == 'float32':
+                        continue
+                    name = f'{dtype}+pca{pca_dim}' if pca_dim else dtype
+                    try:
+                        variant = compressed_copy(
+                            baseline, str(tmp / name), embeddings, dtype=dtype, pca_dim=pca_dim or None,
+                            rescore=True, sample_size=options['pca_sample'], batch_size=options['batch_size'],
+                        )
+                    except ValueError as e:
+                        self.stdout.write(self.style.WARNING(f'{name:<22}skipped: {e}'))
+                        continue
+                    for rescore in (False, True):
+                        variant.rescore = rescore
+                        recall, latency = evaluate_recall(baseline, variant, queries, k)
+                        label = f'{name} + rescore' if rescore else name
+                        self.stdout.write(
+                            f'{label:<22}{variant.bytes_per_vector:>13}{recall:>9.3f}{latency:>9.2f} ms'
+                        )
+                    if pca_dim:
+                        explained = variant.projection.explained_variance
+                        self.stdout.write(f'{"":<22}PCA keeps {explained:.1%} of the variance')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Re-scoring reads {baseline.code_dim * 4} extra bytes per candidate from disk '
+            f'({k * RESCORE_FACTOR} candidates per query)'
+        ))
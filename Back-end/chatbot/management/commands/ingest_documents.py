@@ -0,0 +1,98 @@
+"""
+Management command to ingest documents into the RAG vector store
+"""
+
+import os
+import time
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from chatbot.models import Document
+from chatbot.documents import build_parse_pool, process_document
+
+
+class Command(BaseCommand):
+    help = 'Parse, chunk and embed .pdf/.docx/.txt files (or directories of them) into the vector store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Files or directories to ingest')
+        parser.add_argument('--user', help='Username or email owning the documents (default: shared knowledge)')
+        parser.add_argument('--language', choices=['en', 'ar'], default='en')
+        parser.add_argument('--workers', type=int, default=settings.DOCUMENT_PARSE_WORKERS,
+                            help='Parser processes (1 = parse in-process)')
+
+    def _collect(self, paths):
+        files = []
+        for raw in paths:
+            path = Path(raw)
+            if path.is_dir():
+                files.extend(sorted(
+                    p for p in path.rglob('*')
+                    if p.is_file() and p.suffix.lower() in settings.SUPPORTED_DOCUMENT_TYPES
+                ))
+            elif path.is_file():
+                files.append(path)
+            else:
+                raise CommandError(f'No such file or directory: {raw}')
+        return files
+
+    def _progress_printer(self):
+        reported = [0]
+
+        def report(fraction, chunks):
+            # One line per additional 10% of the document
+            step = int(fraction * 10)
+            if step > reported[0] and fraction < 1:
+                reported[0] = step
+                self.stdout.write(f'  {fraction:.0%} ({chunks} chunks)')
+        return report
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            User = get_user_model()
+            user = User.objects.filter(username=options['user']).first() \
+                or User.objects.filter(email=options['user']).first()
+            if user is None:
+                raise CommandError(f'User "{options["user"]}" not found')
+
+        files = self._collect(options['paths'])
+        if not files:
+            raise CommandError('No supported documents found')
+
+        pool = build_parse_pool(options['workers'])
+        start = time.time()
+        total_chunks = 0
+        failed = 0
+        try:
+            for index, path in enumerate(files, start=1):
+                document = Document.objects.create(
+                    user=user,
+                    name=path.name[:255],
+                    file_type=path.suffix.lower(),
+                    size=os.path.getsize(path),
+                    language=options['language'],
+                )
+                self.stdout.write(f'[{index}/{len(files)}] {path} ({document.size / 1024:.0f} KiB)')
+                document_start = time.time()
+                process_document(document, str(path), pool=pool, on_progress=self._progress_printer())
+
+                if document.status == 'failed':
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'  ✗ {document.error}'))
+                    continue
+                total_chunks += document.chunk_count
+                elapsed = time.time() - document_start
+                self.stdout.write(self.style.SUCCESS(
+                    f'  ✓ {document.chunk_count} chunks in {elapsed:.1f}s '
+                    f'({document.chunk_count / max(elapsed, 1e-6):.0f} chunks/s)'
+                ))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Ingested {len(files) - failed}/{len(files)} documents, '
+            f'{total_chunks} chunks in {time.time() - start:.1f}s'
+        ))
@@ -0,0 +1,62 @@
+"""
+Management command to migrate the RAG memory to another embedding model
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from chatbot.embedding_versions import abort_migration, backfill, current_versions, start_migration
+from chatbot.models import EmbeddingVersion
+
+
+class Command(BaseCommand):
+    help = ('Show embedding versions, start a migration to another model, or backfill it now '
+            '(retrieval cuts over automatically at 100% coverage)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', metavar='MODEL',
+                            help='Start migrating to MODEL (normally started by changing EMBEDDING_MODEL_NAME)')
+        parser.add_argument('--backfill', action='store_true',
+                            help='Re-embed history into the migrating version until it cuts over')
+        parser.add_argument('--abort', action='store_true',
+                            help='Stop the migration (revert EMBEDDING_MODEL_NAME too, or it restarts)')
+        parser.add_argument('--rate', type=float, default=settings.RAG_BACKFILL_RATE,
+                            help='Documents re-embedded per second (0 = unthrottled)')
+        parser.add_argument('--batch-size', type=int, default=settings.RAG_BACKFILL_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['abort']:
+            if abort_migration():
+                self.stdout.write(self.style.SUCCESS('✓ Migration aborted; retrieval stays on the active model'))
+            else:
+                self.stdout.write('No migration in progress.')
+            return
+
+        if options['start']:
+            try:
+                version = start_migration(options['start'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f'✓ Migrating to {version.model_name}'))
+
+        if options['backfill']:
+            _, migrating = current_versions()
+            if migrating is None:
+                raise CommandError('No migration in progress.')
+            self.stdout.write(f'Backfilling {migrating.model_name} at up to {options["rate"] or "∞"} docs/s...')
+            report = backfill(rate=options['rate'], batch_size=options['batch_size'])
+            if not report.leased:
+                raise CommandError('Another process is backfilling this migration.')
+            self.stdout.write(f'Re-embedded {report.embedded} of {report.scanned} records scanned')
+            if report.cut_over:
+                self.stdout.write(self.style.SUCCESS(f'✓ Retrieval cut over to {migrating.model_name}'))
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f'Coverage {report.coverage:.1%}; run again to finish the migration'
+                ))
+
+        current_versions()
+        for version in EmbeddingVersion.objects.order_by('status', '-created_at'):
+            self.stdout.write(
+                f'{version.status:<10} {version.model_name:<50} {version.coverage:>7.1%} '
+                f'({version.backfilled} backfilled)'
+            )
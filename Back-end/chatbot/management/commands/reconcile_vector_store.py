@@ -0,0 +1,35 @@
+"""
+Management command to reconcile the vector store with the Message table
+"""
+
+from django.core.management.base import BaseCommand
+from chatbot.reconcile import ReconcileState, reconcile
+from django.conf import settings
+
+
+class Command(BaseCommand):
+    help = 'Embed messages missing from the vector store and delete vectors whose messages are gone'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.RAG_RECONCILE_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, default=5,
+                            help='Bounded work per run: batches of new messages to check')
+        parser.add_argument('--state', default=settings.RAG_RECONCILE_STATE_PATH,
+                            help='File holding the watermark and orphan-scan cursor')
+        parser.add_argument('--reset', action='store_true',
+                            help='Start again from the first message (re-checks the whole table over several runs)')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            ReconcileState().save(options['state'])
+
+        report = reconcile(
+            state_path=options['state'],
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Checked {report.checked} messages, added {report.added} missing; '
+            f'scanned {report.scanned} vectors, removed {report.orphans_removed} orphans '
+            f'(watermark {report.watermark})'
+        ))
@@ -0,0 +1,113 @@
+"""
+Management command to rebuild the RAG vector store from the Message table
+"""
+
+import datetime
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from chatbot.ai_service import INDEXED_ROLES, resources
+from chatbot.reindex import Checkpoint, EmbeddingPool, message_queryset, reindex_messages
+
+
+def parse_moment(value):
+    """Parse YYYY-MM-DD or an ISO datetime into an aware datetime"""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'Invalid date "{value}"; use YYYY-MM-DD or an ISO datetime')
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+class Command(BaseCommand):
+    help = 'Re-embed messages from the database into the vector store (resumable, filterable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username or email to re-index')
+        parser.add_argument('--since', help='Only messages created at or after this date')
+        parser.add_argument('--until', help='Only messages created before this date')
+        parser.add_argument('--language', choices=['en', 'ar'])
+        parser.add_argument('--roles', default=','.join(INDEXED_ROLES),
+                            help='Comma-separated message roles to index (default: the roles send_message indexes)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Embedding processes, each loading the model (1 = in-process)')
+        parser.add_argument('--batch-size', type=int, default=512, help='Messages per upsert')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per database round trip')
+        parser.add_argument('--checkpoint', default=str(Path(settings.BASE_DIR) / 'reindex_checkpoint.json'))
+        parser.add_argument('--resume', action='store_true', help='Continue after the checkpoint')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            User = get_user_model()
+            user = User.objects.filter(username=options['user']).first() \
+                or User.objects.filter(email=options['user']).first()
+            if user is None:
+                raise CommandError(f'User "{options["user"]}" not found')
+
+        filters = {
+            'user': user.pk if user else None,
+            'since': options['since'],
+            'until': options['until'],
+            'language': options['language'],
+            'roles': sorted(role.strip() for role in options['roles'].split(',') if role.strip()),
+        }
+        checkpoint_path = Path(options['checkpoint'])
+        if options['resume'] and checkpoint_path.exists():
+            try:
+                checkpoint = Checkpoint.load(checkpoint_path, filters)
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(f'Resuming after message {checkpoint.last_id} ({checkpoint.indexed} already indexed)')
+        else:
+            checkpoint = Checkpoint(checkpoint_path, filters)
+
+        queryset = message_queryset(
+            user=user,
+            since=parse_moment(options['since']) if options['since'] else None,
+            until=parse_moment(options['until']) if options['until'] else None,
+            language=options['language'],
+            roles=filters['roles'],
+            after_id=checkpoint.last_id,
+        )
+        total = queryset.count()
+        self.stdout.write(f'Re-indexing {total} messages with {options["workers"]} worker(s)')
+        if not total:
+            self.stdout.write(self.style.SUCCESS('✓ Nothing to do'))
+            return
+
+        def progress(done, elapsed):
+            rate = done / max(elapsed, 1e-6)
+            eta = datetime.timedelta(seconds=int((total - done) / rate)) if rate else '?'
+            self.stdout.write(f'  {done}/{total} ({done / total:.0%}) {rate:.0f} docs/s ETA {eta}')
+
+        pool = None
+        if options['workers'] > 1:
+            # Workers embed; the parent only writes precomputed vectors
+            pool = EmbeddingPool(options['workers'])
+            store = resources.build_store(None)
+        else:
+            store = resources.vector_store
+        try:
+            written = reindex_messages(
+                store,
+                queryset,
+                checkpoint,
+                pool=pool,
+                embeddings=None if pool else resources.embeddings,
+                batch_size=options['batch_size'],
+                chunk_size=options['chunk_size'],
+                progress=progress,
+            )
+        finally:
+            if pool is not None:
+                pool.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Re-indexed {written} messages (last id {checkpoint.last_id}); checkpoint at {checkpoint_path}'
+        ))
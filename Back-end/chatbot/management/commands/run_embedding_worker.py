@@ -0,0 +1,53 @@
+"""
+Management command to run the shared embedding worker
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from chatbot.embedding_versions import active_model_name
+from chatbot.embeddings import build_local_embeddings
+from chatbot.embedding_worker import EmbeddingWorker
+
+
+class Command(BaseCommand):
+    help = 'Run one process that owns the embedding model and serves web workers over a Unix socket'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=settings.EMBEDDING_SERVICE_SOCKET,
+                            help='Unix socket path (defaults to EMBEDDING_SERVICE_SOCKET)')
+        parser.add_argument('--max-batch-size', type=int, default=settings.EMBEDDING_BATCH_MAX_SIZE)
+        parser.add_argument('--max-wait-ms', type=float, default=settings.EMBEDDING_BATCH_MAX_WAIT_MS)
+        parser.add_argument('--model', help='Embedding model to serve (defaults to the active embedding version)')
+
+    def handle(self, *args, **options):
+        socket_path = options['socket']
+        if not socket_path:
+            raise CommandError('No socket path given. Set EMBEDDING_SERVICE_SOCKET or pass --socket.')
+
+        model_name = options['model'] or active_model_name()
+        self.stdout.write(f'Loading embedding model {model_name}...')
+        worker = EmbeddingWorker(
+            socket_path,
+            build_local_embeddings(model_name),
+            max_batch_size=options['max_batch_size'],
+            max_wait_ms=options['max_wait_ms'],
+            model_name=model_name,
+        )
+        worker.start()
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Embedding worker listening on {socket_path} '
+            f'(batch ≤ {options["max_batch_size"]}, wait ≤ {options["max_wait_ms"]}ms)'
+        ))
+
+        try:
+            worker.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.close()
+            batcher = worker.batcher
+            if batcher.batches:
+                self.stdout.write(
+                    f'Served {batcher.texts} texts in {batcher.batches} batches '
+                    f'(avg {batcher.texts / batcher.batches:.1f} per batch)'
+                )
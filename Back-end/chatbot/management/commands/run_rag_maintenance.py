@@ -0,0 +1,28 @@
+"""
+Management command to run the periodic vector store jobs in their own process
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from chatbot.background import start_background_jobs
+
+
+class Command(BaseCommand):
+    help = ('Run the periodic maintenance, reconcile and embedding backfill jobs enabled in settings '
+            'in the foreground (each job is still run by one process at a time)')
+
+    def handle(self, *args, **options):
+        threads = start_background_jobs()
+        if not threads:
+            raise CommandError(
+                'No background job enabled. Set RAG_MAINTENANCE_INTERVAL_HOURS, '
+                'RAG_RECONCILE_INTERVAL_MINUTES or RAG_BACKFILL_INTERVAL_SECONDS.'
+            )
+        self.stdout.write(self.style.SUCCESS(f'✓ Running {", ".join(threads)} (Ctrl+C to stop)'))
+
+        try:
+            while all(thread.is_alive() for thread in threads.values()):
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
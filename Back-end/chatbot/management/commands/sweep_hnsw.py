@@ -0,0 +1,82 @@
+"""
+Management command to sweep HNSW parameters on the real corpus
+"""
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from chatbot.ai_service import resources
+from chatbot.index_tuning import load_vectors, recommend, sweep
+from chatbot.vector_stores import store_config
+
+
+class Command(BaseCommand):
+    help = ('Build throwaway HNSW indexes of the stored vectors at several (M, ef_construction, ef_search) '
+            'points and report recall@k against brute force, p50/p99 query latency and index size')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, default=None,
+                            help='Neighbours per query (default: the collection top_k)')
+        parser.add_argument('--queries', type=int, default=200,
+                            help='Number of stored vectors sampled as queries')
+        parser.add_argument('--m', nargs='+', type=int, default=[8, 16, 32],
+                            help='max_neighbors (M) values')
+        parser.add_argument('--ef-construction', nargs='+', type=int, default=[100, 200])
+        parser.add_argument('--ef-search', nargs='+', type=int, default=[16, 32, 64, 128, 256])
+        parser.add_argument('--space', choices=['l2', 'cosine', 'ip'], default=None,
+                            help='Distance (default: the collection space)')
+        parser.add_argument('--limit', type=int, default=0,
+                            help='Use at most this many stored vectors (0 = all)')
+        parser.add_argument('--target-recall', type=float, default=0.95)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        store = resources.vector_store
+        config = store_config(store)
+        k = options['k'] or config.top_k
+        space = options['space'] or config.space
+
+        self.stdout.write('Loading stored vectors...')
+        vectors = load_vectors(store, options['limit'], options['batch_size'])
+        if not len(vectors):
+            raise CommandError('The vector store is empty.')
+        rng = np.random.default_rng(options['seed'])
+        queries = vectors[rng.choice(len(vectors), min(options['queries'], len(vectors)), replace=False)]
+
+        self.stdout.write(
+            f'{len(vectors)} vectors of {vectors.shape[1]} dimensions, {len(queries)} queries, '
+            f'recall@{k}, space {space}\n'
+        )
+        self.stdout.write(
+            f'{"M":>4}{"ef_constr":>11}{"ef_search":>11}{"recall":>9}{"p50":>11}{"p99":>11}'
+            f'{"index":>12}{"build":>10}'
+        )
+
+        def report(point):
+            self.stdout.write(
+                f'{point.max_neighbors:>4}{point.ef_construction:>11}{point.ef_search:>11}{point.recall:>9.3f}'
+                f'{point.p50_ms:>8.2f} ms{point.p99_ms:>8.2f} ms{point.index_bytes / 2 ** 20:>9.1f} MB'
+                f'{point.build_seconds:>8.1f} s'
+            )
+
+        points = sweep(
+            vectors, queries, k,
+            max_neighbors=options['m'],
+            ef_construction=options['ef_construction'],
+            ef_search=options['ef_search'],
+            space=space,
+            batch_size=options['batch_size'],
+            progress=report,
+        )
+
+        best = recommend(points, options['target_recall'])
+        if best is None:
+            self.stdout.write(self.style.WARNING(
+                f'No point reached recall {options["target_recall"]:.2f}; try larger --ef-search or --m'
+            ))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Fastest point with recall ≥ {options["target_recall"]:.2f}: '
+            f'CHROMA_HNSW_M={best.max_neighbors} CHROMA_HNSW_EF_CONSTRUCTION={best.ef_construction} '
+            f'CHROMA_HNSW_EF_SEARCH={best.ef_search} (recall {best.recall:.3f}, p99 {best.p99_ms:.2f} ms)'
+        ))
@@ -0,0 +1,69 @@
+"""
+Management command to train the retrieval gate classifier from chat history
+"""
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from chatbot.ai_service import resources
+from chatbot.models import Message
+from chatbot.retrieval_gate import label_turns, rule_decision, train_classifier
+from chatbot.vector_stores import store_config
+
+
+class Command(BaseCommand):
+    help = ('Label recent user turns by whether retrieval found relevant memory and fit the gate '
+            'classifier over their embeddings')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=5000, help='Most recent user turns to use')
+        parser.add_argument('--holdout', type=float, default=0.2, help='Fraction kept aside for the report')
+        parser.add_argument('--epochs', type=int, default=300)
+        parser.add_argument('--batch-size', type=int, default=64, help='Turns embedded per call')
+        parser.add_argument('--output', default=settings.RAG_GATE_MODEL_PATH)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        recent = Message.objects.filter(role='user').select_related('chat').order_by('-created_at')
+        # Turns the rules already decide never reach the classifier
+        messages = [m for m in recent[:options['limit']] if rule_decision(m.content) is None]
+        if not messages:
+            raise CommandError('No user turns left after the gate rules.')
+
+        self.stdout.write(f'Embedding {len(messages)} turns...')
+        embeddings = resources.embeddings
+        vectors = []
+        for start in range(0, len(messages), options['batch_size']):
+            batch = messages[start:start + options['batch_size']]
+            vectors.extend(embeddings.embed_documents([m.content for m in batch]))
+        vectors = np.asarray(vectors, dtype=np.float32)
+
+        store = resources.vector_store
+        config = store_config(store)
+        labels = label_turns(messages, vectors, store, config.top_k, config.score_threshold)
+        if labels.min() == labels.max():
+            raise CommandError(
+                f'Every turn is labelled {int(labels[0])} at score threshold {config.score_threshold}; '
+                f'nothing to learn.'
+            )
+        self.stdout.write(f'{int(labels.sum())} of {len(labels)} turns found relevant memory')
+
+        model_name = resources.embedding_model
+        order = np.random.default_rng(options['seed']).permutation(len(labels))
+        cut = int(len(order) * (1 - options['holdout']))
+        train, test = order[:cut], order[cut:]
+        if len(test) and labels[train].min() != labels[train].max():
+            classifier = train_classifier(vectors[train], labels[train], model_name, epochs=options['epochs'])
+            keep = np.array([
+                classifier.probability(vector) >= settings.RAG_GATE_MIN_PROBABILITY for vector in vectors[test]
+            ])
+            needed = labels[test] == 1
+            self.stdout.write(
+                f'Held-out at RAG_GATE_MIN_PROBABILITY={settings.RAG_GATE_MIN_PROBABILITY}: '
+                f'skips {1 - keep.mean():.1%} of turns, keeps {keep[needed].mean() if needed.any() else 1:.1%} '
+                f'of turns that needed memory, accuracy {(keep == needed).mean():.1%}'
+            )
+
+        classifier = train_classifier(vectors, labels, model_name, epochs=options['epochs'])
+        classifier.save(options['output'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Saved the gate classifier for {model_name} to {options["output"]}'))
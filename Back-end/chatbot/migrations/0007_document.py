@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0006_remove_usersummary_preferences_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Document',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Original file name', max_length=255)),
+                ('file_type', models.CharField(help_text='File extension, e.g. .pdf', max_length=10)),
+                ('size', models.BigIntegerField(default=0, help_text='File size in bytes')),
+                ('language', models.CharField(choices=[('en', 'English'), ('ar', 'Arabic')], default='en', help_text='Language the document is retrieved for', max_length=2)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('complete', 'Complete'), ('failed', 'Failed')], default='pending', help_text='Ingestion status', max_length=10)),
+                ('progress', models.FloatField(default=0.0, help_text='Fraction of the document ingested (0-1)')),
+                ('chunk_count', models.IntegerField(default=0, help_text='Number of chunks written to the vector store')),
+                ('error', models.TextField(blank=True, help_text='Error message if ingestion failed')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(blank=True, help_text='Owner of this document (empty for shared knowledge)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='documents', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='chatbot_doc_user_id_6506c9_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:21
+
+from django.db import migrations, models
+
+
+def create_original_version(apps, schema_editor):
+    # Existing collections were embedded with the model that used to be hard-coded in ai_service.py
+    EmbeddingVersion = apps.get_model('chatbot', 'EmbeddingVersion')
+    EmbeddingVersion.objects.get_or_create(
+        model_name='sentence-transformers/all-mpnet-base-v2',
+        defaults={'collection_key': '', 'status': 'active', 'coverage': 1.0},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0007_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmbeddingVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(help_text='Embedding model id, e.g. sentence-transformers/all-mpnet-base-v2', max_length=255, unique=True)),
+                ('collection_key', models.CharField(blank=True, help_text='Suffix of the collection name (empty for the original collection)', max_length=100)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('migrating', 'Migrating'), ('retired', 'Retired')], default='migrating', max_length=10)),
+                ('backfill_cursor', models.IntegerField(default=0, help_text='Position in the active store the backfill resumes from')),
+                ('backfilled', models.IntegerField(default=0, help_text='Records re-embedded by the backfill')),
+                ('coverage', models.FloatField(default=0.0, help_text='Fraction of the active store present in this version (0-1)')),
+                ('lease_owner', models.CharField(blank=True, max_length=100)),
+                ('lease_until', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('activated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['active', 'migrating'])), fields=('status',), name='one_embedding_version_per_status')],
+            },
+        ),
+        migrations.RunPython(create_original_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0008_embeddingversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='status',
+            field=models.CharField(choices=[('complete', 'Complete'), ('aborted', 'Aborted')], default='complete', help_text='Aborted replies hold the partial text generated before the client left', max_length=10),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0010_joblease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='evicted_at',
+            field=models.DateTimeField(blank=True, help_text='When vector store maintenance (dedup, TTL, quota) removed it; it is not re-indexed', null=True),
+        ),
+    ]
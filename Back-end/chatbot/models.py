@@ -73,6 +73,13 @@ class Message(models.Model):
         ('llama', 'LLaMA'),
         ('other', 'Other'),
     ]
+
+    STATUS_COMPLETE = 'complete'
+    STATUS_ABORTED = 'aborted'
+    STATUS_CHOICES = [
+        (STATUS_COMPLETE, 'Complete'),
+        (STATUS_ABORTED, 'Aborted'),
+    ]
     
     chat = models.ForeignKey(
         Chat,
@@ -108,6 +115,17 @@ class Message(models.Model):
         default=0.0,
         help_text="Time taken to generate response in seconds"
     )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_COMPLETE,
+        help_text="Aborted replies hold the partial text generated before the client left"
+    )
+    evicted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When vector store maintenance (dedup, TTL, quota) removed it; it is not re-indexed"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -232,3 +250,148 @@ class AIModelConfig(models.Model):
     def __str__(self):
         status = "Active" if self.is_active else "Inactive"
         return f"{self.name} ({status})"
+
+
+class Document(models.Model):
+    """
+    An uploaded document ingested into the RAG vector store in chunks.
+    Status and progress are updated while the document is processed.
+    """
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('complete', 'Complete'),
+        ('failed', 'Failed'),
+    ]
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='documents',
+        null=True,
+        blank=True,
+        help_text="Owner of this document (empty for shared knowledge)"
+    )
+    name = models.CharField(
+        max_length=255,
+        help_text="Original file name"
+    )
+    file_type = models.CharField(
+        max_length=10,
+        help_text="File extension, e.g. .pdf"
+    )
+    size = models.BigIntegerField(
+        default=0,
+        help_text="File size in bytes"
+    )
+    language = models.CharField(
+        max_length=2,
+        choices=Chat.LANGUAGE_CHOICES,
+        default='en',
+        help_text="Language the document is retrieved for"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='pending',
+        help_text="Ingestion status"
+    )
+    progress = models.FloatField(
+        default=0.0,
+        help_text="Fraction of the document ingested (0-1)"
+    )
+    chunk_count = models.IntegerField(
+        default=0,
+        help_text="Number of chunks written to the vector store"
+    )
+    error = models.TextField(
+        blank=True,
+        help_text="Error message if ingestion failed"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class EmbeddingVersion(models.Model):
+    """
+    A vector store collection embedded with one embedding model.
+    Exactly one version is active (used for retrieval); while another is
+    migrating, writes go to both and its history is backfilled.
+    """
+    
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('migrating', 'Migrating'),
+        ('retired', 'Retired'),
+    ]
+    
+    model_name = models.CharField(
+        max_length=255,
+        unique=True,
+        help_text="Embedding model id, e.g. sentence-transformers/all-mpnet-base-v2"
+    )
+    collection_key = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Suffix of the collection name (empty for the original collection)"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='migrating'
+    )
+    backfill_cursor = models.IntegerField(
+        default=0,
+        help_text="Position in the active store the backfill resumes from"
+    )
+    backfilled = models.IntegerField(
+        default=0,
+        help_text="Records re-embedded by the backfill"
+    )
+    coverage = models.FloatField(
+        default=0.0,
+        help_text="Fraction of the active store present in this version (0-1)"
+    )
+    lease_owner = models.CharField(max_length=100, blank=True)
+    lease_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    activated_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['status'],
+                condition=models.Q(status__in=['active', 'migrating']),
+                name='one_embedding_version_per_status',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.model_name} ({self.status})"
+
+
+class JobLease(models.Model):
+    """
+    Lease on a periodic background job: however many processes run the
+    job's timer, only the holder of the lease runs the job.
+    """
+    
+    name = models.CharField(max_length=100, unique=True)
+    owner = models.CharField(max_length=100, blank=True)
+    lease_until = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name} ({self.owner or 'free'})"
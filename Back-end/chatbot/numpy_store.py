@@ -0,0 +1,743 @@
+"""
+Memory-mapped NumPy vector store.
+
+A single-node alternative to Chroma for small and medium corpora:
+normalized vectors live in a memory-mapped ``.npy`` matrix, ids and
+metadata in an append-only JSONL sidecar, and search is an exact
+vectorized matrix-vector product followed by ``argpartition``.
+
+To cut memory the matrix can hold float16 or int8 codes (with a
+per-vector scale), optionally after a PCA projection to fewer
+dimensions. Such a store can keep a full-precision copy on disk and
+re-score a small candidate set exactly, so only the compact codes are
+scanned on every query.
+
+Several processes (web workers, management commands) can open the same
+directory: writes hold an exclusive ``flock`` on it and every instance
+catches up with the rows other processes appended before it writes or
+searches.
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single writing process only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STORAGE_DTYPES = ("float32", "float16", "int8")
+SEARCH_BLOCK_ROWS = 16384
+# Candidates re-scored against full-precision vectors, as a multiple of k
+RESCORE_FACTOR = 8
+
+
+# ======================================================
+# 🔹 Metadata filters (Chroma ``where`` syntax)
+# ======================================================
+_COMPARATORS: Dict[str, Callable[[np.ndarray, Any], np.ndarray]] = {
+    "$eq": lambda column, value: column == value,
+    "$ne": lambda column, value: column != value,
+    "$gt": lambda column, value: np.array([v is not None and v > value for v in column], dtype=bool),
+    "$gte": lambda column, value: np.array([v is not None and v >= value for v in column], dtype=bool),
+    "$lt": lambda column, value: np.array([v is not None and v < value for v in column], dtype=bool),
+    "$lte": lambda column, value: np.array([v is not None and v <= value for v in column], dtype=bool),
+    "$in": lambda column, value: np.isin(column, list(value)),
+    "$nin": lambda column, value: ~np.isin(column, list(value)),
+}
+
+
+def filter_mask(where: Optional[Dict], column: Callable[[str], np.ndarray], size: int) -> np.ndarray:
+    """Evaluate a Chroma-style ``where`` clause into a boolean row mask."""
+    mask = np.ones(size, dtype=bool)
+    if not where:
+        return mask
+    for key, condition in where.items():
+        if key == "$and":
+            for clause in condition:
+                mask &= filter_mask(clause, column, size)
+        elif key == "$or":
+            any_mask = np.zeros(size, dtype=bool)
+            for clause in condition:
+                any_mask |= filter_mask(clause, column, size)
+            mask &= any_mask
+        elif isinstance(condition, dict):
+            for operator, value in condition.items():
+                if operator not in _COMPARATORS:
+                    raise ValueError(f"Unsupported filter operator '{operator}'")
+                mask &= _COMPARATORS[operator](column(key), value)
+        else:
+            mask &= column(key) == condition
+    return mask
+
+
+# ======================================================
+# 🔹 Compression
+# ======================================================
+@dataclass
+class Projection:
+    """A fitted PCA projection: ``codes = (vector - mean) @ components.T``."""
+    mean: np.ndarray
+    components: np.ndarray
+    explained_variance: float = 1.0
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[0]
+
+    def save(self, path: Path) -> None:
+        tmp = path.with_name(path.stem + ".tmp.npz")
+        np.savez(tmp, mean=self.mean, components=self.components, explained_variance=self.explained_variance)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "Projection":
+        with np.load(path) as data:
+            return cls(data["mean"], data["components"], float(data["explained_variance"]))
+
+
+def fit_pca(vectors: np.ndarray, dim: int) -> Projection:
+    """Fit a ``dim``-component PCA on a sample of (normalized) vectors."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if not 0 < dim < vectors.shape[1]:
+        raise ValueError(f"PCA dimension must be between 1 and {vectors.shape[1] - 1}, got {dim}")
+    if len(vectors) < dim:
+        raise ValueError(f"Fitting {dim} components needs at least {dim} sample vectors, got {len(vectors)}")
+    mean = vectors.mean(axis=0)
+    _, singular, components = np.linalg.svd(vectors - mean, full_matrices=False)
+    variance = singular ** 2
+    explained = float(variance[:dim].sum() / variance.sum()) if variance.sum() else 1.0
+    return Projection(mean.astype(np.float32), components[:dim].astype(np.float32), explained)
+
+
+class _RowFile:
+    """A memory-mapped ``.npy`` array with one row per record that grows by doubling."""
+
+    def __init__(self, path: Path, dtype, width: int = 0):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.width = width
+        self.array: Optional[np.memmap] = np.load(path, mmap_mode="r+") if path.exists() else None
+
+    @property
+    def capacity(self) -> int:
+        return 0 if self.array is None else self.array.shape[0]
+
+    def reserve(self, count: int, rows: int) -> None:
+        if count + rows > self.capacity:
+            self._rewrite(np.arange(count), max(1024, self.capacity * 2, count + rows))
+
+    def compact(self, live: np.ndarray) -> None:
+        self._rewrite(live, max(1024, len(live)))
+
+    def write(self, start: int, values: np.ndarray) -> None:
+        self.array[start:start + len(values)] = values
+        self.array.flush()
+
+    def _rewrite(self, rows: np.ndarray, capacity: int) -> None:
+        tmp = self.path.with_name(self.path.stem + ".tmp.npy")
+        shape = (capacity, self.width) if self.width else (capacity,)
+        rewritten = np.lib.format.open_memmap(tmp, mode="w+", dtype=self.dtype, shape=shape)
+        for start in range(0, len(rows), SEARCH_BLOCK_ROWS):
+            block = rows[start:start + SEARCH_BLOCK_ROWS]
+            rewritten[start:start + len(block)] = self.array[block]
+        rewritten.flush()
+        del rewritten
+        self.array = None
+        os.replace(tmp, self.path)
+        self.array = np.load(self.path, mmap_mode="r+")
+
+
+# ======================================================
+# 🔹 Store
+# ======================================================
+class NumpyVectorStore(VectorStore):
+    """
+    Cosine search over a memory-mapped matrix.
+
+    Layout of ``path``:
+    - ``vectors.npy``: ``(capacity, dim)`` matrix of normalized vectors,
+      or of their float16/int8 codes
+    - ``scales.npy``: per-row scale of int8 codes
+    - ``pca.npz``: the PCA projection applied before encoding, if any
+    - ``full.npy``: float32 vectors for exact re-scoring (``rescore=True``
+      on a lossy layout)
+    - ``records.jsonl``: one ``{"id", "text", "metadata"}`` line per row,
+      plus ``{"delete": id}`` tombstones
+    - ``meta.json``: dimension, dtype, row count and layout flags
+
+    Writes are append-only; ``compact()`` rewrites the files without
+    deleted rows. The layout is fixed by the first write: ``dtype`` and
+    ``rescore`` of an existing store are read from ``meta.json``, and a
+    projection can only be set on an empty store.
+    """
+
+    def __init__(self, path: str, embedding: Embeddings, dtype: str = "float32", rescore: bool = False):
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported dtype '{dtype}'. Use one of {STORAGE_DTYPES}.")
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._embedding = embedding
+        self._lock = threading.RLock()
+        self._dtype = np.dtype(dtype)
+        self._dim: Optional[int] = None
+        self._count = 0
+        self._keep_full = rescore
+        self._projection: Optional[Projection] = None
+        self._files: Dict[str, _RowFile] = {}
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[Dict] = []
+        self._alive_buffer = np.zeros(1024, dtype=bool)
+        self._rows: Dict[str, int] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+        # ``(inode, size)`` of records.jsonl and the bytes of it applied to the state above
+        self._records_stamp: Optional[Tuple[int, int]] = None
+        self._records_offset = 0
+        self._lock_fd: Optional[int] = None
+        with self._file_lock(exclusive=False):
+            self._load()
+        # Re-score with the full-precision copy whenever there is one; can be toggled per instance
+        self.rescore = "full" in self._files
+
+    # ------------------------------------------------------
+    # Files
+    # ------------------------------------------------------
+    @property
+    def _records_file(self) -> Path:
+        return self.path / "records.jsonl"
+
+    @property
+    def _meta_file(self) -> Path:
+        return self.path / "meta.json"
+
+    @property
+    def _projection_file(self) -> Path:
+        return self.path / "pca.npz"
+
+    @property
+    def _matrix(self) -> Optional[np.memmap]:
+        return self._files["vectors"].array if "vectors" in self._files else None
+
+    @property
+    def lossy(self) -> bool:
+        """Whether stored codes only approximate the original vectors."""
+        return self._dtype != np.float32 or self._projection is not None
+
+    @property
+    def projection(self) -> Optional[Projection]:
+        return self._projection
+
+    @property
+    def code_dim(self) -> Optional[int]:
+        return self._projection.dim if self._projection is not None else self._dim
+
+    @property
+    def bytes_per_vector(self) -> int:
+        """Bytes scanned per row on every search (codes plus scale)."""
+        if self._dim is None:
+            return 0
+        return self.code_dim * self._dtype.itemsize + (4 if self._dtype == np.int8 else 0)
+
+    def _open_files(self) -> None:
+        self._files = {"vectors": _RowFile(self.path / "vectors.npy", self._dtype, self.code_dim)}
+        if self._dtype == np.int8:
+            self._files["scales"] = _RowFile(self.path / "scales.npy", np.float32)
+        if self._keep_full:
+            self._files["full"] = _RowFile(self.path / "full.npy", np.float32, self._dim)
+
+    # ------------------------------------------------------
+    # Sharing the directory between processes
+    # ------------------------------------------------------
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """``flock`` the store directory against other processes and instances."""
+        if fcntl is None:
+            yield
+            return
+        if self._lock_fd is None:
+            self._lock_fd = os.open(self.path / ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _stat_records(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self._records_file)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size
+
+    def _mark_read(self) -> None:
+        """The in-memory state matches the files (after a write under the exclusive lock)."""
+        self._records_stamp = self._stat_records()
+        self._records_offset = self._records_stamp[1] if self._records_stamp else 0
+
+    def _refresh(self) -> None:
+        """Apply what other processes wrote since the last read; needs the file lock."""
+        stamp = self._stat_records()
+        if stamp == self._records_stamp:
+            return
+        if stamp is None or self._records_stamp is None or stamp[0] != self._records_stamp[0] \
+                or stamp[1] < self._records_offset:
+            # First write elsewhere, or compacted (records.jsonl replaced): start over
+            first_write = self._dim is None
+            self._load()
+            if first_write:
+                self.rescore = "full" in self._files
+        else:
+            # Appending may have grown, and so replaced, the row files
+            self._open_files()
+            self._read_records()
+
+    def _catch_up(self) -> None:
+        """Before a read: a ``stat`` of records.jsonl, and a refresh if it changed."""
+        if self._stat_records() == self._records_stamp:
+            return
+        with self._lock, self._file_lock(exclusive=False):
+            self._refresh()
+
+    def _load(self) -> None:
+        """Read the whole store from disk, dropping any in-memory state."""
+        self._ids, self._texts, self._metadatas = [], [], []
+        self._alive_buffer = np.zeros(1024, dtype=bool)
+        self._rows, self._columns = {}, {}
+        self._records_stamp, self._records_offset, self._count = None, 0, 0
+        if self._projection_file.exists():
+            self._projection = Projection.load(self._projection_file)
+        if not self._meta_file.exists():
+            return
+        meta = json.loads(self._meta_file.read_text())
+        self._dim = meta["dim"]
+        self._dtype = np.dtype(meta["dtype"])
+        self._keep_full = meta.get("rescore", False)
+        self._open_files()
+        self._read_records()
+
+    def _read_records(self) -> None:
+        """Apply the records appended after ``_records_offset``."""
+        stamp = self._stat_records()
+        with open(self._records_file, "rb") as f:
+            f.seek(self._records_offset)
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Ignoring truncated record in {self._records_file}")
+                    break
+                self._records_offset += len(line)
+                if "delete" in record:
+                    row = self._rows.pop(record["delete"], None)
+                    if row is not None:
+                        self._alive[row] = False
+                    continue
+                self._append_record(record["id"], record["text"], record["metadata"])
+        self._records_stamp = stamp
+        # Vectors are flushed before their record is written, so every record has a row
+        self._count = len(self._ids)
+
+    def _write_meta(self) -> None:
+        tmp = self._meta_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "dim": self._dim,
+            "dtype": self._dtype.name,
+            "count": self._count,
+            "code_dim": self.code_dim,
+            "rescore": self._keep_full,
+        }))
+        os.replace(tmp, self._meta_file)
+
+    def set_projection(self, projection: Projection) -> None:
+        """Project vectors with a fitted PCA before encoding; only allowed on an empty store."""
+        with self._lock, self._file_lock(exclusive=True):
+            self._refresh()
+            if self._dim is not None:
+                raise ValueError("A projection can only be set before the first write")
+            projection.save(self._projection_file)
+            self._projection = projection
+
+    @property
+    def _alive(self) -> np.ndarray:
+        return self._alive_buffer[:len(self._ids)]
+
+    def _append_record(self, doc_id: str, text: str, metadata: Dict) -> int:
+        row = len(self._ids)
+        previous = self._rows.get(doc_id)
+        if previous is not None:
+            self._alive_buffer[previous] = False
+        if row >= len(self._alive_buffer):
+            self._alive_buffer = np.concatenate([self._alive_buffer, np.zeros(row, dtype=bool)])
+        self._ids.append(doc_id)
+        self._texts.append(text)
+        self._metadatas.append(metadata)
+        self._alive_buffer[row] = True
+        self._rows[doc_id] = row
+        self._columns.clear()
+        return row
+
+    def _column(self, key: str) -> np.ndarray:
+        column = self._columns.get(key)
+        if column is None or len(column) != len(self._metadatas):
+            column = np.empty(len(self._metadatas), dtype=object)
+            column[:] = [metadata.get(key) for metadata in self._metadatas]
+            self._columns[key] = column
+        return column
+
+    # ------------------------------------------------------
+    # Encoding
+    # ------------------------------------------------------
+    def _encode(self, vectors: np.ndarray) -> Dict[str, np.ndarray]:
+        codes = vectors
+        if self._projection is not None:
+            codes = (vectors - self._projection.mean) @ self._projection.components.T
+        encoded = {}
+        if self._dtype == np.int8:
+            scales = np.abs(codes).max(axis=1) / 127
+            scales[scales == 0] = 1.0
+            encoded["scales"] = scales.astype(np.float32)
+            codes = np.rint(codes / scales[:, None])
+        encoded["vectors"] = codes.astype(self._dtype)
+        if self._keep_full:
+            encoded["full"] = vectors
+        return encoded
+
+    def _decode(self, rows: np.ndarray) -> np.ndarray:
+        """Normalized float32 vectors of ``rows`` (exact if a full copy is kept)."""
+        if "full" in self._files:
+            return np.asarray(self._files["full"].array[rows], dtype=np.float32)
+        vectors = np.asarray(self._matrix[rows], dtype=np.float32)
+        if "scales" in self._files:
+            vectors = vectors * self._files["scales"].array[rows][:, None]
+        if self._projection is not None:
+            vectors = vectors @ self._projection.components + self._projection.mean
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1.0, norms)
+        return vectors
+
+    # ------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """Append precomputed vectors; an existing id is replaced (upsert)."""
+        if not texts:
+            return []
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1.0, norms)
+        ids = [doc_id or str(uuid.uuid4()) for doc_id in (ids or [None] * len(texts))]
+        metadatas = [dict(metadata or {}) for metadata in (metadatas or [None] * len(texts))]
+
+        with self._lock, self._file_lock(exclusive=True):
+            # Rows go after the last one any process wrote
+            self._refresh()
+            if self._dim is None:
+                if self._projection is not None and self._projection.mean.shape[0] != vectors.shape[1]:
+                    raise ValueError(
+                        f"Projection expects {self._projection.mean.shape[0]}-dim vectors, got {vectors.shape[1]}"
+                    )
+                self._dim = vectors.shape[1]
+                # A full-precision copy only helps when the codes are lossy
+                self._keep_full = self._keep_full and self.lossy
+                self.rescore = self._keep_full
+                self._open_files()
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(f"Expected {self._dim}-dim vectors, got {vectors.shape[1]}")
+            for name, values in self._encode(vectors).items():
+                self._files[name].reserve(self._count, len(texts))
+                self._files[name].write(self._count, values)
+            with open(self._records_file, "a", encoding="utf-8") as f:
+                for doc_id, text, metadata in zip(ids, texts, metadatas):
+                    f.write(json.dumps({"id": doc_id, "text": text, "metadata": metadata}) + "\n")
+                    self._append_record(doc_id, text, metadata)
+            self._count += len(texts)
+            self._write_meta()
+            self._mark_read()
+        return ids
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[Dict]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        return self.add_embeddings(texts, self._embedding.embed_documents(texts), metadatas, ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Tombstone ids; space is reclaimed by ``compact()``."""
+        if not ids:
+            return False
+        with self._lock, self._file_lock(exclusive=True):
+            self._refresh()
+            deleted = [doc_id for doc_id in ids if doc_id in self._rows]
+            if deleted:
+                with open(self._records_file, "a", encoding="utf-8") as f:
+                    for doc_id in deleted:
+                        f.write(json.dumps({"delete": doc_id}) + "\n")
+                        self._alive_buffer[self._rows.pop(doc_id)] = False
+                self._mark_read()
+        return bool(deleted)
+
+    def compact(self) -> int:
+        """
+        Rewrite vectors and sidecar without deleted rows; return rows reclaimed.
+
+        The files are replaced, so other processes reload the store on their
+        next read or write.
+        """
+        with self._lock, self._file_lock(exclusive=True):
+            self._refresh()
+            live = np.flatnonzero(self._alive[:self._count])
+            reclaimed = len(self._ids) - len(live)
+            if not reclaimed:
+                return 0
+            tmp_records = self._records_file.with_suffix(".tmp")
+            with open(tmp_records, "w", encoding="utf-8") as f:
+                for row in live:
+                    f.write(json.dumps({
+                        "id": self._ids[row], "text": self._texts[row], "metadata": self._metadatas[row],
+                    }) + "\n")
+
+            ids = [self._ids[row] for row in live]
+            texts = [self._texts[row] for row in live]
+            metadatas = [self._metadatas[row] for row in live]
+            for row_file in self._files.values():
+                row_file.compact(live)
+            os.replace(tmp_records, self._records_file)
+            self._ids, self._texts, self._metadatas = [], [], []
+            self._alive_buffer = np.zeros(max(1024, len(ids)), dtype=bool)
+            self._rows = {}
+            self._columns.clear()
+            for doc_id, text, metadata in zip(ids, texts, metadatas):
+                self._append_record(doc_id, text, metadata)
+            self._count = len(ids)
+            self._write_meta()
+            self._mark_read()
+        logger.info(f"🧹 Compacted {self.path}: reclaimed {reclaimed} rows")
+        return reclaimed
+
+    # ------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------
+    def count(self) -> int:
+        self._catch_up()
+        return int(self._alive[:self._count].sum())
+
+    def get_by_ids(self, ids: List[str], /) -> List[Document]:
+        self._catch_up()
+        rows = [self._rows[doc_id] for doc_id in ids if doc_id in self._rows]
+        return [self._document(row) for row in rows]
+
+    def existing_ids(self, ids: List[str]) -> set:
+        self._catch_up()
+        return {doc_id for doc_id in ids if doc_id in self._rows}
+
+    def iter_records(self, batch_size: int = 1000, offset: int = 0) -> Iterator[Dict[str, list]]:
+        """
+        Page through live rows (from ``offset``) in the same shape as ``Chroma.get``.
+
+        Embeddings of a lossy store are decoded approximations unless it
+        keeps a full-precision copy.
+        """
+        self._catch_up()
+        live = np.flatnonzero(self._alive[:self._count])
+        for start in range(offset, len(live), batch_size):
+            rows = live[start:start + batch_size]
+            yield {
+                "ids": [self._ids[row] for row in rows],
+                "embeddings": self._decode(rows),
+                "documents": [self._texts[row] for row in rows],
+                "metadatas": [self._metadatas[row] for row in rows],
+            }
+
+    def sample_vectors(self, size: int, seed: int = 0) -> np.ndarray:
+        """Decoded vectors of up to ``size`` random live rows."""
+        self._catch_up()
+        live = np.flatnonzero(self._alive[:self._count])
+        rows = np.random.default_rng(seed).choice(live, size=min(size, len(live)), replace=False)
+        return self._decode(np.sort(rows))
+
+    def _document(self, row: int) -> Document:
+        return Document(id=self._ids[row], page_content=self._texts[row], metadata=dict(self._metadatas[row]))
+
+    def search_rows(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k row indices and cosine scores among rows matching ``filter``.
+
+        Scores are computed on the stored codes; with ``rescore`` the best
+        ``RESCORE_FACTOR * k`` candidates are re-scored exactly against the
+        full-precision copy.
+        """
+        self._catch_up()
+        with self._lock:
+            count = self._count
+            if not count or self._matrix is None:
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+            mask = self._alive[:count] & filter_mask(filter, self._column, len(self._ids))[:count]
+            matrix = self._matrix
+            scales = self._files["scales"].array if "scales" in self._files else None
+            full = self._files["full"].array if self.rescore and "full" in self._files else None
+            projection = self._projection
+
+        query = np.asarray(embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        code_query, shift = query, 0.0
+        if projection is not None:
+            # q·x = q·mean + (C q)·codes for x = mean + codes C
+            code_query = projection.components @ query
+            shift = float(projection.mean @ query)
+        scores = np.full(count, -np.inf, dtype=np.float32)
+        for start in range(0, count, SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, count)
+            if mask[start:end].any():
+                block = np.asarray(matrix[start:end], dtype=np.float32) @ code_query
+                if scales is not None:
+                    block *= scales[start:end]
+                scores[start:end] = block + shift
+        scores[~mask] = -np.inf
+
+        k = min(k, int(mask.sum()))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        candidates = min(RESCORE_FACTOR * k, int(mask.sum())) if full is not None else k
+        top = np.argpartition(-scores, candidates - 1)[:candidates]
+        if full is not None:
+            # Sorted rows turn the gather into forward reads of the memory map
+            top = np.sort(top)
+            exact = np.asarray(full[top], dtype=np.float32) @ query
+            order = np.argsort(-exact)[:k]
+            return top[order], exact[order]
+        top = top[np.argsort(-scores[top])]
+        return top, scores[top]
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        rows, scores = self.search_rows(embedding, k, filter)
+        return [(self._document(row), float(score)) for row, score in zip(rows, scores)]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_relevance_scores(embedding, k, filter)]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[Dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_relevance_scores(
+            self._embedding.embed_query(query), k, filter
+        )
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[Dict] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Scores are already cosine similarities of normalized vectors
+        return lambda score: score
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[Dict]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        path: str = "numpy_store",
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        store = cls(path, embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
+
+
+# ======================================================
+# 🔹 Building and evaluating compressed copies
+# ======================================================
+def compressed_copy(
+    source,
+    path: str,
+    embedding: Embeddings,
+    dtype: str = "int8",
+    pca_dim: Optional[int] = None,
+    rescore: bool = True,
+    sample_size: int = 10000,
+    batch_size: int = 1000,
+) -> NumpyVectorStore:
+    """
+    Copy ``source`` into a new NumPy store at ``path`` with the given layout.
+
+    With ``pca_dim`` a PCA is first fitted on the first ``sample_size``
+    stored vectors. ``path`` must not already hold a store.
+    """
+    store = NumpyVectorStore(path, embedding, dtype=dtype, rescore=rescore)
+    if store.count():
+        raise ValueError(f"{path} already holds a vector store")
+    if pca_dim:
+        sample, sampled = [], 0
+        for page in source.iter_records(batch_size):
+            sample.append(np.asarray(page["embeddings"], dtype=np.float32))
+            sampled += len(sample[-1])
+            if sampled >= sample_size:
+                break
+        if not sample:
+            raise ValueError("Cannot fit a projection on an empty store")
+        vectors = np.concatenate(sample)[:sample_size]
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        store.set_projection(fit_pca(vectors, pca_dim))
+    for page in source.iter_records(batch_size):
+        store.add_embeddings(page["documents"], page["embeddings"], page["metadatas"], page["ids"])
+    return store
+
+
+def evaluate_recall(
+    baseline: NumpyVectorStore, candidate: NumpyVectorStore, queries: np.ndarray, k: int = 10
+) -> Tuple[float, float]:
+    """
+    Recall@k of ``candidate`` against the exact ``baseline`` neighbours,
+    and the candidate's mean search latency in milliseconds.
+    """
+    hits = expected = 0
+    elapsed = 0.0
+    for query in queries:
+        truth_rows, _ = baseline.search_rows(query, k)
+        truth = {baseline._ids[row] for row in truth_rows}
+        start = time.perf_counter()
+        rows, _ = candidate.search_rows(query, k)
+        elapsed += time.perf_counter() - start
+        hits += len(truth & {candidate._ids[row] for row in rows})
+        expected += len(truth)
+    return (hits / expected if expected else 1.0), 1000 * elapsed / max(1, len(queries))
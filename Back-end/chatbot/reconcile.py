@@ -0,0 +1,175 @@
+"""
+Incremental reconciliation between the ``Message`` table and the vector store.
+
+Ingestion happens after the LLM call and a failure there only logs, so
+some messages never reach the store; deleting a chat leaves its vectors
+behind. Each ``reconcile`` pass does a bounded amount of work:
+
+* messages above a persisted id watermark (and older than a grace period,
+  so in-flight async ingestion is not duplicated) are checked against the
+  store and the missing ones are embedded and upserted;
+* one page of stored vectors, at a persisted cursor that wraps around the
+  store, is checked for source rows that no longer exist and those
+  vectors are deleted.
+
+Repeated passes converge the index without a full rebuild.
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_MESSAGE_ID = re.compile(r"^message-(\d+)")
+
+
+@dataclass
+class ReconcileState:
+    """Watermark and orphan-scan cursor persisted between passes."""
+    watermark: int = 0
+    orphan_cursor: int = 0
+
+    @classmethod
+    def load(cls, path: Path) -> "ReconcileState":
+        try:
+            return cls(**json.loads(Path(path).read_text()))
+        except FileNotFoundError:
+            return cls()
+
+    def save(self, path: Path) -> None:
+        tmp = Path(path).with_suffix(".tmp")
+        tmp.write_text(json.dumps(asdict(self)))
+        os.replace(tmp, path)
+
+
+@dataclass
+class ReconcileReport:
+    checked: int = 0
+    added: int = 0
+    scanned: int = 0
+    orphans_removed: int = 0
+    watermark: int = 0
+
+
+def add_missing_messages(store, embeddings, state: ReconcileState, report: ReconcileReport,
+                         batch_size: int, max_batches: int, grace_seconds: float) -> None:
+    from .ai_service import INDEXED_ROLES, message_chunks, message_document_id, payload_text
+    from .models import Message
+
+    cutoff = timezone.now() - timedelta(seconds=grace_seconds)
+    for _ in range(max_batches):
+        batch = list(
+            Message.objects.filter(id__gt=state.watermark, role__in=INDEXED_ROLES, created_at__lt=cutoff,
+                                   status=Message.STATUS_COMPLETE, evicted_at=None)
+            .select_related("chat")
+            .only("id", "role", "content", "language", "created_at", "chat__id", "chat__user_id")
+            .order_by("id")[:batch_size]
+        )
+        if not batch:
+            return
+        report.checked += len(batch)
+        present = store.existing_ids([message_document_id(message.id) for message in batch])
+        missing = [
+            message for message in batch
+            if message_document_id(message.id) not in present and message.content.strip()
+        ]
+        if missing:
+            chunks = [chunk for message in missing for chunk in message_chunks(message)]
+            texts = [chunk.page_content for chunk in chunks]
+            store.add_embeddings(
+                texts=[payload_text(chunk) for chunk in chunks],
+                embeddings=embeddings.embed_documents(texts),
+                metadatas=[chunk.metadata for chunk in chunks],
+                ids=[chunk.id for chunk in chunks],
+            )
+            report.added += len(missing)
+        state.watermark = batch[-1].id
+
+
+def mark_evicted(document_ids) -> int:
+    """Flag the messages of removed ``message-N`` vectors so re-index and reconcile leave them out."""
+    from .models import Message
+
+    message_ids = {int(match.group(1)) for match in map(_MESSAGE_ID.match, document_ids) if match}
+    if not message_ids:
+        return 0
+    return Message.objects.filter(id__in=message_ids, evicted_at=None).update(evicted_at=timezone.now())
+
+
+def remove_orphans(store, state: ReconcileState, report: ReconcileReport, page_size: int) -> None:
+    from .models import Document, Message
+
+    page = next(iter(store.iter_records(page_size, offset=state.orphan_cursor)), None)
+    if page is None:
+        # End of the store: start the next sweep from the beginning
+        state.orphan_cursor = 0
+        return
+    report.scanned += len(page["ids"])
+
+    message_ids, document_ids = {}, {}
+    for doc_id, metadata in zip(page["ids"], page["metadatas"]):
+        metadata = metadata or {}
+        match = _MESSAGE_ID.match(doc_id)
+        if match:
+            message_ids[doc_id] = int(metadata.get("message_id") or match.group(1))
+        elif metadata.get("document_id") is not None:
+            document_ids[doc_id] = metadata["document_id"]
+
+    live_messages = set(Message.objects.filter(id__in=set(message_ids.values())).values_list("id", flat=True))
+    live_documents = set(Document.objects.filter(id__in=set(document_ids.values())).values_list("id", flat=True))
+    orphans = [doc_id for doc_id, message_id in message_ids.items() if message_id not in live_messages]
+    orphans += [doc_id for doc_id, document_id in document_ids.items() if document_id not in live_documents]
+    if orphans:
+        store.delete(ids=orphans)
+        report.orphans_removed += len(orphans)
+    state.orphan_cursor += len(page["ids"]) - len(orphans)
+
+
+def reconcile(
+    store=None,
+    embeddings=None,
+    state_path: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    max_batches: int = 5,
+    grace_seconds: Optional[float] = None,
+) -> ReconcileReport:
+    """Run one bounded reconciliation pass and persist its progress."""
+    if store is None or embeddings is None:
+        from .ai_service import resources
+        store = store or resources.vector_store
+        embeddings = embeddings or resources.embeddings
+    state_path = Path(state_path or settings.RAG_RECONCILE_STATE_PATH)
+    batch_size = batch_size or settings.RAG_RECONCILE_BATCH_SIZE
+    grace_seconds = settings.RAG_RECONCILE_GRACE_SECONDS if grace_seconds is None else grace_seconds
+
+    state = ReconcileState.load(state_path)
+    report = ReconcileReport()
+    try:
+        add_missing_messages(store, embeddings, state, report, batch_size, max_batches, grace_seconds)
+        remove_orphans(store, state, report, page_size=batch_size * max_batches)
+    finally:
+        state.save(state_path)
+    report.watermark = state.watermark
+    if report.added or report.orphans_removed:
+        logger.info(
+            f"🔄 Reconciled vector store: +{report.added} missing, -{report.orphans_removed} orphans "
+            f"(watermark {state.watermark})"
+        )
+    return report
+
+
+def start_periodic_reconcile(interval_minutes: float) -> threading.Thread:
+    """Run ``reconcile`` every ``interval_minutes`` in a daemon thread."""
+    from .background import start_periodic
+
+    return start_periodic("rag-reconcile", interval_minutes * 60, reconcile)
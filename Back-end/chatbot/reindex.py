@@ -0,0 +1,213 @@
+"""
+Full re-index of the RAG vector store from the ``Message`` table.
+
+Messages are streamed from the database in id order, split into chunks,
+embedded by a pool of worker processes (each holding its own copy of the
+embedding model) and upserted in large batches under their
+``message-<id>[-<chunk>]`` ids, so a run can be repeated or resumed from
+its checkpoint without duplicating vectors.
+"""
+
+import os
+import json
+import time
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# ======================================================
+# 🔹 Embedding pool
+# ======================================================
+_worker_embeddings = None
+
+
+def build_worker_embeddings():
+    """Default worker factory: set up Django and load the configured model."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "chatbot_backend.settings")
+    import django
+    django.setup()
+
+    from .embedding_versions import active_model_name
+    from .embeddings import build_embeddings
+    return build_embeddings(active_model_name())
+
+
+def _init_worker(factory: Callable) -> None:
+    global _worker_embeddings
+    _worker_embeddings = factory()
+
+
+def _embed_in_worker(texts: List[str]) -> List[List[float]]:
+    return _worker_embeddings.embed_documents(texts)
+
+
+class EmbeddingPool:
+    """
+    Process pool where every worker loads the embedding model once.
+
+    ``factory`` must be picklable (a module-level function or a
+    ``functools.partial``); workers are spawned, not forked, so they do
+    not inherit the parent's threads or open connections.
+    """
+
+    def __init__(self, workers: int, factory: Callable = build_worker_embeddings):
+        self.workers = workers
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(factory,),
+        )
+
+    def submit(self, texts: List[str]):
+        return self._executor.submit(_embed_in_worker, texts)
+
+    def close(self) -> None:
+        self._executor.shutdown()
+
+
+# ======================================================
+# 🔹 Checkpoints
+# ======================================================
+@dataclass
+class Checkpoint:
+    """Progress of a re-index run, saved after every upserted batch."""
+    path: Optional[Path]
+    filters: Dict = field(default_factory=dict)
+    last_id: int = 0
+    indexed: int = 0
+
+    @classmethod
+    def load(cls, path: Path, filters: Dict) -> "Checkpoint":
+        data = json.loads(Path(path).read_text())
+        if data.get("filters") != filters:
+            raise ValueError(
+                f"Checkpoint {path} was written with filters {data.get('filters')}, not {filters}"
+            )
+        return cls(Path(path), filters, data.get("last_id", 0), data.get("indexed", 0))
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "filters": self.filters,
+            "last_id": self.last_id,
+            "indexed": self.indexed,
+            "updated_at": datetime.now().isoformat(),
+        }))
+        os.replace(tmp, self.path)
+
+
+# ======================================================
+# 🔹 Re-index
+# ======================================================
+def message_queryset(
+    user=None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    language: Optional[str] = None,
+    roles: Optional[List[str]] = None,
+    after_id: int = 0,
+):
+    """Messages to index, in id order, with only the columns ingestion needs."""
+    from .models import Message
+
+    # Aborted replies are partial answers and stay out of retrieval, evicted
+    # messages were removed from it on purpose
+    queryset = Message.objects.filter(
+        id__gt=after_id, status=Message.STATUS_COMPLETE, evicted_at=None
+    ).select_related("chat").only(
+        "id", "role", "content", "language", "created_at", "chat__id", "chat__user_id"
+    )
+    if user is not None:
+        queryset = queryset.filter(chat__user=user)
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+    if until is not None:
+        queryset = queryset.filter(created_at__lt=until)
+    if language:
+        queryset = queryset.filter(language=language)
+    if roles:
+        queryset = queryset.filter(role__in=roles)
+    return queryset.order_by("id")
+
+
+def _batches(queryset, batch_size: int, chunk_size: int) -> Iterator[List]:
+    batch = []
+    for message in queryset.iterator(chunk_size=chunk_size):
+        if not message.content.strip():
+            continue
+        batch.append(message)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def reindex_messages(
+    store,
+    queryset,
+    checkpoint: Checkpoint,
+    pool: Optional[EmbeddingPool] = None,
+    embeddings=None,
+    batch_size: int = 512,
+    chunk_size: int = 2000,
+    progress: Optional[Callable[[int, float], None]] = None,
+) -> int:
+    """
+    Embed and upsert every message of ``queryset``; return how many were written.
+
+    With a pool, up to ``2 * workers`` batches are embedded concurrently
+    while finished batches are upserted in id order, and the checkpoint
+    only ever advances past fully written batches. Without a pool the
+    batches are embedded in-process with ``embeddings``.
+    ``progress(done, elapsed_seconds)`` is called after every batch.
+    """
+    from .ai_service import message_chunks, payload_text
+
+    start = time.time()
+    written = 0
+    pending = deque()
+
+    def write(batch, chunks, vectors):
+        nonlocal written
+        store.add_embeddings(
+            texts=[payload_text(chunk) for chunk in chunks],
+            embeddings=vectors,
+            metadatas=[chunk.metadata for chunk in chunks],
+            ids=[chunk.id for chunk in chunks],
+        )
+        written += len(batch)
+        checkpoint.last_id = batch[-1].id
+        checkpoint.indexed += len(batch)
+        checkpoint.save()
+        if progress:
+            progress(written, time.time() - start)
+
+    for batch in _batches(queryset, batch_size, chunk_size):
+        # Long messages become several chunks; all are embedded with their batch
+        chunks = [chunk for message in batch for chunk in message_chunks(message)]
+        texts = [chunk.page_content for chunk in chunks]
+        if pool is None:
+            write(batch, chunks, embeddings.embed_documents(texts))
+            continue
+        pending.append((batch, chunks, pool.submit(texts)))
+        if len(pending) >= 2 * pool.workers:
+            done_batch, done_chunks, future = pending.popleft()
+            write(done_batch, done_chunks, future.result())
+    while pending:
+        done_batch, done_chunks, future = pending.popleft()
+        write(done_batch, done_chunks, future.result())
+
+    logger.info(f"🔁 Re-indexed {written} messages in {time.time() - start:.1f}s")
+    return written
@@ -0,0 +1,31 @@
+"""
+Renderers for streaming endpoints
+"""
+
+import json
+from rest_framework.renderers import BaseRenderer
+
+
+def sse_event(event: str, data) -> bytes:
+    """Encode one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    ``text/event-stream`` renderer.
+
+    Streaming actions return a ``StreamingHttpResponse`` of ``sse_event``
+    frames themselves; this renderer lets content negotiation accept
+    ``Accept: text/event-stream`` and turns the regular error responses
+    of those actions (validation, auth, not found) into an ``error`` event.
+    """
+
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return sse_event("error", data)
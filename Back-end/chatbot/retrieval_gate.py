@@ -0,0 +1,262 @@
+"""
+Retrieval gate: decide per turn whether the vector store is worth querying.
+
+Acknowledgements, greetings, follow-ups about the previous answer and very
+short turns are answered from the chat history alone. The remaining turns
+go through an optional logistic classifier over the query embedding that
+was already computed for indexing, trained by ``train_retrieval_gate`` on
+whether past turns actually found relevant memory.
+"""
+
+import os
+import re
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .text_normalization import fold_text
+
+logger = logging.getLogger(__name__)
+
+# Log the skip counters every this many gated turns
+LOG_EVERY = 100
+
+SMALL_TALK = frozenset({
+    "hi", "hello", "hey", "thanks", "thank you", "thank you so much", "thanks a lot", "thx", "ty",
+    "ok", "okay", "k", "cool", "great", "nice", "good", "perfect", "awesome", "got it", "i see",
+    "yes", "no", "sure", "yep", "nope", "bye", "goodbye", "good night", "good morning",
+    "شكرا", "شكرا لك", "شكرا جزيلا", "مرحبا", "أهلا", "السلام عليكم", "تمام", "حسنا",
+    "نعم", "لا", "ممتاز", "جميل", "مع السلامة", "صباح الخير", "مساء الخير",
+})
+
+# Patterns match folded text (see ``fold_text``): no hamza on alef, ة written ه.
+
+# Turns that only refer to the previous answer
+_FOLLOW_UP = re.compile(
+    r"^(please |can you |could you )?(continue|go on|keep going|say (that|it) again|rephrase( that| it)?|"
+    r"explain (that|it|this)( again)?|what do you mean|make it (shorter|longer|simpler)|"
+    r"shorter|simpler|translate (that|it|this)|summari[sz]e (that|it|this)|tl ?dr)\b"
+    r"|^(اكمل|كمل|تابع|وضح ذلك|اشرح ذلك|ماذا تقصد|اختصر|ترجم ذلك|لخص ذلك)"
+)
+
+# Turns that ask for stored memory or documents, whatever their length
+_MEMORY = re.compile(
+    r"\b(remember|recall|earlier|last time|previously|you (said|told)|my (name|file|document)s?|"
+    r"document|file|upload(ed)?|pdf)\b"
+    r"|(تذكر|سابقا|من قبل|المره الماضيه|الملف|المستند|اسمي)"
+)
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+
+
+def normalize_turn(text: str) -> str:
+    """Folded text without punctuation, for the keyword rules."""
+    return " ".join(_PUNCTUATION.sub(" ", fold_text(text)).split())
+
+
+_SMALL_TALK = frozenset(normalize_turn(phrase) for phrase in SMALL_TALK)
+
+
+@dataclass(frozen=True)
+class GateDecision:
+    retrieve: bool
+    reason: str
+    probability: Optional[float] = None
+
+
+def rule_decision(text: str) -> Optional[GateDecision]:
+    """Decision of the length and keyword rules, or None when they leave it to the classifier."""
+    turn = normalize_turn(text)
+    if not turn:
+        return GateDecision(False, "blank")
+    if _MEMORY.search(turn):
+        return GateDecision(True, "memory")
+    if turn in _SMALL_TALK:
+        return GateDecision(False, "small_talk")
+    if _FOLLOW_UP.search(turn):
+        return GateDecision(False, "follow_up")
+    if len(turn.split()) < settings.RAG_GATE_MIN_WORDS:
+        return GateDecision(False, "short")
+    return None
+
+
+# ======================================================
+# 🔹 Classifier
+# ======================================================
+@dataclass
+class GateClassifier:
+    """Logistic regression over unit-normalized query embeddings."""
+
+    weights: np.ndarray
+    bias: float
+    model_name: str
+
+    def probability(self, embedding: List[float]) -> float:
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        return float(1.0 / (1.0 + np.exp(-(vector @ self.weights + self.bias))))
+
+    def save(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(f, weights=self.weights, bias=self.bias, model_name=self.model_name)
+
+    @classmethod
+    def load(cls, path: str) -> "GateClassifier":
+        with np.load(path) as data:
+            return cls(data["weights"].astype(np.float32), float(data["bias"]), str(data["model_name"]))
+
+
+def train_classifier(
+    vectors: np.ndarray,
+    labels: np.ndarray,
+    model_name: str,
+    epochs: int = 300,
+    learning_rate: float = 0.5,
+    l2: float = 1e-3,
+) -> GateClassifier:
+    """
+    Fit a class-balanced logistic regression with full-batch gradient descent.
+
+    ``labels`` is 1 for turns whose retrieval found relevant memory.
+    """
+    x = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    y = labels.astype(np.float32)
+    positives = max(float(y.sum()), 1.0)
+    negatives = max(float(len(y) - y.sum()), 1.0)
+    sample_weight = np.where(y == 1, len(y) / (2 * positives), len(y) / (2 * negatives))
+
+    weights = np.zeros(x.shape[1], dtype=np.float32)
+    bias = 0.0
+    for _ in range(epochs):
+        predicted = 1.0 / (1.0 + np.exp(-(x @ weights + bias)))
+        error = (predicted - y) * sample_weight
+        weights -= learning_rate * (x.T @ error / len(y) + l2 * weights)
+        bias -= learning_rate * float(error.mean())
+    return GateClassifier(weights.astype(np.float32), bias, model_name)
+
+
+def label_turns(
+    messages: Iterable,
+    vectors: np.ndarray,
+    store,
+    k: int,
+    score_threshold: float,
+) -> np.ndarray:
+    """
+    1 for each user turn whose search (own partition, own chunks excluded)
+    returns a hit at or above ``score_threshold``, else 0.
+    """
+    from .vector_stores import partition_filter, search_with_relevance
+
+    labels = []
+    for message, vector in zip(messages, vectors):
+        where = partition_filter(user_id=message.chat.user_id, language=message.language)
+        pairs = search_with_relevance(store, vector.tolist(), k=k + 1, filter=where)
+        relevant = [
+            relevance for doc, relevance in pairs
+            if (doc.metadata or {}).get("message_id") != message.id and relevance >= score_threshold
+        ]
+        labels.append(1 if relevant else 0)
+    return np.asarray(labels, dtype=np.int8)
+
+
+# ======================================================
+# 🔹 Gate
+# ======================================================
+class RetrievalGate:
+    """
+    Rule + classifier gate with per-process skip counters.
+
+    Thresholds are read from settings on every call; the classifier file is
+    reloaded when ``RAG_GATE_MODEL_PATH`` changes on disk.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._classifier: Optional[GateClassifier] = None
+        self._classifier_key: Optional[Tuple[str, float]] = None
+        self.counts: Counter = Counter()
+        self.empty = 0
+
+    def _load_classifier(self) -> Optional[GateClassifier]:
+        path = settings.RAG_GATE_MODEL_PATH
+        try:
+            key = (path, os.path.getmtime(path))
+        except OSError:
+            return None
+        with self._lock:
+            if key != self._classifier_key:
+                try:
+                    self._classifier = GateClassifier.load(path)
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning(f"⚠️ Could not load retrieval gate model {path}: {e}")
+                    self._classifier = None
+                self._classifier_key = key
+            return self._classifier
+
+    def check(
+        self,
+        text: str,
+        embedding: Optional[List[float]] = None,
+        model_name: Optional[str] = None,
+    ) -> GateDecision:
+        """Whether ``text`` should trigger retrieval, and why."""
+        if not settings.RAG_GATE_ENABLED:
+            return GateDecision(True, "disabled")
+        decision = rule_decision(text)
+        if decision is not None:
+            return decision
+
+        classifier = self._load_classifier() if embedding is not None else None
+        if classifier is not None and len(embedding) == len(classifier.weights) \
+                and model_name in (None, classifier.model_name):
+            probability = classifier.probability(embedding)
+            if probability < settings.RAG_GATE_MIN_PROBABILITY:
+                return GateDecision(False, "classifier", probability)
+            return GateDecision(True, "classifier", probability)
+        return GateDecision(True, "rules")
+
+    def record(self, decision: GateDecision, hits: int = 0) -> None:
+        """Count a decision; a retrieval with no hit above the score threshold counts as empty."""
+        with self._lock:
+            self.counts["retrieved" if decision.retrieve else "skipped"] += 1
+            self.counts[decision.reason] += 1
+            if decision.retrieve and not hits:
+                self.empty += 1
+            turns = self.counts["retrieved"] + self.counts["skipped"]
+        if turns % LOG_EVERY == 0:
+            stats = self.stats()
+            logger.info(
+                f"🚦 Retrieval gate: skipped {stats['skipped']}/{stats['turns']} turns "
+                f"({stats['skip_rate']:.0%}), {stats['empty']} retrievals found nothing"
+            )
+
+    def stats(self) -> Dict:
+        with self._lock:
+            turns = self.counts["retrieved"] + self.counts["skipped"]
+            return {
+                "turns": turns,
+                "retrieved": self.counts["retrieved"],
+                "skipped": self.counts["skipped"],
+                "skip_rate": round(self.counts["skipped"] / turns, 4) if turns else 0.0,
+                "empty": self.empty,
+                "reasons": {
+                    reason: count for reason, count in self.counts.items()
+                    if reason not in ("retrieved", "skipped")
+                },
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.counts.clear()
+            self.empty = 0
+
+
+retrieval_gate = RetrievalGate()
@@ -3,7 +3,10 @@ Serializers for chatbot models
 """
 
 from rest_framework import serializers
-from .models import Chat, Message, UserSummary, AIModelConfig
+import os
+from django.conf import settings
+from .models import Chat, Message, UserSummary, AIModelConfig, Document
+from .documents import missing_parser
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -16,9 +19,9 @@ class MessageSerializer(serializers.ModelSerializer):
         model = Message
         fields = [
             'id', 'chat', 'role', 'content', 'ai_model',
-            'language', 'tokens_used', 'response_time', 'created_at'
+            'language', 'tokens_used', 'response_time', 'status', 'created_at'
         ]
-        read_only_fields = ['id', 'created_at', 'tokens_used', 'response_time']
+        read_only_fields = ['id', 'created_at', 'tokens_used', 'response_time', 'status']
     
     def validate_role(self, value):
         """Ensure role is valid"""
@@ -121,6 +124,43 @@ class UserSummarySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
 
+class DocumentSerializer(serializers.ModelSerializer):
+    """Serializer for Document model"""
+    
+    class Meta:
+        model = Document
+        fields = [
+            'id', 'name', 'file_type', 'size', 'language', 'status',
+            'progress', 'chunk_count', 'error', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
+class DocumentUploadSerializer(serializers.Serializer):
+    """Serializer for uploading a document into the RAG knowledge base"""
+    
+    file = serializers.FileField()
+    language = serializers.ChoiceField(choices=['en', 'ar'], required=False)
+    
+    def validate_file(self, value):
+        """Ensure the file type is supported and the file is not too large"""
+        extension = os.path.splitext(value.name)[1].lower()
+        if extension not in settings.SUPPORTED_DOCUMENT_TYPES:
+            raise serializers.ValidationError(
+                f"Unsupported file type. Must be one of: {', '.join(settings.SUPPORTED_DOCUMENT_TYPES)}."
+            )
+        package = missing_parser(extension)
+        if package:
+            raise serializers.ValidationError(
+                f"{extension} files cannot be read on this server ({package} is not installed)."
+            )
+        if value.size > settings.MAX_DOCUMENT_SIZE:
+            raise serializers.ValidationError(
+                f"File too large. Maximum size is {settings.MAX_DOCUMENT_SIZE // (1024 * 1024)}MB."
+            )
+        return value
+
+
 class AIModelConfigSerializer(serializers.ModelSerializer):
     """Serializer for AIModelConfig (admin use)"""
     
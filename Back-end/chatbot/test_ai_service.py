@@ -0,0 +1,192 @@
+"""
+Unit tests for the AI service layer
+"""
+import threading
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from langchain_core.language_models import FakeListChatModel
+from chatbot import ai_service
+from chatbot.ai_service import RAGResources
+from chatbot.models import Message
+
+
+class TestRAGResources:
+    """Tests for the lazy RAG resource holder"""
+
+    def test_nothing_built_on_creation(self):
+        """Test that creating the holder does not build any resource"""
+        with patch.object(RAGResources, '_build_embeddings') as mock_build:
+            holder = RAGResources()
+            assert holder._embeddings is None
+            assert holder._vector_store is None
+            mock_build.assert_not_called()
+
+    def test_resource_built_once_across_threads(self):
+        """Test that concurrent first access builds the resource exactly once"""
+        calls = []
+
+        def slow_build(self):
+            calls.append(1)
+            time.sleep(0.05)
+            return object()
+
+        with patch.object(RAGResources, '_build_embeddings', slow_build):
+            holder = RAGResources()
+            results = []
+            threads = [
+                threading.Thread(target=lambda: results.append(holder.embeddings))
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+
+    def test_warmup_builds_everything(self):
+        """Test that warmup builds all resources eagerly"""
+        with patch.object(RAGResources, '_build_embeddings', return_value=MagicMock()), \
+             patch.object(RAGResources, '_build_vector_store', return_value=MagicMock()), \
+             patch.object(RAGResources, '_build_retriever', return_value=MagicMock()), \
+             patch.object(RAGResources, '_build_model', return_value=MagicMock()), \
+             patch.object(ai_service, 'chat_client_keys', return_value=[]), \
+             patch.object(ai_service.chat_clients, 'warmup') as warm_clients:
+            holder = RAGResources()
+            holder.warmup()
+            warm_clients.assert_called_once()
+
+            assert holder._embeddings is not None
+            assert holder._vector_store is not None
+            assert holder._retriever is not None
+            assert holder._model is not None
+
+    def test_reset_forces_rebuild(self):
+        """Test that reset drops resources so they are rebuilt on next access"""
+        with patch.object(RAGResources, '_build_model', side_effect=[1, 2]):
+            holder = RAGResources()
+            assert holder.model == 1
+            holder.reset()
+            assert holder.model == 2
+
+    def test_module_attribute_delegates_to_holder(self):
+        """Test that ai_service.vector_store resolves through the shared holder"""
+        fake_store = MagicMock()
+        with patch.object(ai_service.resources, '_vector_store', fake_store):
+            assert ai_service.vector_store is fake_store
+
+    def test_unknown_module_attribute(self):
+        """Test that unknown module attributes still raise AttributeError"""
+        with pytest.raises(AttributeError):
+            ai_service.not_a_resource
+
+
+class TestAddDocument:
+    """Tests for AIService.add_document"""
+
+    def test_add_document_is_queued(self):
+        """Test that documents go through the ingestion queue, not the store"""
+        fake_queue = MagicMock()
+        with patch.object(ai_service.resources, '_ingestion', fake_queue):
+            ai_service.AIService.add_document('Hello, AI!')
+
+        fake_queue.submit.assert_called_once()
+        assert fake_queue.submit.call_args[0][0].document.page_content == 'Hello, AI!'
+
+
+@pytest.mark.django_db
+class TestIndexMessage:
+    """Tests for AIService.index_message"""
+
+    def _index(self, message, **kwargs):
+        fake_queue = MagicMock()
+        with patch.object(ai_service.resources, '_ingestion', fake_queue):
+            ai_service.AIService.index_message(message, **kwargs)
+        fake_queue.submit_many.assert_called_once()
+        return fake_queue.submit_many.call_args[0][0]
+
+    def test_short_message_reuses_embedding(self, message):
+        """Test that a one-chunk message keeps its id and the precomputed vector"""
+        items = self._index(message, embedding=[0.1, 0.2])
+
+        assert len(items) == 1
+        assert items[0].embedding == [0.1, 0.2]
+        assert items[0].document.id == f'message-{message.id}'
+        assert items[0].document.metadata['message_id'] == message.id
+        assert items[0].document.metadata['offset'] == 0
+
+    def test_long_message_is_chunked_in_one_group(self, chat, settings):
+        """Test that every chunk of a long message is queued together for one embedding batch"""
+        settings.CHUNK_SIZE, settings.CHUNK_OVERLAP = 50, 10
+        long_message = Message.objects.create(chat=chat, role='assistant', content='token ' * 40,
+                                              language='en')
+
+        items = self._index(long_message, embedding=[0.1, 0.2])
+
+        assert len(items) > 1
+        assert all(item.embedding is None for item in items)
+        assert [item.document.id for item in items[:2]] == [
+            f'message-{long_message.id}', f'message-{long_message.id}-1'
+        ]
+        for item in items:
+            offset = item.document.metadata['offset']
+            assert long_message.content[offset:offset + len(item.document.page_content)] == item.document.page_content
+
+
+class TestRetrieve:
+    """Tests for partition-scoped retrieval"""
+
+    def _retrieve(self, **kwargs):
+        fake_store = MagicMock()
+        fake_store.similarity_search_by_vector_with_relevance_scores.return_value = []
+        with patch.object(ai_service.resources, '_vector_store', fake_store):
+            ai_service.AIService.retrieve('question', **kwargs)
+        return fake_store.similarity_search_by_vector_with_relevance_scores.call_args
+
+    def test_user_scope_filters_user_and_language(self):
+        """Test that user scope searches only the user's messages and shared documents in the language"""
+        call = self._retrieve(user_id=7, chat_id=3, language='ar')
+        assert call.kwargs['filter'] == {'$and': [{'user_id': {'$in': [7, 0]}}, {'language': 'ar'}]}
+
+    def test_chat_scope_filters_chat(self):
+        """Test that chat scope also restricts to the chat"""
+        call = self._retrieve(user_id=7, chat_id=3, language='en', scope='chat')
+        assert call.kwargs['filter'] == {'$and': [{'user_id': 7}, {'chat_id': 3}, {'language': 'en'}]}
+
+    def test_no_user_skips_search(self):
+        """Test that callers without a partition get no foreign context"""
+        assert self._retrieve(language='en') is None
+
+    def test_unknown_scope_rejected(self):
+        """Test that an invalid scope raises"""
+        with pytest.raises(ValueError):
+            ai_service.AIService.retrieve('question', user_id=1, scope='tenant')
+
+
+class TestStreamResponse:
+    """Tests for the streaming variant of generate_response"""
+
+    def test_tokens_yielded_and_memory_updated(self):
+        """Test that the answer arrives in pieces and is added to the chat memory at the end"""
+        model = FakeListChatModel(responses=['Hello there'])
+        with patch('chatbot.ai_service.chat_model', return_value=model), \
+                patch.object(ai_service.AIService, 'retrieve', return_value=[]):
+            stream = ai_service.AIService.stream_response(
+                [{'role': 'user', 'content': 'what did we decide about the launch plan'}],
+                user_id=1, session_id='stream-test',
+            )
+            pieces = list(stream)
+
+        assert len(pieces) > 1
+        assert ''.join(pieces) == 'Hello there'
+        history = ai_service.get_session_history('stream-test').messages
+        assert history[-1].content == 'Hello there'
+
+    def test_errors_raised_from_iteration(self):
+        """Test that failures surface as AIServiceException when the stream is consumed"""
+        with patch('chatbot.ai_service.chat_model', side_effect=RuntimeError('no key')):
+            stream = ai_service.AIService.stream_response([{'role': 'user', 'content': 'hi'}])
+            with pytest.raises(ai_service.AIServiceException):
+                next(stream)
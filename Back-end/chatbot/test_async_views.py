@@ -0,0 +1,223 @@
+"""
+Unit tests for the async chat views
+"""
+import asyncio
+import json
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from langchain_core.language_models import FakeListChatModel
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+from unittest.mock import patch
+from chatbot import ai_service
+from chatbot.ai_service import AIServiceException
+from chatbot.llm_clients import ChatClientRegistry
+from chatbot.models import Message, UserSummary
+from chatbot_backend.asgi import application
+
+
+@pytest.fixture
+def post(user):
+    """POST through the ASGI request path with the user's JWT"""
+    headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+
+    def send(url, data):
+        return async_to_sync(AsyncClient().post)(url, json.dumps(data), content_type='application/json',
+                                                 headers=headers)
+    return send
+
+
+streamed = asyncio.Event()
+
+
+async def slow_stream(*args, **kwargs):
+    yield 'first'
+    streamed.set()
+    await asyncio.sleep(10)
+    yield 'never'
+
+
+indexing = asyncio.Event()
+
+
+async def slow_index(message, embedding=None):
+    if message.role == 'assistant':
+        indexing.set()
+        await asyncio.sleep(0.2)
+
+
+async def fake_stream(*args, **kwargs):
+    for text in ['Hel', 'lo']:
+        yield text
+
+
+@pytest.mark.django_db
+class TestAsyncSendMessage:
+    """Tests for the async send_message view"""
+
+    @patch('chatbot.async_views.AIService.aindex_message')
+    @patch('chatbot.async_views.AIService.aembed_query', return_value=[0.1, 0.2])
+    @patch('chatbot.async_views.AIService.astream_response', side_effect=fake_stream)
+    def test_send_message(self, mock_generate, mock_embed, mock_index, post, chat):
+        """Test that the async view saves both messages and answers like the DRF view"""
+        response = post(reverse('async-chat-send-message', kwargs={'pk': chat.id}), {'content': 'Hello'})
+
+        assert response.status_code == status.HTTP_201_CREATED
+        body = response.json()
+        assert body['user_message']['content'] == 'Hello'
+        assert body['ai_message']['content'] == 'Hello'
+        assert Message.objects.filter(chat=chat).count() == 2
+        assert mock_generate.call_args.kwargs['query_embedding'] == [0.1, 0.2]
+        assert mock_index.call_count == 2
+
+    @patch('chatbot.async_views.AIService.aindex_message')
+    @patch('chatbot.async_views.AIService.aembed_query', return_value=None)
+    def test_model_awaited_through_chain(self, mock_embed, mock_index, post, chat):
+        """Test that the real pipeline awaits the model and returns its answer"""
+        with patch('chatbot.ai_service.chat_model', return_value=FakeListChatModel(responses=['Async hi'])), \
+                patch.object(ai_service.AIService, 'retrieve', return_value=[]):
+            response = post(reverse('async-chat-send-message', kwargs={'pk': chat.id}), {'content': 'hello there friend'})
+        assert response.json()['ai_message']['content'] == 'Async hi'
+
+    @patch('chatbot.async_views.AIService.aembed_query', return_value=[0.1])
+    @patch('chatbot.async_views.AIService.astream_response', side_effect=AIServiceException('API Error'))
+    def test_ai_error(self, mock_generate, mock_embed, post, chat):
+        """Test that model failures return 503 like the DRF view"""
+        response = post(reverse('async-chat-send-message', kwargs={'pk': chat.id}), {'content': 'Hello'})
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    @patch('chatbot.async_views.AIService.aindex_message')
+    @patch('chatbot.async_views.AIService.aembed_query', return_value=None)
+    @patch('chatbot.async_views.AIService.astream_response', side_effect=slow_stream)
+    def test_client_disconnect_aborts(self, mock_stream, mock_embed, mock_index, user, chat):
+        """Test that a disconnect cancels the generation and records the partial reply as aborted"""
+        body = json.dumps({'content': 'long story'}).encode()
+        scope = {
+            'type': 'http', 'method': 'POST', 'path': reverse('async-chat-send-message', kwargs={'pk': chat.id}),
+            'query_string': b'', 'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', f'Bearer {AccessToken.for_user(user)}'.encode()),
+                (b'content-type', b'application/json'),
+            ],
+        }
+
+        async def scenario():
+            events = asyncio.Queue()
+            events.put_nowait({'type': 'http.request', 'body': body, 'more_body': False})
+            sent = []
+
+            async def send(message):
+                sent.append(message)
+            task = asyncio.create_task(application(scope, events.get, send))
+            await asyncio.wait_for(streamed.wait(), timeout=5)
+            await events.put({'type': 'http.disconnect'})
+            await asyncio.wait_for(task, timeout=5)
+            return sent
+
+        streamed.clear()
+        assert async_to_sync(scenario)() == []
+        reply = Message.objects.get(role='assistant')
+        assert (reply.content, reply.status) == ('first', Message.STATUS_ABORTED)
+        assert mock_index.call_count == 1
+
+    @patch('chatbot.async_views.AIService.aindex_message', side_effect=slow_index)
+    @patch('chatbot.async_views.AIService.aembed_query', return_value=None)
+    @patch('chatbot.async_views.AIService.astream_response', side_effect=fake_stream)
+    def test_disconnect_while_indexing_keeps_one_reply(self, mock_stream, mock_embed, mock_index, user, chat):
+        """Test that a disconnect after the last token finishes the complete reply instead of aborting"""
+        body = json.dumps({'content': 'Hello'}).encode()
+        scope = {
+            'type': 'http', 'method': 'POST', 'path': reverse('async-chat-send-message', kwargs={'pk': chat.id}),
+            'query_string': b'', 'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', f'Bearer {AccessToken.for_user(user)}'.encode()),
+                (b'content-type', b'application/json'),
+            ],
+        }
+
+        async def scenario():
+            events = asyncio.Queue()
+            events.put_nowait({'type': 'http.request', 'body': body, 'more_body': False})
+
+            async def send(message):
+                pass
+            task = asyncio.create_task(application(scope, events.get, send))
+            await asyncio.wait_for(indexing.wait(), timeout=5)
+            await events.put({'type': 'http.disconnect'})
+            await asyncio.wait_for(task, timeout=5)
+
+        indexing.clear()
+        async_to_sync(scenario)()
+        reply = Message.objects.get(role='assistant')
+        assert (reply.content, reply.status) == ('Hello', Message.STATUS_COMPLETE)
+        assert mock_index.call_count == 2
+
+    @patch('chatbot.async_views.AIService.aindex_message')
+    @patch('chatbot.async_views.AIService.aembed_query', return_value=None)
+    def test_repeated_requests_under_wsgi(self, mock_embed, mock_index, user, chat, fake_groq):
+        """Test that the pooled model client survives the new event loop WSGI runs each async view on"""
+        registry = ChatClientRegistry()
+        url = reverse('async-chat-send-message', kwargs={'pk': chat.id})
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        with patch('chatbot.llm_clients.chat_clients', registry), \
+                patch.object(ai_service.AIService, 'retrieve', return_value=[]):
+            for content in ['hello there friend', 'and once more']:
+                response = Client().post(url, json.dumps({'content': content}), content_type='application/json',
+                                         headers=headers)
+                assert response.status_code == status.HTTP_201_CREATED
+                assert response.json()['ai_message']['content'] == 'Hi there'
+        registry.close()
+        assert fake_groq.requests == 2
+
+    def test_requires_jwt(self, chat):
+        """Test that requests without a valid token are rejected"""
+        url = reverse('async-chat-send-message', kwargs={'pk': chat.id})
+        assert async_to_sync(AsyncClient().post)(url, {}).status_code == status.HTTP_401_UNAUTHORIZED
+        response = async_to_sync(AsyncClient().post)(url, {}, headers={'Authorization': 'Bearer nope'})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_other_users_chat_not_found(self, post, admin_user):
+        """Test that a chat of another user is not reachable"""
+        from chatbot.models import Chat
+        other = Chat.objects.create(user=admin_user, language='en')
+        response = post(reverse('async-chat-send-message', kwargs={'pk': other.id}), {'content': 'Hello'})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @patch('chatbot.async_views.AIService.aindex_message')
+    @patch('chatbot.async_views.AIService.aembed_query', return_value=[0.1])
+    @patch('chatbot.async_views.AIService.astream_response', side_effect=fake_stream)
+    def test_stream_message(self, mock_stream, mock_embed, mock_index, post, chat):
+        """Test that the async stream sends token events and saves the reply at the end"""
+        response = post(reverse('async-chat-stream-message', kwargs={'pk': chat.id}), {'content': 'Hello'})
+
+        async def body():
+            return b''.join([part async for part in response.streaming_content]).decode()
+        text = async_to_sync(body)()
+        assert text.count('event: token') == 2
+        assert 'event: done' in text
+        assert Message.objects.get(role='assistant').content == 'Hello'
+
+
+@pytest.mark.django_db
+class TestAsyncGenerateSummary:
+    """Tests for the async summary view"""
+
+    @patch('chatbot.async_views.AIService.agenerate_user_summary',
+           return_value='```json\n{"summary": "Likes tests", "topics": ["qa"], "Common queries": []}\n```')
+    def test_generate(self, mock_summary, post, message):
+        """Test that the summary is generated from the user's messages and stored"""
+        response = post(reverse('async-summary-generate'), {'language': 'en'})
+
+        assert response.status_code == status.HTTP_201_CREATED
+        summary = UserSummary.objects.get(user=message.chat.user, language='en')
+        assert summary.summary_text == 'Likes tests'
+        assert summary.message_count == 1
+        assert response.json()['summary']['user_username'] == message.chat.user.username
+        assert mock_summary.call_args.kwargs['user_messages'] == [message.content]
+
+    def test_no_messages(self, post):
+        """Test that a user without messages gets 400"""
+        response = post(reverse('async-summary-generate'), {'language': 'en'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,104 @@
+"""
+Unit tests for starting background work only in server processes
+"""
+import pytest
+from datetime import timedelta
+from django.apps import apps
+from django.db import OperationalError
+from django.utils import timezone
+from unittest.mock import patch
+from chatbot import background
+from chatbot.background import claim_lease, is_server_process
+from chatbot.models import JobLease
+
+
+@pytest.fixture
+def not_marked(monkeypatch):
+    monkeypatch.setattr(background, '_server_process', False)
+    monkeypatch.delenv('RUN_MAIN', raising=False)
+
+
+class TestIsServerProcess:
+    """Tests for is_server_process"""
+
+    @pytest.mark.parametrize('argv, run_main, expected', [
+        (['manage.py', 'migrate'], None, False),
+        (['manage.py', 'reindex_messages'], None, False),
+        (['manage.py', 'runserver'], None, False),
+        (['manage.py', 'runserver'], 'true', True),
+        (['manage.py', 'runserver', '--noreload'], None, True),
+    ])
+    def test_management_commands(self, not_marked, monkeypatch, argv, run_main, expected):
+        """Test that only the serving runserver process counts, not the autoreloader or other commands"""
+        monkeypatch.setattr('sys.argv', argv)
+        if run_main:
+            monkeypatch.setenv('RUN_MAIN', run_main)
+        assert is_server_process() is expected
+
+    def test_marked_by_wsgi_or_asgi(self, not_marked, monkeypatch):
+        """Test that a process marked by the WSGI/ASGI entrypoint counts"""
+        monkeypatch.setattr('sys.argv', ['gunicorn'])
+        assert not is_server_process()
+        background.mark_server_process()
+        assert is_server_process()
+
+
+@pytest.mark.django_db
+class TestClaimLease:
+    """Tests for claim_lease"""
+
+    def test_one_holder_at_a_time(self):
+        """Test that a held lease is only renewed by its owner"""
+        assert claim_lease('job', 60, owner='a')
+        assert not claim_lease('job', 60, owner='b')
+        assert claim_lease('job', 60, owner='a')
+        assert JobLease.objects.get(name='job').owner == 'a'
+
+    def test_expired_lease_is_taken_over(self):
+        """Test that another process takes the job over once the lease lapses"""
+        JobLease.objects.create(name='job', owner='a', lease_until=timezone.now() - timedelta(seconds=1))
+        assert claim_lease('job', 60, owner='b')
+        assert JobLease.objects.get(name='job').owner == 'b'
+
+
+class TestReady:
+    """Tests for the app's ready hook"""
+
+    @patch('chatbot.background.start_background_jobs')
+    def test_no_jobs_outside_server_processes(self, mock_start, not_marked, monkeypatch, settings):
+        """Test that commands, migrations and tests neither warm up nor start the periodic jobs"""
+        settings.RAG_WARMUP_ON_BOOT = True
+        monkeypatch.setattr('sys.argv', ['manage.py', 'migrate'])
+        with patch('chatbot.ai_service.resources.warmup') as mock_warmup:
+            apps.get_app_config('chatbot').ready()
+        mock_start.assert_not_called()
+        mock_warmup.assert_not_called()
+
+    @patch('chatbot.background.start_background_jobs')
+    def test_jobs_in_server_process(self, mock_start, not_marked, monkeypatch, settings):
+        """Test that a serving process starts the periodic jobs and leaves the warmup to a thread"""
+        settings.RAG_WARMUP_ON_BOOT = True
+        background.mark_server_process()
+        with patch('chatbot.ai_service.resources.warmup') as mock_warmup, \
+                patch('chatbot.background.start_warmup') as mock_start_warmup:
+            apps.get_app_config('chatbot').ready()
+        mock_start.assert_called_once()
+        mock_start_warmup.assert_called_once()
+        mock_warmup.assert_not_called()
+
+
+class TestWarmup:
+    """Tests for the background warmup"""
+
+    def test_disabled_by_default(self, settings):
+        """Test that no thread starts without RAG_WARMUP_ON_BOOT or LLM_WARMUP_ON_BOOT"""
+        settings.RAG_WARMUP_ON_BOOT = False
+        settings.LLM_WARMUP_ON_BOOT = False
+        assert background.start_warmup() is None
+
+    def test_missing_tables_skip_warmup(self, settings, caplog):
+        """Test that a database without the app's tables (first migrate) skips the warmup instead of failing"""
+        settings.RAG_WARMUP_ON_BOOT = True
+        with patch('chatbot.ai_service.resources.warmup', side_effect=OperationalError('no such table')):
+            background.start_warmup().join(timeout=5)
+        assert 'Skipped warmup' in caplog.text
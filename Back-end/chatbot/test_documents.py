@@ -0,0 +1,210 @@
+"""
+Unit tests for streaming document ingestion
+"""
+import os
+import pytest
+from unittest.mock import patch
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from chatbot import documents
+from chatbot.ai_service import AIService
+from chatbot.documents import (
+    DocumentParseError, build_parse_pool, chunk_text, document_segments,
+    ingest_file, iter_segment_texts, process_document,
+)
+from chatbot.models import Document
+from chatbot.numpy_store import NumpyVectorStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return NumpyVectorStore(str(tmp_path / 'store'), DeterministicFakeEmbedding(size=16))
+
+
+class TestChunking:
+    """Tests for the overlapping chunker"""
+
+    def test_chunks_overlap_and_cover_text(self):
+        """Test that chunks respect size and overlap and cover the whole text"""
+        text = ' '.join(f'word{i}' for i in range(500))
+        chunks = list(chunk_text([text[:1234], text[1234:]], chunk_size=200, overlap=50))
+
+        assert all(len(chunk) <= 200 for _, chunk in chunks)
+        for (offset, chunk) in chunks:
+            assert text[offset:offset + len(chunk)] == chunk
+        for (first_offset, first), (second_offset, _) in zip(chunks, chunks[1:]):
+            assert first_offset + len(first) - second_offset == 50
+        last_offset, last = chunks[-1]
+        assert last_offset + len(last) == len(text)
+
+    def test_overlap_must_be_smaller_than_chunk(self):
+        """Test that an overlap as large as the chunk is rejected"""
+        with pytest.raises(ValueError):
+            list(chunk_text(['text'], chunk_size=10, overlap=10))
+
+
+class TestSegments:
+    """Tests for splitting and parsing documents"""
+
+    def test_text_segments_keep_multibyte_characters(self, tmp_path):
+        """Test that byte-range segments never split a UTF-8 character"""
+        path = tmp_path / 'arabic.txt'
+        text = 'مرحبا بالعالم ' * 50
+        path.write_text(text, encoding='utf-8')
+
+        with patch.object(documents, 'TEXT_SEGMENT_BYTES', 7):
+            segments = document_segments(str(path))
+        assert len(segments) > 100
+        assert ''.join(iter_segment_texts(segments)) == text
+
+    def test_process_pool_preserves_order(self, tmp_path):
+        """Test that segments parsed in worker processes come back in order"""
+        path = tmp_path / 'numbers.txt'
+        text = ''.join(f'{i:05d}\n' for i in range(2000))
+        path.write_text(text)
+
+        with patch.object(documents, 'TEXT_SEGMENT_BYTES', 1000):
+            segments = document_segments(str(path))
+        pool = build_parse_pool(2)
+        try:
+            assert ''.join(iter_segment_texts(segments, pool)) == text
+        finally:
+            pool.shutdown()
+
+    def test_unsupported_type(self, tmp_path):
+        """Test that unsupported extensions are rejected"""
+        path = tmp_path / 'image.png'
+        path.write_bytes(b'data')
+        with pytest.raises(DocumentParseError):
+            document_segments(str(path))
+
+
+class TestIngestFile:
+    """Tests for embedding and upserting document chunks"""
+
+    def test_chunks_are_written_in_batches(self, tmp_path, store):
+        """Test that every chunk is stored with its metadata and progress is reported"""
+        path = tmp_path / 'guide.txt'
+        path.write_text('Reset your password from the settings page. ' * 100)
+        progress = []
+
+        with patch.object(store, 'add_embeddings', wraps=store.add_embeddings) as add:
+            chunks = ingest_file(str(path), store, 7, {'language': 'en'}, chunk_size=300,
+                                 overlap=50, batch_size=4, progress=lambda f, c: progress.append(f))
+
+        assert chunks == store.count() > 4
+        assert all(len(call.kwargs['texts']) <= 4 for call in add.call_args_list)
+        assert progress[-1] == 1.0
+        first = store.get_by_ids(['document-7-0'])[0]
+        assert first.metadata == {
+            'language': 'en', 'document_id': 7, 'source': 'guide.txt', 'chunk': 0, 'offset': 0,
+        }
+
+
+@pytest.mark.django_db
+class TestProcessDocument:
+    """Tests for Document status tracking"""
+
+    def test_complete(self, tmp_path, store, user):
+        """Test that a processed document is marked complete with its chunk count"""
+        path = tmp_path / 'notes.txt'
+        path.write_text('Shipping takes three days. ' * 200)
+        document = Document.objects.create(user=user, name='notes.txt', file_type='.txt', language='en')
+
+        process_document(document, str(path), store=store)
+
+        assert document.status == 'complete'
+        assert document.progress == 1.0
+        assert document.chunk_count == store.count()
+        results = store.similarity_search('shipping', k=1, filter={'user_id': user.id})
+        assert results[0].metadata['role'] == 'document'
+
+    def test_failure_is_recorded(self, tmp_path, store, user):
+        """Test that a parsing error marks the document failed"""
+        path = tmp_path / 'report.pdf'
+        path.write_bytes(b'not a pdf')
+        document = Document.objects.create(user=user, name='report.pdf', file_type='.pdf')
+
+        process_document(document, str(path), store=store)
+
+        assert document.status == 'failed'
+        assert document.error
+
+    def test_management_command(self, tmp_path, store):
+        """Test that the command ingests every supported file in a directory"""
+        (tmp_path / 'docs').mkdir()
+        (tmp_path / 'docs' / 'a.txt').write_text('alpha ' * 300)
+        (tmp_path / 'docs' / 'b.txt').write_text('beta ' * 300)
+        (tmp_path / 'docs' / 'skip.png').write_bytes(b'')
+
+        with patch('chatbot.ai_service.resources._vector_store', store):
+            call_command('ingest_documents', str(tmp_path / 'docs'), '--workers', '1')
+
+        assert list(Document.objects.values_list('name', 'status')) == [
+            ('b.txt', 'complete'), ('a.txt', 'complete'),
+        ]
+
+    def test_shared_documents_reach_every_user(self, tmp_path, store, user, admin_user, settings):
+        """Test that documents without an owner are found by per-user retrieval"""
+        settings.RAG_SCORE_THRESHOLD = -1.0
+        path = tmp_path / 'policy.txt'
+        path.write_text('Refunds are issued within fourteen days. ' * 20)
+        process_document(Document.objects.create(name='policy.txt', file_type='.txt', language='en'),
+                         str(path), store=store)
+        owned = tmp_path / 'private.txt'
+        owned.write_text('My private refund notes. ' * 20)
+        process_document(Document.objects.create(user=admin_user, name='private.txt', file_type='.txt',
+                                                 language='en'), str(owned), store=store)
+
+        with patch('chatbot.ai_service.resources._vector_store', store):
+            docs = AIService.retrieve('Refunds are issued within fourteen days.', user_id=user.id, language='en')
+        assert docs
+        assert {doc.metadata['source'] for doc in docs} == {'policy.txt'}
+
+
+@pytest.mark.django_db
+class TestDocumentUpload:
+    """Tests for the upload endpoint"""
+
+    def test_upload_schedules_ingestion(self, authenticated_client, user):
+        """Test that an upload creates a Document and hands the file to ingestion"""
+        upload = SimpleUploadedFile('faq.txt', b'Question and answer', content_type='text/plain')
+
+        with patch('chatbot.views.schedule_document') as schedule:
+            response = authenticated_client.post(reverse('document-upload'), {'file': upload},
+                                                 format='multipart')
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['name'] == 'faq.txt'
+        document, path = schedule.call_args.args
+        assert document.user == user
+        with open(path, 'rb') as f:
+            assert f.read() == b'Question and answer'
+        os.remove(path)
+
+    def test_rejects_unsupported_type(self, authenticated_client):
+        """Test that unsupported file types are rejected"""
+        upload = SimpleUploadedFile('photo.png', b'data')
+        response = authenticated_client.post(reverse('document-upload'), {'file': upload},
+                                             format='multipart')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_rejects_type_without_parser(self, authenticated_client):
+        """Test that a type whose parser is not installed is refused instead of failing later"""
+        upload = SimpleUploadedFile('report.pdf', b'%PDF-1.4')
+        with patch('chatbot.documents.find_spec', return_value=None):
+            response = authenticated_client.post(reverse('document-upload'), {'file': upload},
+                                                 format='multipart')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'pypdf' in str(response.data['file'])
+
+    def test_rejects_large_files(self, authenticated_client, settings):
+        """Test that files above MAX_DOCUMENT_SIZE are rejected"""
+        settings.MAX_DOCUMENT_SIZE = 10
+        upload = SimpleUploadedFile('big.txt', b'x' * 11)
+        response = authenticated_client.post(reverse('document-upload'), {'file': upload},
+                                             format='multipart')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
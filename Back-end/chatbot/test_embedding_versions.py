@@ -0,0 +1,182 @@
+"""
+Unit tests for versioned embedding collections and model migrations
+"""
+import pytest
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from chatbot.ai_service import RAGResources, message_chunks
+from chatbot.embedding_versions import (
+    DualWriteStore, backfill, current_versions, start_migration, version_key,
+)
+from chatbot.models import EmbeddingVersion, Message
+from chatbot.numpy_store import NumpyVectorStore
+
+NEW_MODEL = 'intfloat/multilingual-e5-small'
+
+
+@pytest.fixture
+def old_embeddings():
+    return DeterministicFakeEmbedding(size=16)
+
+
+@pytest.fixture
+def new_embeddings():
+    return DeterministicFakeEmbedding(size=8)
+
+
+@pytest.fixture
+def source(tmp_path, old_embeddings):
+    return NumpyVectorStore(str(tmp_path / 'old'), old_embeddings)
+
+
+@pytest.fixture
+def target(tmp_path, new_embeddings):
+    return NumpyVectorStore(str(tmp_path / 'new'), new_embeddings)
+
+
+@pytest.fixture
+def migrating(settings):
+    settings.EMBEDDING_MODEL_NAME = NEW_MODEL
+    return current_versions()[1]
+
+
+def index(store, messages):
+    for message in messages:
+        for chunk in message_chunks(message):
+            store.add_embeddings([chunk.page_content], [store.embeddings.embed_query(chunk.page_content)],
+                                 [chunk.metadata], [chunk.id])
+
+
+@pytest.mark.django_db
+class TestVersions:
+    """Tests for version bookkeeping"""
+
+    def test_original_collection_is_active(self):
+        """Test that the pre-existing collection is the active version with no migration"""
+        active, migrating = current_versions()
+        assert active.model_name == 'sentence-transformers/all-mpnet-base-v2'
+        assert active.collection_key == ''
+        assert migrating is None
+
+    def test_changing_the_model_starts_a_migration(self, migrating):
+        """Test that a new EMBEDDING_MODEL_NAME gets its own collection key"""
+        assert migrating.model_name == NEW_MODEL
+        assert migrating.status == 'migrating'
+        assert migrating.collection_key == version_key(NEW_MODEL)
+        assert migrating.collection_key.startswith('multilingual-e5-small-')
+        with pytest.raises(ValueError):
+            start_migration('another/model')
+
+
+@pytest.mark.django_db
+class TestDualWriteStore:
+    """Tests for writes during a migration"""
+
+    def test_writes_and_deletes_reach_both_versions(self, source, target, chat, settings):
+        """Test that each version gets vectors from its own model and searches use the active one"""
+        settings.RAG_PAYLOAD_MODE = 'ids'
+        store = DualWriteStore(source, target)
+        message = Message.objects.create(chat=chat, role='user', content='dual write me', language='en')
+        chunk = message_chunks(message)[0]
+        store.add_embeddings([''], [source.embeddings.embed_query(chunk.page_content)], [chunk.metadata], [chunk.id])
+
+        assert source.count() == target.count() == 1
+        new_vector = target.embeddings.embed_query('dual write me')
+        assert target.search_rows(new_vector, k=1)[1][0] == pytest.approx(1.0, abs=1e-5)
+        assert store.similarity_search_by_vector(source.embeddings.embed_query('dual write me'), k=1)[0].id == chunk.id
+
+        store.delete([chunk.id])
+        assert source.count() == target.count() == 0
+
+
+@pytest.mark.django_db
+class TestBackfill:
+    """Tests for the throttled backfill and cutover"""
+
+    def test_backfill_resumes_and_cuts_over(self, source, target, chat, migrating):
+        """Test that a partial run saves its cursor and a later run reaches 100% and cuts over"""
+        messages = [
+            Message.objects.create(chat=chat, role='user', content=f'history {i}', language='en')
+            for i in range(5)
+        ]
+        index(source, messages)
+
+        report = backfill(source, target, batch_size=2, rate=0, max_batches=1)
+        migrating.refresh_from_db()
+        assert (report.embedded, report.cut_over) == (2, False)
+        assert migrating.backfill_cursor == 2
+        assert 0 < migrating.coverage < 1
+
+        report = backfill(source, target, batch_size=2, rate=0)
+        migrating.refresh_from_db()
+        assert report.cut_over
+        assert target.count() == 5
+        assert migrating.status == 'active'
+        assert EmbeddingVersion.objects.get(model_name='sentence-transformers/all-mpnet-base-v2').status == 'retired'
+
+    def test_backfill_is_throttled_and_skips_dual_written(self, source, target, chat, migrating):
+        """Test that records already in the new version are not re-embedded and the rate is honoured"""
+        messages = [
+            Message.objects.create(chat=chat, role='user', content=f'fact {i}', language='en')
+            for i in range(4)
+        ]
+        index(source, messages)
+        index(target, messages[:1])
+        sleeps = []
+
+        report = backfill(source, target, batch_size=10, rate=2, sleep=sleeps.append)
+        assert report.embedded == 3
+        assert report.cut_over
+        assert sleeps and sleeps[0] == pytest.approx(1.5, abs=0.1)
+
+    def test_rollback_reuses_original_collection(self, source, target, chat, migrating, settings):
+        """Test that migrating back to a retired model reuses its collection and only embeds what changed"""
+        index(source, [Message.objects.create(chat=chat, role='user', content=f'old {i}', language='en')
+                       for i in range(3)])
+        assert backfill(source, target, rate=0).cut_over
+        index(target, [Message.objects.create(chat=chat, role='user', content='after cutover', language='en')])
+
+        settings.EMBEDDING_MODEL_NAME = 'sentence-transformers/all-mpnet-base-v2'
+        _, rollback = current_versions()
+        assert (rollback.status, rollback.collection_key) == ('migrating', '')
+
+        report = backfill(target, source, rate=0)
+        assert (report.embedded, report.cut_over) == (1, True)
+        assert source.count() == 4
+
+    def test_lease_blocks_second_backfill(self, source, target, migrating):
+        """Test that only the lease holder backfills"""
+        assert backfill(source, target, owner='worker-1', max_batches=0).leased
+        assert not backfill(source, target, owner='worker-2').leased
+
+
+@pytest.mark.django_db
+class TestResourcesFollowVersions:
+    """Tests for RAGResources during a migration"""
+
+    def test_dual_write_then_cutover(self, tmp_path, settings, old_embeddings, new_embeddings):
+        """Test that the shared store dual-writes during a migration and switches after cutover"""
+        settings.VECTOR_STORE_TYPE = 'numpy'
+        settings.NUMPY_STORE_DIR = str(tmp_path / 'numpy')
+        settings.EMBEDDING_VERSION_CHECK_SECONDS = 0
+        settings.EMBEDDING_MODEL_NAME = NEW_MODEL
+        models = {'sentence-transformers/all-mpnet-base-v2': old_embeddings, NEW_MODEL: new_embeddings}
+
+        holder = RAGResources()
+        with patch('chatbot.ai_service.build_embeddings', side_effect=lambda name: models[name]), \
+                patch('chatbot.embeddings.build_embeddings', side_effect=lambda name, remote: models[name]), \
+                patch('chatbot.ai_service.resources', holder):
+            store = holder.vector_store
+            assert isinstance(store, DualWriteStore)
+            assert holder.embedding_model == 'sentence-transformers/all-mpnet-base-v2'
+
+            out = StringIO()
+            call_command('migrate_embeddings', '--backfill', '--rate', '0', stdout=out)
+            assert 'cut over' in out.getvalue()
+
+            store = holder.vector_store
+            assert isinstance(store, NumpyVectorStore)
+            assert store.path.name == f'numpy-{version_key(NEW_MODEL)}'
+            assert holder.embeddings is new_embeddings
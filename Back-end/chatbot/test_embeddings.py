@@ -0,0 +1,240 @@
+"""
+Unit tests for embedding construction, the embedding worker and helpers
+"""
+import os
+import tempfile
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from chatbot.embeddings import build_embeddings, build_local_embeddings, cosine_drift
+from chatbot.embedding_worker import MicroBatcher, EmbeddingWorker, RemoteEmbeddings, WorkerModelMismatch
+from chatbot.embedding_cache import CachedEmbeddings, EmbeddingCache, cache_key
+
+
+class TestMicroBatcher:
+    """Tests for cross-request micro-batching"""
+
+    def test_concurrent_requests_share_a_batch(self):
+        """Test that requests arriving together are encoded in one call"""
+        batch_sizes = []
+
+        def encode(texts):
+            batch_sizes.append(len(texts))
+            return [[float(len(text))] for text in texts]
+
+        batcher = MicroBatcher(encode, max_batch_size=64, max_wait_ms=200)
+        results = {}
+
+        def worker(i):
+            results[i] = batcher.embed([f"text {i}" * (i + 1)])
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        batcher.close()
+
+        assert sum(batch_sizes) == 10
+        assert len(batch_sizes) < 10
+        for i in range(10):
+            assert results[i] == [[float(len(f"text {i}" * (i + 1)))]]
+
+    def test_batch_respects_max_size(self):
+        """Test that a batch is flushed once max_batch_size texts are queued"""
+        batch_sizes = []
+
+        def encode(texts):
+            batch_sizes.append(len(texts))
+            return [[0.0] for _ in texts]
+
+        batcher = MicroBatcher(encode, max_batch_size=2, max_wait_ms=1000)
+        futures = [batcher.submit([f"t{i}"]) for i in range(6)]
+        for future in futures:
+            future.result(timeout=5)
+        batcher.close()
+
+        assert max(batch_sizes) <= 2
+        assert sum(batch_sizes) == 6
+
+    def test_encode_error_propagates(self):
+        """Test that encoder failures are raised to every caller in the batch"""
+        def encode(texts):
+            raise ValueError('model exploded')
+
+        batcher = MicroBatcher(encode, max_wait_ms=0)
+        with pytest.raises(ValueError):
+            batcher.embed(['hello'])
+        batcher.close()
+
+    def test_empty_request(self):
+        """Test that an empty request resolves without touching the model"""
+        batcher = MicroBatcher(lambda texts: pytest.fail('should not encode'))
+        assert batcher.embed([]) == []
+        batcher.close()
+
+
+class TestEmbeddingWorker:
+    """Tests for the Unix socket embedding worker"""
+
+    def test_remote_embeddings_round_trip(self):
+        """Test that the client gets the same vectors as the local model"""
+        model = DeterministicFakeEmbedding(size=8)
+        socket_path = os.path.join(tempfile.mkdtemp(), 'embed.sock')
+        worker = EmbeddingWorker(socket_path, model, max_wait_ms=1, authkey=b'test')
+        worker.start()
+        threading.Thread(target=worker.serve_forever, daemon=True).start()
+
+        try:
+            client = RemoteEmbeddings(socket_path, authkey=b'test')
+            assert client.embed_documents(['a', 'b']) == model.embed_documents(['a', 'b'])
+            assert client.embed_query('a') == model.embed_query('a')
+        finally:
+            worker.close()
+
+    def test_worker_serving_another_model_is_not_used(self):
+        """Test that a worker still on the previous model is bypassed for in-process encoding"""
+        old_model, new_model = DeterministicFakeEmbedding(size=8), DeterministicFakeEmbedding(size=12)
+        socket_path = os.path.join(tempfile.mkdtemp(), 'embed.sock')
+        worker = EmbeddingWorker(socket_path, old_model, max_wait_ms=1, authkey=b'test', model_name='old')
+        worker.start()
+        threading.Thread(target=worker.serve_forever, daemon=True).start()
+
+        try:
+            matching = RemoteEmbeddings(socket_path, authkey=b'test', model_name='old')
+            assert matching.embed_query('a') == old_model.embed_query('a')
+
+            fallback = MagicMock(return_value=new_model)
+            client = RemoteEmbeddings(socket_path, authkey=b'test', model_name='new', fallback=fallback)
+            assert client.embed_documents(['a', 'b']) == new_model.embed_documents(['a', 'b'])
+            assert client.embed_query('a') == new_model.embed_query('a')
+            fallback.assert_called_once_with()
+            assert worker.batcher.texts == 1
+
+            strict = RemoteEmbeddings(socket_path, authkey=b'test', model_name='new')
+            with pytest.raises(WorkerModelMismatch):
+                strict.embed_query('a')
+        finally:
+            worker.close()
+
+    def test_unreachable_worker_falls_back_in_process(self, caplog):
+        """Test that a missing worker socket degrades to in-process encoding instead of failing the request"""
+        model = DeterministicFakeEmbedding(size=8)
+        socket_path = os.path.join(tempfile.mkdtemp(), 'embed.sock')
+        client = RemoteEmbeddings(socket_path, authkey=b'test', fallback=lambda: model)
+        assert client.embed_query('a') == model.embed_query('a')
+        assert 'unavailable' in caplog.text
+
+        with pytest.raises(OSError):
+            RemoteEmbeddings(socket_path, authkey=b'test').embed_query('a')
+
+
+class TestBuildEmbeddings:
+    """Tests for the embeddings factory"""
+
+    def test_uses_worker_when_socket_configured(self, settings):
+        """Test that a configured socket yields a remote client"""
+        settings.EMBEDDING_SERVICE_SOCKET = '/tmp/embed.sock'
+        settings.EMBEDDING_CACHE_ENABLED = False
+        embeddings = build_embeddings('some-model')
+        assert isinstance(embeddings, RemoteEmbeddings)
+        assert embeddings.socket_path == '/tmp/embed.sock'
+        assert embeddings.model_name == 'some-model'
+
+    def test_loads_local_model_by_default(self, settings):
+        """Test that the model is loaded in-process without a socket"""
+        settings.EMBEDDING_SERVICE_SOCKET = ''
+        settings.EMBEDDING_CACHE_ENABLED = False
+        with patch('chatbot.embeddings.build_local_embeddings') as mock_local:
+            build_embeddings('some-model')
+        mock_local.assert_called_once_with('some-model')
+
+    def test_wraps_model_in_cache_when_enabled(self, settings, tmp_path):
+        """Test that the cache wraps the model when enabled"""
+        settings.EMBEDDING_SERVICE_SOCKET = ''
+        settings.EMBEDDING_CACHE_ENABLED = True
+        settings.EMBEDDING_CACHE_PATH = str(tmp_path / 'cache.sqlite3')
+        with patch('chatbot.embeddings.build_local_embeddings') as mock_local:
+            embeddings = build_embeddings('some-model')
+        assert isinstance(embeddings, CachedEmbeddings)
+        assert embeddings.underlying is mock_local.return_value
+
+
+class TestEmbeddingBackends:
+    """Tests for backend selection and parity reporting"""
+
+    def test_unknown_backend_rejected(self):
+        """Test that an unsupported backend name raises"""
+        with pytest.raises(ValueError):
+            build_local_embeddings('some-model', backend='tensorrt')
+
+    def test_cosine_drift_identical(self):
+        """Test that identical embeddings report zero drift"""
+        report = cosine_drift([[1.0, 0.0], [0.5, 0.5]], [[1.0, 0.0], [0.5, 0.5]])
+        assert report['max_drift'] == pytest.approx(0.0)
+        assert report['mean_cosine'] == pytest.approx(1.0)
+
+    def test_cosine_drift_orthogonal(self):
+        """Test that orthogonal rows report a drift of one"""
+        report = cosine_drift([[1.0, 0.0], [1.0, 0.0]], [[1.0, 0.0], [0.0, 1.0]])
+        assert report['max_drift'] == pytest.approx(1.0)
+        assert report['mean_drift'] == pytest.approx(0.5)
+
+    def test_cosine_drift_shape_mismatch(self):
+        """Test that mismatched shapes are rejected"""
+        with pytest.raises(ValueError):
+            cosine_drift([[1.0, 0.0]], [[1.0, 0.0, 0.0]])
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Fake model that records every text it encodes"""
+
+    encoded: list = []
+
+    def embed_documents(self, texts):
+        self.encoded.extend(texts)
+        return super().embed_documents(texts)
+
+
+class TestEmbeddingCache:
+    """Tests for the content-addressed embedding cache"""
+
+    def _cached(self, tmp_path, **kwargs):
+        model = CountingEmbeddings(size=8, encoded=[])
+        cache = EmbeddingCache(str(tmp_path / 'cache.sqlite3'), **kwargs)
+        return model, CachedEmbeddings(model, cache, 'test-model')
+
+    def test_repeated_text_encoded_once(self, tmp_path):
+        """Test that repeated text never reaches the model twice"""
+        model, cached = self._cached(tmp_path)
+        first = cached.embed_documents(['hello', 'hello', 'thanks'])
+        second = cached.embed_query('hello')
+
+        assert model.encoded == ['hello', 'thanks']
+        assert first[0] == first[1] == second
+        assert cached.cache.hits == 1
+        assert cached.cache.misses == 2
+
+    def test_normalization_shares_keys(self):
+        """Test that whitespace variants map to the same key"""
+        assert cache_key('  hello   world ', 'm') == cache_key('hello world', 'm')
+        assert cache_key('hello', 'model-a') != cache_key('hello', 'model-b')
+
+    def test_persists_across_instances(self, tmp_path):
+        """Test that vectors survive a new process via SQLite"""
+        _, cached = self._cached(tmp_path)
+        vector = cached.embed_query('persist me')
+
+        model, reopened = self._cached(tmp_path)
+        assert reopened.embed_query('persist me') == pytest.approx(vector)
+        assert model.encoded == []
+
+    def test_size_based_eviction(self, tmp_path):
+        """Test that the disk cache is trimmed below max_bytes"""
+        _, cached = self._cached(tmp_path, max_bytes=8 * 4 * 10, lru_size=1)
+        cached.embed_documents([f'text {i}' for i in range(50)])
+
+        stats = cached.cache.stats()
+        assert stats['bytes'] <= 8 * 4 * 10
+        assert stats['entries'] == stats['bytes'] // (8 * 4)
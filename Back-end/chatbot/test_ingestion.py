@@ -0,0 +1,145 @@
+"""
+Unit tests for the vector store ingestion queue
+"""
+import threading
+import time
+from unittest.mock import MagicMock
+from langchain_core.documents import Document
+from chatbot.ingestion import IngestionQueue, PendingDocument, write_pending_documents
+
+
+def make_docs(count):
+    return [Document(page_content=f'doc {i}') for i in range(count)]
+
+
+class TestIngestionQueue:
+    """Tests for IngestionQueue"""
+
+    def test_synchronous_mode_writes_immediately(self):
+        """Test that sync mode writes each document during submit"""
+        batches = []
+        ingestion = IngestionQueue(batches.append, synchronous=True)
+        for doc in make_docs(3):
+            ingestion.submit(doc)
+
+        assert [len(batch) for batch in batches] == [1, 1, 1]
+        assert ingestion.written == 3
+
+    def test_batches_by_count(self):
+        """Test that queued documents are written in batches of batch_size"""
+        batches = []
+        ingestion = IngestionQueue(batches.append, batch_size=5, max_age_ms=5000)
+        for doc in make_docs(10):
+            ingestion.submit(doc)
+        ingestion.flush()
+        ingestion.close()
+
+        assert [len(batch) for batch in batches] == [5, 5]
+
+    def test_batches_by_age(self):
+        """Test that a partial batch is written once its oldest document is old enough"""
+        batches = []
+        ingestion = IngestionQueue(batches.append, batch_size=100, max_age_ms=20)
+        for doc in make_docs(3):
+            ingestion.submit(doc)
+        ingestion.flush()
+
+        assert sum(len(batch) for batch in batches) == 3
+        ingestion.close()
+
+    def test_close_flushes_pending(self):
+        """Test that closing writes every pending document"""
+        written = []
+        ingestion = IngestionQueue(written.extend, batch_size=100, max_age_ms=60000)
+        for doc in make_docs(7):
+            ingestion.submit(doc)
+        ingestion.close()
+
+        assert len(written) == 7
+
+    def test_backpressure_writes_inline_when_full(self):
+        """Test that a full queue falls back to writing in the caller"""
+        release = threading.Event()
+        written = []
+
+        def slow_write(documents):
+            release.wait(5)
+            written.extend(documents)
+
+        ingestion = IngestionQueue(slow_write, batch_size=1, max_age_ms=0,
+                                   max_pending=1, put_timeout=0.01)
+        ingestion.submit(Document(page_content='first'))   # picked up by the worker
+        time.sleep(0.05)
+        ingestion.submit(Document(page_content='second'))  # fills the queue
+        caller = threading.Thread(target=ingestion.submit,
+                                  args=(Document(page_content='third'),))
+        caller.start()
+        time.sleep(0.05)
+        release.set()
+        caller.join()
+        ingestion.close()
+
+        assert ingestion.inline_writes == 1
+        assert sorted(doc.page_content for doc in written) == ['first', 'second', 'third']
+
+    def test_write_errors_are_counted(self):
+        """Test that a failing write does not kill the worker"""
+        calls = []
+
+        def flaky_write(documents):
+            calls.append(len(documents))
+            if len(calls) == 1:
+                raise RuntimeError('store unavailable')
+
+        ingestion = IngestionQueue(flaky_write, batch_size=1, max_age_ms=0)
+        ingestion.submit(Document(page_content='lost'))
+        ingestion.flush()
+        ingestion.submit(Document(page_content='kept'))
+        ingestion.close()
+
+        assert ingestion.failed == 1
+        assert ingestion.written == 1
+
+
+class TestWritePendingDocuments:
+    """Tests for writing queued documents with precomputed vectors"""
+
+    def test_only_missing_vectors_are_embedded(self):
+        """Test that documents with a vector skip the embedding model"""
+        store = MagicMock()
+        store.embeddings.embed_documents.return_value = [[0.5, 0.5]]
+        items = [
+            PendingDocument(Document(page_content='known', id='message-1'), [1.0, 0.0]),
+            PendingDocument(Document(page_content='unknown', id='message-2')),
+        ]
+        write_pending_documents(store, items)
+
+        store.embeddings.embed_documents.assert_called_once_with(['unknown'])
+        kwargs = store.add_embeddings.call_args.kwargs
+        assert kwargs['embeddings'] == [[1.0, 0.0], [0.5, 0.5]]
+        assert kwargs['ids'] == ['message-1', 'message-2']
+
+    def test_vectors_from_another_model_are_recomputed(self):
+        """Test that vectors queued before an embedding cutover are not written to the new store"""
+        store = MagicMock()
+        store.embeddings.embed_documents.return_value = [[0.5, 0.5]]
+        items = [PendingDocument(Document(page_content='stale', id='message-1'), [1.0, 0.0], 'old-model')]
+        write_pending_documents(store, items, model='new-model')
+
+        store.embeddings.embed_documents.assert_called_once_with(['stale'])
+        assert store.add_embeddings.call_args.kwargs['embeddings'] == [[0.5, 0.5]]
+
+
+class TestSubmitMany:
+    """Tests for submitting groups of documents"""
+
+    def test_group_is_written_in_one_batch(self):
+        """Test that a group is never split across batches"""
+        batches = []
+        ingestion = IngestionQueue(batches.append, batch_size=2, max_age_ms=5000)
+        ingestion.submit_many(make_docs(3))
+        ingestion.submit(Document(page_content='single'))
+        ingestion.close()
+
+        assert [len(batch) for batch in batches] == [3, 1]
+        assert ingestion.submitted == ingestion.written == 4
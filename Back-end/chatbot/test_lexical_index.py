@@ -0,0 +1,143 @@
+"""
+Unit tests for the BM25 lexical index and the shared text normalizer
+"""
+import pytest
+from io import StringIO
+from unittest.mock import MagicMock, patch
+from django.core.management import call_command
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from chatbot import ai_service
+from chatbot.lexical_index import LexicalIndex, LexicalIndexedStore, reciprocal_rank_fusion
+from chatbot.models import Message
+from chatbot.numpy_store import NumpyVectorStore
+from chatbot.text_normalization import fold_text, tokenize
+
+
+@pytest.fixture
+def index(tmp_path):
+    return LexicalIndex(str(tmp_path / 'lexical.sqlite3'))
+
+
+class TestNormalization:
+    """Tests for the Arabic-aware normalizer"""
+
+    def test_arabic_variants_fold_together(self):
+        """Test that diacritics, tatweel, alef/yeh/teh marbuta variants and digits are unified"""
+        assert fold_text('أَحْمَد') == fold_text('احمد') == fold_text('إحمـــد')
+        assert fold_text('مدرسة') == fold_text('مدرسه')
+        assert fold_text('مستشفى') == fold_text('مستشفي')
+        assert fold_text('رقم ١٢٣') == 'رقم 123'
+
+    def test_tokenize_strips_article_and_case(self):
+        """Test that index terms drop case and the Arabic definite article"""
+        assert tokenize('The Invoice INV-42') == ['the', 'invoice', 'inv', '42']
+        assert tokenize('الكتاب بالمدرسة') == ['كتاب', 'مدرسه']
+
+
+class TestLexicalIndex:
+    """Tests for BM25 search"""
+
+    def test_exact_terms_rank_first(self, index):
+        """Test that the document containing a rare name or code ranks first with a full-match score"""
+        index.add(
+            ['1', '2', '3'],
+            ['my order code is ZX-9081', 'the weather is nice today', 'another order was late'],
+        )
+        hits = index.search('order ZX-9081', k=3)
+        assert hits[0].id == '1'
+        assert hits[0].score > 0.8
+        assert [hit.id for hit in hits] == ['1', '3']
+        assert index.search('ZX-9081 unknownword', k=1)[0].score < hits[0].score
+
+    def test_arabic_query_matches_variant_spelling(self, index):
+        """Test that an Arabic query without diacritics or hamza finds the written form"""
+        index.add(['ar'], ['اسمي أَحمد وأعمل في المستشفى'], [{'language': 'ar'}])
+        assert index.search('احمد مستشفي', k=1)[0].id == 'ar'
+
+    def test_partition_filter(self, index):
+        """Test that hits stay in the caller's partition and other filters are rejected"""
+        index.add(['a', 'b'], ['secret plan', 'secret plan'], [{'user_id': 1}, {'user_id': 2}])
+        assert [hit.id for hit in index.search('secret', where={'user_id': 2})] == ['b']
+        assert index.search('secret', where={'$and': [{'user_id': 1}, {'language': 'en'}]}) == []
+        assert {hit.id for hit in index.search('secret', where={'user_id': {'$in': [1, 2]}})} == {'a', 'b'}
+        with pytest.raises(ValueError):
+            index.search('secret', where={'user_id': {'$gt': 1}})
+
+    def test_updates_persist(self, index, tmp_path):
+        """Test that re-adding replaces, deleting removes and a reopened index sees both"""
+        index.add(['1', '2'], ['first version', 'to be removed'])
+        index.add(['1'], ['second version'])
+        index.delete(['2'])
+
+        reopened = LexicalIndex(index.path)
+        assert reopened.count() == 1
+        assert reopened.search('second')[0].text == 'second version'
+        assert reopened.search('first') == []
+        assert reopened.search('removed') == []
+
+    def test_rank_fusion(self):
+        """Test that documents ranked well by both lists come first"""
+        a, b, c = (Document(id=name, page_content=name) for name in 'abc')
+        assert [doc.id for doc in reciprocal_rank_fusion([[a, b, c], [b]], k=2)] == ['b', 'a']
+
+
+@pytest.mark.django_db
+class TestLexicalRetrieval:
+    """Tests for lexical retrieval through the shared store"""
+
+    @pytest.fixture
+    def store(self, tmp_path, index, settings):
+        settings.RAG_PAYLOAD_MODE = 'ids'
+        embeddings = DeterministicFakeEmbedding(size=16)
+        return LexicalIndexedStore(NumpyVectorStore(str(tmp_path / 'numpy'), embeddings), index)
+
+    def _write(self, store, message):
+        for chunk in ai_service.message_chunks(message):
+            vector = store.embeddings.embed_query(chunk.page_content)
+            store.add_embeddings([ai_service.payload_text(chunk)], [vector], [chunk.metadata], [chunk.id])
+
+    def test_lexical_first_skips_embedding(self, store, index, chat, settings):
+        """Test that a strong lexical match is returned, hydrated, without embedding the query"""
+        settings.RAG_RETRIEVAL_MODE = 'lexical_first'
+        message = Message.objects.create(chat=chat, role='user', content='My passport number is P4471920',
+                                         language='en')
+        self._write(store, message)
+        assert index.count() == 1
+
+        with patch.object(ai_service.resources, '_vector_store', store), \
+                patch.object(ai_service.resources, '_lexical_index', index), \
+                patch.object(store.primary, '_embedding', MagicMock()) as embedding:
+            docs = ai_service.AIService.retrieve('passport P4471920', user_id=chat.user_id, language='en')
+            embedding.embed_query.assert_not_called()
+        assert [doc.page_content for doc in docs] == ['My passport number is P4471920']
+
+    def test_weak_lexical_match_falls_back_to_vectors(self, store, index, chat, settings):
+        """Test that lexical_first uses dense search when BM25 has no strong hit"""
+        settings.RAG_RETRIEVAL_MODE = 'lexical_first'
+        settings.RAG_SCORE_THRESHOLD = -1.0
+        message = Message.objects.create(chat=chat, role='user', content='completely different words',
+                                         language='en')
+        self._write(store, message)
+
+        with patch.object(ai_service.resources, '_vector_store', store), \
+                patch.object(ai_service.resources, '_lexical_index', index):
+            docs = ai_service.AIService.retrieve('nothing in common', user_id=chat.user_id, language='en')
+        assert [doc.id for doc in docs] == [f'message-{message.id}']
+
+    def test_delete_and_rebuild(self, store, index, chat, settings):
+        """Test that deletes reach the index and the command rebuilds it from the store"""
+        settings.RAG_RETRIEVAL_MODE = 'hybrid'
+        message = Message.objects.create(chat=chat, role='user', content='index me please', language='en')
+        self._write(store, message)
+        store.delete([f'message-{message.id}'])
+        assert index.count() == 0
+
+        store.primary.add_embeddings([''], [store.embeddings.embed_query('x')],
+                                     [ai_service.message_chunks(message)[0].metadata], [f'message-{message.id}'])
+        out = StringIO()
+        with patch.object(ai_service.resources, '_vector_store', store), \
+                patch.object(ai_service.resources, '_lexical_index', index):
+            call_command('build_lexical_index', '--rebuild', stdout=out)
+        assert 'Indexed 1 records' in out.getvalue()
+        assert index.search('index me')[0].text == ''
@@ -0,0 +1,78 @@
+"""
+Unit tests for the pooled ChatGroq client registry
+"""
+import asyncio
+import pytest
+from unittest.mock import patch
+from chatbot import ai_service
+from chatbot.llm_clients import ChatClientRegistry, chat_clients
+from chatbot.models import AIModelConfig
+
+MODEL = 'llama-3.3-70b-versatile'
+
+
+@pytest.fixture
+def registry(settings, monkeypatch):
+    settings.LLM_CONFIG_CHECK_SECONDS = 0
+    monkeypatch.setenv('GROQ_API_KEY', 'test-key')
+    registry = ChatClientRegistry()
+    yield registry
+    registry.close()
+
+
+@pytest.mark.django_db
+class TestChatClientRegistry:
+    """Tests for client reuse and invalidation"""
+
+    def test_same_key_reuses_client(self, registry):
+        """Test that one client is built per (model, temperature, max_tokens)"""
+        first = registry.get(MODEL, 0.7, 2000)
+        assert registry.get(MODEL, 0.7, 2000) is first
+        assert registry.get(MODEL, 0.5, 1000) is not first
+
+    def test_clients_share_one_pool(self, registry):
+        """Test that every client sends through the registry's keep-alive pool"""
+        first = registry.get(MODEL, 0.7, 2000)
+        second = registry.get('openai/gpt-oss-20b', 0.2, 500)
+        assert first.client._client._client is registry.http_client
+        assert second.client._client._client is registry.http_client
+        assert first.async_client._client._client is registry.http_async_client
+
+    def test_async_pool_per_event_loop(self, registry, fake_groq):
+        """Test that the shared async client keeps working when each request runs on a new event loop"""
+        client = registry.get(MODEL, 0.7, 2000)
+
+        async def ask():
+            return (await client.ainvoke('hello')).content
+        # As async_to_sync does for an async view under WSGI
+        assert [asyncio.run(ask()) for _ in range(3)] == ['Hi there'] * 3
+        assert fake_groq.requests == 3
+        assert registry.http_async_client._transport.pools() == 1
+
+    def test_config_row_key_and_rebuild(self, registry):
+        """Test that a saved AIModelConfig row supplies the key and replaces its clients"""
+        AIModelConfig.objects.create(name=MODEL, api_key='row-key')
+        first = registry.get(MODEL, 0.7, 2000)
+        assert first.groq_api_key.get_secret_value() == 'row-key'
+        other = registry.get('openai/gpt-oss-20b', 0.7, 2000)
+
+        config = AIModelConfig.objects.get(name=MODEL)
+        config.api_key = 'rotated-key'
+        config.save()
+
+        second = registry.get(MODEL, 0.7, 2000)
+        assert second is not first
+        assert second.groq_api_key.get_secret_value() == 'rotated-key'
+        assert registry.get('openai/gpt-oss-20b', 0.7, 2000) is other
+
+    def test_save_signal_invalidates_shared_registry(self):
+        """Test that saving a config drops the process-wide clients of that model"""
+        with patch.object(chat_clients, 'invalidate') as invalidate:
+            AIModelConfig.objects.create(name=MODEL)
+        invalidate.assert_called_once_with(MODEL)
+
+    def test_warmup_survives_unreachable_api(self, registry):
+        """Test that warmup builds clients even when pre-connecting fails"""
+        with patch.object(registry.http_client, 'get', side_effect=OSError('offline')):
+            registry.warmup(ai_service.CHAT_CLIENT_KEYS)
+        assert len(registry._clients) == len(ai_service.CHAT_CLIENT_KEYS)
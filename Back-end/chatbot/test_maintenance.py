@@ -0,0 +1,132 @@
+"""
+Unit tests for vector store maintenance
+"""
+import time
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from chatbot.maintenance import plan_removals, run_maintenance
+from chatbot.numpy_store import NumpyVectorStore
+from chatbot.vector_stores import build_chroma_store
+
+
+@pytest.fixture
+def embeddings():
+    return DeterministicFakeEmbedding(size=16)
+
+
+def add(store, embeddings, doc_id, text, user_id=1, language='en', created_at=0, vector=None):
+    store.add_embeddings(
+        [text],
+        [vector or embeddings.embed_query(text)],
+        [{'user_id': user_id, 'language': language, 'created_at': created_at}],
+        [doc_id],
+    )
+
+
+class TestPlanRemovals:
+    """Tests for deciding which documents to remove"""
+
+    def test_exact_duplicates_keep_newest_per_partition(self, tmp_path, embeddings):
+        """Test that duplicates are removed only within one user and language"""
+        store = NumpyVectorStore(str(tmp_path), embeddings)
+        add(store, embeddings, 'old', 'Hi', created_at=1)
+        add(store, embeddings, 'new', 'hi ', created_at=2)
+        add(store, embeddings, 'other-user', 'hi', user_id=2, created_at=1)
+        add(store, embeddings, 'other-language', 'hi', language='ar', created_at=1)
+
+        report = plan_removals(store)
+        assert report.removed_ids == {'old'}
+        assert report.exact_duplicates == 1
+
+    def test_near_duplicates(self, tmp_path, embeddings):
+        """Test that vectors above the threshold collapse to the newest one"""
+        store = NumpyVectorStore(str(tmp_path), embeddings)
+        base = embeddings.embed_query('thanks')
+        close = [value + 0.001 for value in base]
+        add(store, embeddings, 'a', 'thanks', created_at=2, vector=base)
+        add(store, embeddings, 'b', 'thanks!', created_at=1, vector=close)
+        add(store, embeddings, 'c', 'unrelated', created_at=0)
+
+        report = plan_removals(store, near_threshold=0.99)
+        assert report.removed_ids == {'b'}
+        assert report.near_duplicates == 1
+
+    def test_ttl_and_quota(self, tmp_path, embeddings):
+        """Test age eviction and keeping only the newest documents per user"""
+        store = NumpyVectorStore(str(tmp_path), embeddings)
+        now = time.time()
+        add(store, embeddings, 'ancient', 'ancient', created_at=now - 40 * 86400)
+        for index in range(3):
+            add(store, embeddings, f'recent-{index}', f'recent {index}', created_at=now - index)
+
+        report = plan_removals(store, ttl_days=30, max_per_user=2, now=now)
+        assert report.expired == 1
+        assert report.over_quota == 1
+        assert report.removed_ids == {'ancient', 'recent-2'}
+
+
+class TestRunMaintenance:
+    """Tests for applying maintenance to a store"""
+
+    def test_dry_run_changes_nothing(self, tmp_path, embeddings):
+        """Test that a dry run only reports"""
+        store = NumpyVectorStore(str(tmp_path), embeddings)
+        add(store, embeddings, '1', 'hi', created_at=1)
+        add(store, embeddings, '2', 'hi', created_at=2)
+
+        report = run_maintenance(store, dry_run=True)
+        assert report.removed_ids == {'1'}
+        assert store.count() == 2
+
+    def test_numpy_rebuild_reclaims_rows(self, tmp_path, embeddings):
+        """Test that removed rows are compacted out of the NumPy store"""
+        store = NumpyVectorStore(str(tmp_path), embeddings)
+        for index in range(5):
+            add(store, embeddings, str(index), 'hi', created_at=index)
+
+        report = run_maintenance(store, rebuild=True)
+        assert report.removed == 4
+        assert report.rebuilt
+        assert store.count() == 1
+        assert len(NumpyVectorStore(str(tmp_path), embeddings)._ids) == 1
+
+    def test_chroma_rebuild_keeps_name_and_records(self, tmp_path, embeddings, settings):
+        """Test that the rebuilt Chroma collection replaces the original"""
+        settings.CHROMA_PERSIST_DIR = str(tmp_path / 'chroma')
+        store = build_chroma_store(embeddings, collection_name='memory')
+        add(store, embeddings, '1', 'hi', created_at=1)
+        add(store, embeddings, '2', 'hi', created_at=2)
+        add(store, embeddings, '3', 'hello there', created_at=3)
+
+        report = run_maintenance(store, rebuild=True)
+        assert report.removed == 1
+        assert store._collection.name == 'memory'
+        assert sorted(store._collection.get()['ids']) == ['2', '3']
+        assert store.similarity_search('hello there', k=1)[0].id == '3'
+
+
+@pytest.mark.django_db
+class TestEvictionLasts:
+    """Tests that evicted messages stay out of the store"""
+
+    def test_reindex_and_reconcile_skip_evicted_messages(self, tmp_path, embeddings, chat, settings):
+        """Test that a message removed by dedup is flagged and neither re-index nor reconcile adds it back"""
+        from chatbot.ai_service import message_document_id
+        from chatbot.models import Message
+        from chatbot.reconcile import reconcile
+        from chatbot.reindex import message_queryset
+
+        old = Message.objects.create(chat=chat, role='user', content='hi', language='en')
+        new = Message.objects.create(chat=chat, role='user', content='hi', language='en')
+        store = NumpyVectorStore(str(tmp_path / 'store'), embeddings)
+        for created_at, message in enumerate([old, new]):
+            add(store, embeddings, message_document_id(message.id), 'hi', user_id=chat.user_id, created_at=created_at)
+
+        assert run_maintenance(store).removed_ids == {message_document_id(old.id)}
+        old.refresh_from_db()
+        assert old.evicted_at is not None
+        assert list(message_queryset()) == [new]
+
+        report = reconcile(store, embeddings, state_path=str(tmp_path / 'state.json'), grace_seconds=0)
+        assert report.added == 0
+        assert store.existing_ids([message_document_id(old.id)]) == set()
@@ -0,0 +1,100 @@
+"""
+Unit tests for the Message ↔ vector store reconciler
+"""
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from chatbot.ai_service import message_document_id, message_metadata
+from chatbot.models import Document, Message
+from chatbot.numpy_store import NumpyVectorStore
+from chatbot.reconcile import ReconcileState, reconcile
+from chatbot.vector_stores import build_chroma_store
+
+
+@pytest.fixture
+def embeddings():
+    return DeterministicFakeEmbedding(size=16)
+
+
+@pytest.fixture
+def store(tmp_path, embeddings):
+    return NumpyVectorStore(str(tmp_path / 'store'), embeddings)
+
+
+@pytest.fixture
+def state_path(tmp_path):
+    return str(tmp_path / 'state.json')
+
+
+def index(store, embeddings, message):
+    store.add_embeddings([message.content], [embeddings.embed_query(message.content)],
+                         [message_metadata(message)], [message_document_id(message.id)])
+
+
+@pytest.mark.django_db
+class TestReconcile:
+    """Tests for reconcile"""
+
+    def test_adds_missing_messages_and_advances_watermark(self, store, embeddings, chat, state_path):
+        """Test that unembedded messages are added and the watermark moves past them"""
+        indexed = Message.objects.create(chat=chat, role='user', content='indexed', language='en')
+        lost = Message.objects.create(chat=chat, role='user', content='lost', language='en')
+        reply = Message.objects.create(chat=chat, role='assistant', content='reply', language='en')
+        Message.objects.create(chat=chat, role='system', content='not indexed', language='en')
+        index(store, embeddings, indexed)
+
+        report = reconcile(store, embeddings, state_path, batch_size=1, grace_seconds=0)
+
+        assert report.checked == 3
+        assert report.added == 2
+        assert store.existing_ids([message_document_id(lost.id), message_document_id(reply.id)]) == {
+            message_document_id(lost.id), message_document_id(reply.id)
+        }
+        assert ReconcileState.load(state_path).watermark == reply.id
+
+        # The next pass has nothing new to check
+        assert reconcile(store, embeddings, state_path, grace_seconds=0).checked == 0
+
+    def test_grace_period_skips_recent_messages(self, store, embeddings, chat, state_path):
+        """Test that messages possibly still in the ingestion queue are left alone"""
+        Message.objects.create(chat=chat, role='user', content='just sent', language='en')
+
+        report = reconcile(store, embeddings, state_path, grace_seconds=3600)
+        assert report.added == 0
+        assert ReconcileState.load(state_path).watermark == 0
+
+    def test_removes_orphans(self, store, embeddings, chat, user, state_path):
+        """Test that vectors of deleted messages and documents are removed"""
+        kept = Message.objects.create(chat=chat, role='user', content='kept', language='en')
+        deleted = Message.objects.create(chat=chat, role='user', content='deleted', language='en')
+        index(store, embeddings, kept)
+        index(store, embeddings, deleted)
+        document = Document.objects.create(user=user, name='a.txt', file_type='.txt')
+        store.add_texts(['chunk'], metadatas=[{'document_id': document.id}], ids=['document-x-0'])
+        store.add_texts(['orphan chunk'], metadatas=[{'document_id': 999}], ids=['document-999-0'])
+        deleted.delete()
+
+        report = reconcile(store, embeddings, state_path, grace_seconds=0)
+
+        assert report.orphans_removed == 2
+        assert store.existing_ids(['document-x-0', message_document_id(kept.id)]) == {
+            'document-x-0', message_document_id(kept.id)
+        }
+
+    def test_orphan_scan_wraps_around(self, store, embeddings, chat, state_path):
+        """Test that the orphan cursor advances page by page and restarts at the end"""
+        for i in range(3):
+            index(store, embeddings, Message.objects.create(chat=chat, role='user', content=f'm{i}', language='en'))
+        ReconcileState(watermark=10 ** 9).save(state_path)
+
+        cursors = []
+        for _ in range(4):
+            reconcile(store, embeddings, state_path, batch_size=1, max_batches=2, grace_seconds=0)
+            cursors.append(ReconcileState.load(state_path).orphan_cursor)
+        assert cursors == [2, 3, 0, 2]
+
+    def test_chroma_existing_ids(self, tmp_path, embeddings, settings):
+        """Test that the Chroma store reports which ids exist"""
+        settings.CHROMA_PERSIST_DIR = str(tmp_path / 'chroma')
+        chroma = build_chroma_store(embeddings, collection_name='memory')
+        chroma.add_texts(['a'], ids=['message-1'])
+        assert chroma.existing_ids(['message-1', 'message-2']) == {'message-1'}
@@ -0,0 +1,136 @@
+"""
+Unit tests for re-indexing messages into the vector store
+"""
+import functools
+from concurrent.futures import Future
+from io import StringIO
+import pytest
+from unittest.mock import MagicMock, patch
+from django.core.management import call_command
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from chatbot.ai_service import resources
+from chatbot.lexical_index import LexicalIndex
+from chatbot.models import EmbeddingVersion, Message
+from chatbot.numpy_store import NumpyVectorStore
+from chatbot.reindex import Checkpoint, EmbeddingPool, message_queryset, reindex_messages
+
+
+def completed(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+@pytest.fixture
+def embeddings():
+    return DeterministicFakeEmbedding(size=16)
+
+
+@pytest.fixture
+def store(tmp_path, embeddings):
+    return NumpyVectorStore(str(tmp_path / 'store'), embeddings)
+
+
+@pytest.fixture
+def history(chat):
+    messages = [
+        Message.objects.create(chat=chat, role='user', content=f'question {i}', language='en')
+        for i in range(5)
+    ]
+    Message.objects.create(chat=chat, role='assistant', content='answer', language='en')
+    Message.objects.create(chat=chat, role='user', content='سؤال', language='ar')
+    return messages
+
+
+@pytest.mark.django_db
+class TestReindexMessages:
+    """Tests for reindex_messages"""
+
+    def test_filters_and_metadata(self, store, embeddings, history, tmp_path):
+        """Test that filtered messages are upserted with partition metadata and checkpointed"""
+        checkpoint = Checkpoint(tmp_path / 'checkpoint.json')
+        queryset = message_queryset(language='en', roles=['user'])
+
+        written = reindex_messages(store, queryset, checkpoint, embeddings=embeddings, batch_size=2)
+
+        assert written == store.count() == 5
+        document = store.get_by_ids([f'message-{history[0].id}'])[0]
+        assert document.metadata['chat_id'] == history[0].chat_id
+        assert document.metadata['language'] == 'en'
+        saved = Checkpoint.load(tmp_path / 'checkpoint.json', {})
+        assert saved.last_id == history[-1].id
+        assert saved.indexed == 5
+
+    def test_resume_after_checkpoint(self, store, embeddings, history):
+        """Test that only messages after the checkpoint are processed"""
+        checkpoint = Checkpoint(None, last_id=history[2].id)
+        queryset = message_queryset(roles=['user'], language='en', after_id=checkpoint.last_id)
+
+        assert reindex_messages(store, queryset, checkpoint, embeddings=embeddings) == 2
+
+    def test_aborted_replies_skipped(self, history, chat):
+        """Test that partial replies of abandoned turns are never indexed"""
+        aborted = Message.objects.create(chat=chat, role='assistant', content='half an ans', language='en',
+                                         status=Message.STATUS_ABORTED)
+        assert aborted not in message_queryset(roles=['assistant'])
+
+    def test_checkpoint_filters_must_match(self, tmp_path):
+        """Test that a checkpoint is not reused with different filters"""
+        Checkpoint(tmp_path / 'checkpoint.json', {'language': 'en'}).save()
+        with pytest.raises(ValueError):
+            Checkpoint.load(tmp_path / 'checkpoint.json', {'language': 'ar'})
+
+    def test_process_pool_matches_in_process(self, store, embeddings, history):
+        """Test that vectors embedded by worker processes equal in-process ones"""
+        pool = EmbeddingPool(2, factory=functools.partial(DeterministicFakeEmbedding, size=16))
+        try:
+            written = reindex_messages(store, message_queryset(roles=['user']), Checkpoint(None),
+                                       pool=pool, batch_size=2)
+        finally:
+            pool.close()
+
+        assert written == 6
+        vector = embeddings.embed_query('question 3')
+        assert store.similarity_search_by_vector(vector, k=1)[0].id == f'message-{history[3].id}'
+
+    def test_long_messages_are_chunked(self, store, embeddings, chat, settings):
+        """Test that a long message is stored as several chunks pointing back to it"""
+        settings.CHUNK_SIZE, settings.CHUNK_OVERLAP = 100, 20
+        message = Message.objects.create(chat=chat, role='user', content='word ' * 100, language='en')
+
+        reindex_messages(store, message_queryset(), Checkpoint(None), embeddings=embeddings)
+
+        assert store.count() > 1
+        chunk = store.get_by_ids([f'message-{message.id}-1'])[0]
+        assert chunk.metadata['message_id'] == message.id
+        offset = chunk.metadata['offset']
+        assert message.content[offset:offset + len(chunk.page_content)] == chunk.page_content
+
+    def test_command_reports_throughput(self, store, embeddings, history, tmp_path):
+        """Test that the command prints progress and completes"""
+        out = StringIO()
+        with patch('chatbot.ai_service.resources._vector_store', store), \
+                patch('chatbot.ai_service.resources._embeddings', embeddings):
+            call_command('reindex_messages', '--language', 'en', '--batch-size', '2',
+                         '--checkpoint', str(tmp_path / 'checkpoint.json'), stdout=out)
+
+        assert 'docs/s' in out.getvalue()
+        assert 'ETA' in out.getvalue()
+        assert store.count() == 6  # user and assistant messages
+
+    def test_parallel_command_writes_to_the_active_version(self, store, embeddings, history, tmp_path, settings):
+        """Test that --workers writes into the active version's collection and the lexical index"""
+        settings.RAG_RETRIEVAL_MODE = 'hybrid'
+        index = LexicalIndex(str(tmp_path / 'lexical.sqlite3'))
+        pool = MagicMock(workers=2)
+        pool.submit.side_effect = lambda texts: completed(embeddings.embed_documents(texts))
+        with patch('chatbot.management.commands.reindex_messages.EmbeddingPool', return_value=pool), \
+                patch('chatbot.ai_service.build_vector_store', return_value=store) as build, \
+                patch.object(resources, '_versions', None), \
+                patch.object(resources, '_lexical_index', index):
+            call_command('reindex_messages', '--language', 'en', '--workers', '2',
+                         '--checkpoint', str(tmp_path / 'checkpoint.json'), stdout=StringIO())
+
+        active = EmbeddingVersion.objects.get(status='active')
+        build.assert_called_once_with(None, version_key=active.collection_key)
+        assert store.count() == index.count() == 6
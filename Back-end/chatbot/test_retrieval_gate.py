@@ -0,0 +1,142 @@
+"""
+Unit tests for the retrieval gate
+"""
+import pytest
+import numpy as np
+from unittest.mock import patch
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+from chatbot import ai_service
+from chatbot.models import Message
+from chatbot.numpy_store import NumpyVectorStore
+from chatbot.retrieval_gate import (
+    RetrievalGate, GateClassifier, label_turns, rule_decision, train_classifier,
+)
+
+
+@pytest.fixture
+def classifier_path(tmp_path, settings):
+    settings.RAG_GATE_MODEL_PATH = str(tmp_path / 'gate.npz')
+    return settings.RAG_GATE_MODEL_PATH
+
+
+class TestRules:
+    """Tests for the length and keyword rules"""
+
+    @pytest.mark.parametrize('text, reason', [
+        ('Thanks!', 'small_talk'),
+        ('ok', 'small_talk'),
+        ('شكرا جزيلا', 'small_talk'),
+        ('شُكْراً!', 'small_talk'),
+        ('اهلا', 'small_talk'),
+        ('Can you rephrase that?', 'follow_up'),
+        ('rephrase that please', 'follow_up'),
+        ('Explain it again in simpler words', 'follow_up'),
+        ('why?', 'short'),
+        ('   ', 'blank'),
+    ])
+    def test_skipped_turns(self, text, reason):
+        """Test that chit-chat, follow-ups and short turns skip retrieval"""
+        decision = rule_decision(text)
+        if reason is None:
+            assert decision is None
+        else:
+            assert (decision.retrieve, decision.reason) == (False, reason)
+
+    def test_memory_keywords_force_retrieval(self):
+        """Test that a short turn asking for memory still retrieves"""
+        assert rule_decision('remember?').retrieve
+        assert rule_decision('ماذا قلت عن الملف').reason == 'memory'
+        assert rule_decision('هل تذكر المرة الماضية').reason == 'memory'
+
+    def test_questions_left_to_classifier(self):
+        """Test that substantive questions pass the rules"""
+        assert rule_decision('How do I configure the database connection pool?') is None
+        assert RetrievalGate().check('How do I configure the database connection pool?').reason == 'rules'
+
+    def test_gate_can_be_disabled(self, settings):
+        """Test that RAG_GATE_ENABLED=False always retrieves"""
+        settings.RAG_GATE_ENABLED = False
+        assert RetrievalGate().check('thanks').retrieve
+
+
+class TestClassifier:
+    """Tests for the embedding classifier"""
+
+    @staticmethod
+    def _data(dim=8, size=200):
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(size, dim)).astype(np.float32)
+        return vectors, (vectors[:, 0] > 0).astype(np.int8)
+
+    def test_learns_and_round_trips(self, classifier_path):
+        """Test that a separable labelling is learnt and survives save/load"""
+        vectors, labels = self._data()
+        classifier = train_classifier(vectors, labels, 'model-a')
+        predicted = np.array([classifier.probability(v) >= 0.5 for v in vectors])
+        assert (predicted == labels).mean() > 0.95
+
+        classifier.save(classifier_path)
+        loaded = GateClassifier.load(classifier_path)
+        assert loaded.model_name == 'model-a'
+        assert loaded.probability(vectors[0]) == pytest.approx(classifier.probability(vectors[0]))
+
+    def test_gate_uses_matching_classifier_only(self, classifier_path, settings):
+        """Test that low-probability turns are skipped and a foreign model's classifier is ignored"""
+        vectors, labels = self._data()
+        train_classifier(vectors, labels, 'model-a').save(classifier_path)
+        settings.RAG_GATE_MIN_PROBABILITY = 0.5
+        gate = RetrievalGate()
+        question = 'what is the capital of the country we discussed'
+        negative = -np.eye(8)[0]
+
+        decision = gate.check(question, negative, 'model-a')
+        assert (decision.retrieve, decision.reason) == (False, 'classifier')
+        assert gate.check(question, np.eye(8)[0], 'model-a').retrieve
+        assert gate.check(question, negative, 'model-b').reason == 'rules'
+        assert gate.check(question, np.zeros(4), 'model-a').reason == 'rules'
+
+    @pytest.mark.django_db
+    def test_turns_labelled_by_relevant_memory(self, tmp_path, chat):
+        """Test that a turn is positive only when another stored chunk is relevant"""
+        embeddings = DeterministicFakeEmbedding(size=16)
+        store = NumpyVectorStore(str(tmp_path / 'store'), embeddings)
+        stored = Message.objects.create(chat=chat, role='user', content='my cat is called Tom', language='en')
+        for chunk in ai_service.message_chunks(stored):
+            store.add_embeddings([chunk.page_content], [embeddings.embed_query(chunk.page_content)],
+                                 [chunk.metadata], [chunk.id])
+        turns = [
+            Message.objects.create(chat=chat, role='user', content='my cat is called Tom', language='en'),
+            Message.objects.create(chat=chat, role='user', content='unrelated topic entirely', language='en'),
+            stored,
+        ]
+        vectors = np.asarray([embeddings.embed_query(m.content) for m in turns])
+        assert label_turns(turns, vectors, store, k=3, score_threshold=0.7).tolist() == [1, 0, 0]
+
+
+class TestGenerateResponseGate:
+    """Tests for gating inside AIService.generate_response"""
+
+    def test_small_talk_skips_retrieval_and_is_counted(self):
+        """Test that 'thanks' goes straight to the model and the skip is recorded"""
+        gate = RetrievalGate()
+        with patch('chatbot.ai_service.retrieval_gate', gate), \
+                patch('chatbot.ai_service.chat_model', return_value=FakeListChatModel(responses=['You are welcome'])), \
+                patch.object(ai_service.AIService, 'retrieve') as retrieve:
+            content, *_ = ai_service.AIService.generate_response(
+                [{'role': 'user', 'content': 'thanks!'}], user_id=1, session_id='gate-test',
+            )
+            assert content == 'You are welcome'
+            retrieve.assert_not_called()
+
+            retrieve.return_value = []
+            ai_service.AIService.generate_response(
+                [{'role': 'user', 'content': 'what did we decide about the launch plan'}],
+                user_id=1, session_id='gate-test',
+            )
+            retrieve.assert_called_once()
+
+        stats = gate.stats()
+        assert (stats['turns'], stats['skipped'], stats['skip_rate']) == (2, 1, 0.5)
+        assert stats['reasons'] == {'small_talk': 1, 'rules': 1}
+        assert stats['empty'] == 1
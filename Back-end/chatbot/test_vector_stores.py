@@ -0,0 +1,445 @@
+"""
+Unit tests for vector store construction and maintenance helpers
+"""
+import pytest
+import numpy as np
+from io import StringIO
+from unittest.mock import MagicMock, patch
+from django.core.management import call_command
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from chatbot.vector_stores import (
+    build_chroma_client, build_chroma_store, snapshot_collection, restore_collection,
+    partition_filter, build_vector_store, copy_vector_store, payload_text, collection_config,
+    search_with_relevance,
+)
+from chatbot.index_tuning import exact_neighbors
+from chatbot.numpy_store import NumpyVectorStore, compressed_copy, evaluate_recall, fit_pca
+
+
+@pytest.fixture
+def embeddings():
+    return DeterministicFakeEmbedding(size=16)
+
+
+@pytest.fixture
+def chroma_dir(tmp_path, settings):
+    settings.CHROMA_PERSIST_DIR = str(tmp_path / 'chroma')
+    return settings.CHROMA_PERSIST_DIR
+
+
+class TestPersistentChroma:
+    """Tests for the on-disk Chroma store"""
+
+    def test_documents_survive_reopen(self, chroma_dir, embeddings):
+        """Test that a new client on the same directory sees earlier writes"""
+        store = build_chroma_store(embeddings, collection_name='memory')
+        store.add_documents([Document(page_content='remember me')], ids=['a'])
+
+        reopened = build_chroma_store(embeddings, collection_name='memory',
+                                      client=build_chroma_client(chroma_dir))
+        assert reopened._collection.count() == 1
+        assert reopened.similarity_search('remember me', k=1)[0].page_content == 'remember me'
+
+    def test_snapshot_round_trip(self, chroma_dir, embeddings, tmp_path):
+        """Test that a snapshot restores vectors, documents and metadata"""
+        client = build_chroma_client()
+        source = client.get_or_create_collection('source')
+        source.add(
+            ids=['1', '2', '3'],
+            embeddings=embeddings.embed_documents(['one', 'two', 'three']),
+            documents=['one', 'two', 'three'],
+            metadatas=[{'user_id': 1}, {'user_id': 2}, None],
+        )
+
+        saved = snapshot_collection(source, str(tmp_path / 'snap'), batch_size=2)
+        target = client.get_or_create_collection('target')
+        restored = restore_collection(target, str(tmp_path / 'snap'))
+
+        assert saved == restored == 3
+        record = target.get(ids=['2'], include=['embeddings', 'documents', 'metadatas'])
+        assert record['documents'] == ['two']
+        assert record['metadatas'] == [{'user_id': 2}]
+        assert list(record['embeddings'][0]) == pytest.approx(embeddings.embed_query('two'))
+
+
+class TestPartitioning:
+    """Tests for partition-filtered search"""
+
+    def test_search_stays_in_partition(self, chroma_dir, embeddings):
+        """Test that a user never retrieves another user's or language's documents"""
+        store = build_chroma_store(embeddings, collection_name='memory')
+        store.add_documents([
+            Document(page_content='my secret', metadata={'user_id': 1, 'language': 'en'}),
+            Document(page_content='my secret', metadata={'user_id': 2, 'language': 'en'}),
+            Document(page_content='سر', metadata={'user_id': 1, 'language': 'ar'}),
+        ])
+
+        results = store.similarity_search('my secret', k=5,
+                                          filter=partition_filter(user_id=1, language='en'))
+        assert [doc.metadata for doc in results] == [{'user_id': 1, 'language': 'en'}]
+
+    def test_partition_filter_shapes(self):
+        """Test the where clause built for each combination"""
+        assert partition_filter() is None
+        assert partition_filter(user_id=1) == {'user_id': 1}
+        assert partition_filter(user_id=1, include_shared=True) == {'user_id': {'$in': [1, 0]}}
+        assert partition_filter(user_id=1, language='en') == {
+            '$and': [{'user_id': 1}, {'language': 'en'}]
+        }
+
+
+class TestChromaStore:
+    """Tests for upserting precomputed vectors"""
+
+    def test_add_embeddings_does_not_re_embed(self, chroma_dir, embeddings):
+        """Test that add_embeddings stores the given vector verbatim"""
+        model = MagicMock()
+        store = build_chroma_store(model, collection_name='memory')
+        vector = embeddings.embed_query('hello')
+
+        store.add_embeddings(['hello'], [vector], [{'user_id': 1}], ['message-1'])
+        model.embed_documents.assert_not_called()
+
+        results = store.similarity_search_by_vector(vector, k=1, filter={'user_id': 1})
+        assert results[0].page_content == 'hello'
+        assert results[0].id == 'message-1'
+
+
+class TestCollectionConfig:
+    """Tests for per-collection HNSW and retrieval settings"""
+
+    def test_new_collection_uses_configuration(self, chroma_dir, embeddings, settings):
+        """Test that settings and per-collection overrides reach a new Chroma collection"""
+        settings.CHROMA_HNSW_M = 8
+        settings.RAG_COLLECTION_CONFIG = {'memory': {'space': 'cosine', 'ef_search': 40, 'top_k': 2}}
+        store = build_chroma_store(embeddings, collection_name='memory')
+
+        hnsw = store._collection.configuration['hnsw']
+        assert (hnsw['space'], hnsw['max_neighbors'], hnsw['ef_search']) == ('cosine', 8, 40)
+        assert store.config.top_k == 2
+        assert collection_config('other').space == 'l2'
+
+    def test_reopen_applies_ef_search_only(self, chroma_dir, embeddings, settings, caplog):
+        """Test that ef_search changes in place while build parameters only warn"""
+        build_chroma_store(embeddings, collection_name='memory')
+        settings.CHROMA_HNSW_EF_SEARCH = 64
+        settings.CHROMA_HNSW_M = 32
+
+        store = build_chroma_store(embeddings, collection_name='memory', client=build_chroma_client(chroma_dir))
+        hnsw = store._collection.configuration['hnsw']
+        assert (hnsw['ef_search'], hnsw['max_neighbors']) == (64, 16)
+        assert 'compact_vector_store --rebuild' in caplog.text
+
+    def test_unknown_option_rejected(self, settings):
+        """Test that a typo in RAG_COLLECTION_CONFIG fails loudly"""
+        settings.RAG_COLLECTION_CONFIG = {'ai_memory': {'ef': 10}}
+        with pytest.raises(ValueError, match='ef'):
+            collection_config('ai_memory')
+
+    def test_retrieve_uses_top_k_and_threshold(self, chroma_dir, embeddings, settings):
+        """Test that retrieval honours RAG_SIMILARITY_TOP_K and RAG_SCORE_THRESHOLD"""
+        from chatbot import ai_service
+
+        settings.CHROMA_HNSW_SPACE = 'cosine'
+        settings.RAG_SCORE_THRESHOLD = 0.99
+        store = build_chroma_store(embeddings, collection_name='memory')
+        store.add_texts(['alpha', 'beta', 'gamma'])
+        with patch.object(ai_service.resources, '_vector_store', store):
+            assert [d.page_content for d in ai_service.AIService.retrieve('beta', scope='global')] == ['beta']
+
+        settings.RAG_SCORE_THRESHOLD = -1.0
+        settings.RAG_SIMILARITY_TOP_K = 2
+        store = build_chroma_store(embeddings, collection_name='memory')
+        with patch.object(ai_service.resources, '_vector_store', store):
+            assert len(ai_service.AIService.retrieve('beta', scope='global')) == 2
+            vector = embeddings.embed_query('gamma')
+            assert ai_service.AIService.retrieve('', scope='global', k=1, embedding=vector)[0].page_content == 'gamma'
+
+    @pytest.mark.parametrize('space', ['l2', 'cosine', 'ip'])
+    def test_relevance_is_cosine_on_every_backend(self, chroma_dir, embeddings, settings, tmp_path, space):
+        """Test that one score_threshold means the same cosine similarity for Chroma and the numpy store"""
+        settings.RAG_COLLECTION_CONFIG = {'memory': {'space': space}}
+        chroma = build_chroma_store(embeddings, collection_name='memory')
+        numpy_store = NumpyVectorStore(str(tmp_path / 'numpy'), embeddings)
+        vectors = np.random.default_rng(0).normal(size=(5, 16))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        for store in (chroma, numpy_store):
+            store.add_embeddings([f'doc {i}' for i in range(5)], vectors.tolist(), ids=[str(i) for i in range(5)])
+
+        query = vectors[0]
+        expected = sorted((vectors @ query).tolist(), reverse=True)
+        for store in (chroma, numpy_store):
+            relevance = [score for _, score in search_with_relevance(store, query.tolist(), k=5)]
+            assert relevance == pytest.approx(expected, abs=1e-4)
+
+    def test_snapshot_restores_index_parameters(self, chroma_dir, embeddings, settings, tmp_path):
+        """Test that a restored collection is built with the HNSW parameters it was saved with"""
+        settings.RAG_COLLECTION_CONFIG = {'memory': {'space': 'cosine', 'max_neighbors': 8}}
+        store = build_chroma_store(embeddings, collection_name='memory')
+        store.add_texts(['kept'])
+
+        call_command('chroma_snapshot', 'save', str(tmp_path / 'snap'), '--collection', 'memory', stdout=StringIO())
+        call_command('chroma_snapshot', 'restore', str(tmp_path / 'snap'), '--collection', 'copy', stdout=StringIO())
+        hnsw = build_chroma_client().get_collection('copy').configuration['hnsw']
+        assert (hnsw['space'], hnsw['max_neighbors']) == ('cosine', 8)
+
+
+class TestHnswSweep:
+    """Tests for the HNSW parameter sweep"""
+
+    @pytest.mark.parametrize('space', ['l2', 'cosine', 'ip'])
+    def test_exact_neighbors_match_brute_force(self, space):
+        """Test that the blockwise ground truth equals a full sort"""
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(50, 8)).astype(np.float32)
+        queries = rng.normal(size=(5, 8)).astype(np.float32)
+        with patch('chatbot.index_tuning.EXACT_BLOCK_ROWS', 7):
+            found = exact_neighbors(vectors, queries, 4, space)
+
+        if space == 'l2':
+            distance = ((queries[:, None, :] - vectors[None, :, :]) ** 2).sum(-1)
+        else:
+            unit = (lambda x: x / np.linalg.norm(x, axis=1, keepdims=True)) if space == 'cosine' else (lambda x: x)
+            distance = -(unit(queries) @ unit(vectors).T)
+        assert found.tolist() == np.argsort(distance, axis=1)[:, :4].tolist()
+
+    def test_sweep_command_reports_and_recommends(self, chroma_dir, embeddings):
+        """Test that the command measures every grid point and recommends one reaching the target"""
+        from chatbot import ai_service
+
+        store = build_chroma_store(embeddings, collection_name='memory')
+        store.add_texts([f'text {i}' for i in range(60)])
+        out = StringIO()
+        with patch.object(ai_service.resources, '_vector_store', store):
+            call_command('sweep_hnsw', '--k', '3', '--queries', '10', '--m', '8', '16',
+                         '--ef-construction', '50', '--ef-search', '10', '50', stdout=out)
+
+        rows = [line for line in out.getvalue().splitlines() if line.rstrip().endswith(' s')]
+        assert len(rows) == 4
+        assert 'CHROMA_HNSW_M=' in out.getvalue()
+
+
+class TestNumpyVectorStore:
+    """Tests for the memory-mapped NumPy backend"""
+
+    def test_search_with_filter(self, tmp_path, embeddings):
+        """Test that exact search respects Chroma-style where clauses"""
+        store = NumpyVectorStore(str(tmp_path), embeddings)
+        store.add_texts(
+            ['my secret', 'my secret', 'سر'],
+            metadatas=[{'user_id': 1, 'language': 'en'}, {'user_id': 2, 'language': 'en'},
+                       {'user_id': 1, 'language': 'ar'}],
+        )
+
+        results = store.similarity_search('my secret', k=5,
+                                          filter=partition_filter(user_id=1, language='en'))
+        assert [doc.metadata for doc in results] == [{'user_id': 1, 'language': 'en'}]
+        assert len(store.similarity_search('x', k=5, filter={'user_id': {'$in': [1, 2]}})) == 3
+        assert len(store.similarity_search('x', k=5, filter={'language': {'$ne': 'en'}})) == 1
+
+    def test_upsert_replaces_existing_id(self, tmp_path, embeddings):
+        """Test that writing an existing id keeps a single live copy"""
+        store = NumpyVectorStore(str(tmp_path), embeddings)
+        store.add_texts(['old'], ids=['message-1'])
+        store.add_texts(['new'], ids=['message-1'])
+
+        assert store.count() == 1
+        assert store.get_by_ids(['message-1'])[0].page_content == 'new'
+
+    def test_delete_and_compact(self, tmp_path, embeddings):
+        """Test that compaction reclaims deleted rows and keeps the rest searchable"""
+        store = NumpyVectorStore(str(tmp_path), embeddings)
+        store.add_texts(['one', 'two', 'three'], ids=['1', '2', '3'])
+        store.delete(['2'])
+
+        assert store.compact() == 1
+        assert store.count() == 2
+        assert store.similarity_search('three', k=1)[0].id == '3'
+
+    def test_reopen_and_float16(self, tmp_path, embeddings):
+        """Test that a reopened half-precision store returns the same neighbours"""
+        store = NumpyVectorStore(str(tmp_path), embeddings, dtype='float16')
+        store.add_texts(['alpha', 'beta'], ids=['a', 'b'])
+        store.delete(['b'])
+
+        reopened = NumpyVectorStore(str(tmp_path), embeddings)
+        assert reopened.count() == 1
+        results = reopened.similarity_search_with_score('alpha', k=2)
+        assert results[0][0].id == 'a'
+        assert results[0][1] == pytest.approx(1.0, abs=1e-2)
+
+    def test_instances_sharing_a_directory(self, tmp_path, embeddings):
+        """Test that two writers on one directory (e.g. two workers) append after each other's rows"""
+        first = NumpyVectorStore(str(tmp_path), embeddings)
+        second = NumpyVectorStore(str(tmp_path), embeddings)
+        first.add_texts(['alpha'], ids=['a0'])
+        second.add_texts(['beta'], ids=['b0'])
+
+        assert first.count() == 2
+        fresh = NumpyVectorStore(str(tmp_path), embeddings)
+        for text, doc_id in (('alpha', 'a0'), ('beta', 'b0')):
+            doc, score = fresh.similarity_search_with_score(text, k=1)[0]
+            assert doc.id == doc_id
+            assert score == pytest.approx(1.0, abs=1e-5)
+
+    def test_compaction_by_another_instance(self, tmp_path, embeddings):
+        """Test that an instance reloads after another one compacted the files away under it"""
+        first = NumpyVectorStore(str(tmp_path), embeddings)
+        first.add_texts(['one', 'two', 'three'], ids=['1', '2', '3'])
+        second = NumpyVectorStore(str(tmp_path), embeddings)
+        second.delete(['1'])
+        assert second.compact() == 1
+
+        first.add_texts(['four'], ids=['4'])
+        assert first.similarity_search('two', k=1)[0].id == '2'
+        assert second.count() == 3
+        assert second.similarity_search('four', k=1)[0].id == '4'
+        assert NumpyVectorStore(str(tmp_path), embeddings).existing_ids(['1', '2', '3', '4']) == {'2', '3', '4'}
+
+    def test_copy_from_chroma(self, chroma_dir, tmp_path, embeddings, settings):
+        """Test that records are copied between backends with their stored vectors"""
+        settings.NUMPY_STORE_DIR = str(tmp_path / 'numpy')
+        source = build_vector_store(embeddings, 'chroma')
+        source.add_texts(['one', 'two'], metadatas=[{'user_id': 1}, {'user_id': 2}], ids=['1', '2'])
+
+        settings.VECTOR_STORE_TYPE = 'numpy'
+        target = build_vector_store(MagicMock())
+        assert isinstance(target, NumpyVectorStore)
+        assert copy_vector_store(source, target, batch_size=1) == 2
+        vector = embeddings.embed_query('two')
+        assert target.similarity_search_by_vector(vector, k=1, filter={'user_id': 2})[0].id == '2'
+
+
+class TestCompressedStorage:
+    """Tests for float16/int8 codes, PCA projections and exact re-scoring"""
+
+    @pytest.fixture
+    def corpus(self):
+        # Rank-6 vectors plus a little noise, so an 8-dim PCA keeps almost everything
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(300, 6)) @ rng.normal(size=(6, 16)) + 0.01 * rng.normal(size=(300, 16))
+        return vectors.astype(np.float32)
+
+    @pytest.fixture
+    def baseline(self, tmp_path, embeddings, corpus):
+        store = NumpyVectorStore(str(tmp_path / 'baseline'), embeddings)
+        store.add_embeddings([''] * len(corpus), corpus, ids=[str(i) for i in range(len(corpus))])
+        return store
+
+    def test_int8_reopen_and_compact(self, tmp_path, embeddings):
+        """Test that int8 codes keep their scales through reopen and compaction"""
+        store = NumpyVectorStore(str(tmp_path), embeddings, dtype='int8')
+        store.add_texts(['alpha', 'beta', 'gamma'], ids=['a', 'b', 'c'])
+        store.delete(['a'])
+        store.compact()
+
+        reopened = NumpyVectorStore(str(tmp_path), embeddings)
+        assert reopened.bytes_per_vector == 16 + 4
+        results = reopened.similarity_search_with_score('gamma', k=2)
+        assert results[0][0].id == 'c'
+        assert results[0][1] == pytest.approx(1.0, abs=1e-2)
+        assert not (tmp_path / 'full.npy').exists()
+
+    def test_rescore_returns_exact_scores(self, tmp_path, embeddings, baseline, corpus):
+        """Test that re-scored results match full-precision search exactly"""
+        store = compressed_copy(baseline, str(tmp_path / 'int8'), embeddings, dtype='int8', rescore=True)
+        assert store.rescore and store.lossy
+
+        expected_rows, expected_scores = baseline.search_rows(corpus[7], k=5)
+        rows, scores = store.search_rows(corpus[7], k=5)
+        assert list(rows) == list(expected_rows)
+        assert scores == pytest.approx(expected_scores, abs=1e-6)
+
+    def test_pca_recall(self, tmp_path, embeddings, baseline, corpus):
+        """Test that a PCA-projected int8 copy keeps recall and persists its projection"""
+        store = compressed_copy(baseline, str(tmp_path / 'pca'), embeddings, dtype='int8', pca_dim=8)
+        assert store.code_dim == 8
+        assert store.projection.explained_variance > 0.99
+
+        queries = baseline.sample_vectors(50)
+        store.rescore = False
+        approximate, _ = evaluate_recall(baseline, store, queries, k=5)
+        store.rescore = True
+        rescored, _ = evaluate_recall(baseline, store, queries, k=5)
+        assert approximate >= 0.8
+        assert rescored == 1.0
+
+        reopened = NumpyVectorStore(str(tmp_path / 'pca'), embeddings)
+        assert reopened.code_dim == 8
+        assert reopened.search_rows(corpus[3], k=1)[0][0] == 3
+
+    def test_projection_requires_empty_store(self, tmp_path, embeddings, baseline, corpus):
+        """Test that a projection cannot be set once vectors are stored"""
+        with pytest.raises(ValueError):
+            baseline.set_projection(fit_pca(corpus, 4))
+        with pytest.raises(ValueError):
+            fit_pca(corpus[:3], 4)
+
+    def test_evaluation_command(self, embeddings, baseline):
+        """Test that the command reports every layout against the float32 baseline"""
+        out = StringIO()
+        with patch('chatbot.ai_service.resources._vector_store', baseline), \
+                patch('chatbot.ai_service.resources._embeddings', embeddings):
+            call_command('evaluate_vector_compression', '--k', '5', '--queries', '20',
+                         '--pca-dims', '8', stdout=out)
+
+        output = out.getvalue()
+        for layout in ('float32 (exact)', 'float16', 'int8 + rescore', 'int8+pca8 + rescore'):
+            assert layout in output
+        assert 'PCA keeps' in output
+
+
+@pytest.mark.django_db
+class TestIdPayloads:
+    """Tests for RAG_PAYLOAD_MODE=ids"""
+
+    @pytest.fixture(autouse=True)
+    def ids_mode(self, settings):
+        settings.RAG_PAYLOAD_MODE = 'ids'
+
+    def test_message_text_is_not_stored(self, tmp_path, embeddings, message):
+        """Test that message chunks are written without text, uploaded documents with it"""
+        from chatbot.ai_service import message_chunks
+        from chatbot.ingestion import PendingDocument, write_pending_documents
+
+        store = NumpyVectorStore(str(tmp_path), embeddings)
+        upload = Document(page_content='handbook text', metadata={'document_id': 1}, id='document-1-0')
+        write_pending_documents(store, [PendingDocument(chunk) for chunk in message_chunks(message)]
+                                + [PendingDocument(upload)])
+
+        assert store._texts == ['', 'handbook text']
+
+    def test_retrieve_hydrates_from_database(self, tmp_path, embeddings, chat, settings):
+        """Test that retrieval reads chunk text from the Message table with one query"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from chatbot import ai_service
+        from chatbot.ingestion import PendingDocument, write_pending_documents
+        from chatbot.models import Message
+
+        store = NumpyVectorStore(str(tmp_path), embeddings)
+        messages = [
+            Message.objects.create(chat=chat, role='user', content=f'fact number {i}', language='en')
+            for i in range(3)
+        ]
+        write_pending_documents(store, [
+            PendingDocument(chunk) for m in messages for chunk in ai_service.message_chunks(m)
+        ])
+        messages[2].delete()
+
+        settings.RAG_SCORE_THRESHOLD = -1.0
+        with patch.object(ai_service.resources, '_vector_store', store), \
+                CaptureQueriesContext(connection) as queries:
+            docs = ai_service.AIService.retrieve('fact number 1', user_id=chat.user_id, language='en', k=3)
+
+        assert len(queries) == 1
+        assert sorted(doc.page_content for doc in docs) == ['fact number 0', 'fact number 1']
+
+    def test_full_mode_keeps_text(self, settings, message):
+        """Test that the default mode stores text unchanged"""
+        from chatbot.ai_service import message_chunks
+
+        settings.RAG_PAYLOAD_MODE = 'full'
+        chunk = message_chunks(message)[0]
+        assert payload_text(chunk) == message.content
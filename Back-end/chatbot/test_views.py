@@ -1,6 +1,7 @@
 """
 Unit tests for chatbot views
 """
+import json
 import pytest
 from django.urls import reverse
 from rest_framework import status
@@ -146,13 +147,15 @@ class TestChatViewSet:
         assert response.data['total_messages'] == 3
         assert response.data['chats_by_language'] == {'en': 1, 'ar': 1}
     
+    @patch('chatbot.views.AIService.embed_query', return_value=[0.1, 0.2])
     @patch('chatbot.views.AIService.generate_response')
-    @patch('chatbot.views.AIService.add_document')
-    def test_send_message(self, mock_add_doc, mock_generate, authenticated_client, chat):
+    @patch('chatbot.views.AIService.index_message')
+    def test_send_message(self, mock_index, mock_generate, mock_embed,
+                          authenticated_client, chat):
         """Test sending a message and getting AI response"""
         # Mock AI service response
         mock_generate.return_value = ('AI response', 'groq', 100, 1.5)
-        mock_add_doc.return_value = None
+        mock_index.return_value = None
         
         url = reverse('chat-send-message', kwargs={'pk': chat.id})
         data = {
@@ -172,15 +175,27 @@ class TestChatViewSet:
         
         # Verify AI service was called
         mock_generate.assert_called_once()
-        mock_add_doc.assert_called_once_with('Hello, AI!')
+        assert mock_generate.call_args.kwargs['user_id'] == chat.user_id
+        assert mock_generate.call_args.kwargs['chat_id'] == chat.id
+
+        # Verify both the user message and the reply are indexed
+        user_message = Message.objects.get(role='user')
+        ai_message = Message.objects.get(role='assistant')
+        assert [c.args[0] for c in mock_index.call_args_list] == [user_message, ai_message]
+
+        # Verify the message was embedded once and the vector reused
+        mock_embed.assert_called_once_with('Hello, AI!')
+        assert mock_generate.call_args.kwargs['query_embedding'] == [0.1, 0.2]
+        assert mock_index.call_args_list[0].kwargs['embedding'] == [0.1, 0.2]
     
+    @patch('chatbot.views.AIService.embed_query', return_value=[0.1, 0.2])
     @patch('chatbot.views.AIService.generate_response')
-    @patch('chatbot.views.AIService.add_document')
-    def test_send_message_updates_chat_title(self, mock_add_doc, mock_generate, 
+    @patch('chatbot.views.AIService.index_message')
+    def test_send_message_updates_chat_title(self, mock_index, mock_generate, mock_embed,
                                              authenticated_client, user):
         """Test that first message sets chat title"""
         mock_generate.return_value = ('AI response', 'groq', 100, 1.5)
-        mock_add_doc.return_value = None
+        mock_index.return_value = None
         
         chat = Chat.objects.create(user=user, language='en')  # No title
         
@@ -195,8 +210,10 @@ class TestChatViewSet:
         chat.refresh_from_db()
         assert chat.title == 'This is my first message to the AI'
     
+    @patch('chatbot.views.AIService.embed_query', return_value=[0.1, 0.2])
     @patch('chatbot.views.AIService.generate_response')
-    def test_send_message_ai_service_error(self, mock_generate, authenticated_client, chat):
+    def test_send_message_ai_service_error(self, mock_generate, mock_embed,
+                                           authenticated_client, chat):
         """Test handling AI service errors"""
         from chatbot.ai_service import AIServiceException
         mock_generate.side_effect = AIServiceException('API Error')
@@ -209,6 +226,94 @@ class TestChatViewSet:
         assert 'error' in response.data
 
 
+
+def parse_events(response):
+    """Decode a Server-Sent Events body into (event, data) pairs"""
+    body = b''.join(response.streaming_content).decode()
+    events = []
+    for frame in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in frame.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+@pytest.mark.django_db
+class TestStreamMessage:
+    """Tests for the SSE variant of send_message"""
+
+    @patch('chatbot.views.AIService.embed_query', return_value=[0.1, 0.2])
+    @patch('chatbot.views.AIService.stream_response', return_value=iter(['Hel', 'lo', ' there']))
+    @patch('chatbot.views.AIService.index_message')
+    def test_tokens_streamed_then_message_saved(self, mock_index, mock_stream, mock_embed,
+                                                authenticated_client, chat):
+        """Test that tokens arrive as events and the full reply is saved when the stream ends"""
+        url = reverse('chat-stream-message', kwargs={'pk': chat.id})
+        response = authenticated_client.post(url, {'content': 'Hi', 'language': 'en'},
+                                             HTTP_ACCEPT='text/event-stream')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'text/event-stream'
+        events = parse_events(response)
+        assert [name for name, _ in events] == ['user_message', 'token', 'token', 'token', 'done']
+        assert events[0][1]['content'] == 'Hi'
+        assert ''.join(data['text'] for name, data in events if name == 'token') == 'Hello there'
+
+        ai_message = Message.objects.get(role='assistant')
+        assert ai_message.content == 'Hello there'
+        assert events[-1][1]['ai_message']['id'] == ai_message.id
+        assert mock_stream.call_args.kwargs['query_embedding'] == [0.1, 0.2]
+        assert [c.args[0] for c in mock_index.call_args_list] == [Message.objects.get(role='user'), ai_message]
+
+    @patch('chatbot.views.AIService.embed_query', return_value=[0.1, 0.2])
+    @patch('chatbot.views.AIService.stream_response')
+    def test_ai_error_becomes_error_event(self, mock_stream, mock_embed, authenticated_client, chat):
+        """Test that a failing model ends the stream with an error event and saves no reply"""
+        from chatbot.ai_service import AIServiceException
+        mock_stream.side_effect = AIServiceException('API Error')
+
+        url = reverse('chat-stream-message', kwargs={'pk': chat.id})
+        events = parse_events(authenticated_client.post(url, {'content': 'Hi'}, HTTP_ACCEPT='text/event-stream'))
+
+        assert events[-1] == ('error', {'error': 'AI service error: API Error'})
+        assert not Message.objects.filter(role='assistant').exists()
+
+    @patch('chatbot.views.AIService.embed_query', return_value=[0.1, 0.2])
+    @patch('chatbot.views.AIService.index_message')
+    def test_disconnect_aborts_generation(self, mock_index, mock_embed, authenticated_client, chat):
+        """Test that closing the stream early stops the model and saves the partial reply as aborted"""
+        closed = []
+
+        def stream(**kwargs):
+            try:
+                yield 'Hel'
+                yield 'lo'
+                yield ' never sent'
+            finally:
+                closed.append(True)
+
+        url = reverse('chat-stream-message', kwargs={'pk': chat.id})
+        with patch('chatbot.views.AIService.stream_response', side_effect=stream):
+            response = authenticated_client.post(url, {'content': 'Hi'}, HTTP_ACCEPT='text/event-stream')
+            events = iter(response.streaming_content)
+            for _ in range(3):  # user_message, Hel, lo
+                next(events)
+            response.close()
+
+        assert closed == [True]
+        reply = Message.objects.get(role='assistant')
+        assert (reply.content, reply.status) == ('Hello', Message.STATUS_ABORTED)
+        # Only the user message is queued for the vector store
+        assert [c.args[0] for c in mock_index.call_args_list] == [Message.objects.get(role='user')]
+
+    def test_invalid_body_rendered_as_event(self, authenticated_client, chat):
+        """Test that validation errors are negotiated to an SSE error event"""
+        url = reverse('chat-stream-message', kwargs={'pk': chat.id})
+        response = authenticated_client.post(url, {}, HTTP_ACCEPT='text/event-stream')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.content.startswith(b'event: error\ndata: ')
+
+
 @pytest.mark.django_db
 class TestMessageViewSet:
     """Tests for MessageViewSet"""
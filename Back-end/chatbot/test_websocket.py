@@ -0,0 +1,213 @@
+"""
+Unit tests for the WebSocket chat channel
+"""
+import asyncio
+import json
+import pytest
+from asgiref.sync import async_to_sync
+from rest_framework_simplejwt.tokens import AccessToken
+from unittest.mock import patch
+from chatbot.models import Chat, Message
+from chatbot_backend.asgi import application
+
+
+class Connection:
+    """In-memory client side of an ASGI WebSocket connection"""
+
+    def __init__(self, path='/ws/chat/'):
+        self.incoming = asyncio.Queue()
+        self.outgoing = asyncio.Queue()
+        self.task = asyncio.create_task(application(
+            {'type': 'websocket', 'path': path, 'headers': [], 'query_string': b''},
+            self.incoming.get, self.outgoing.put,
+        ))
+        self.incoming.put_nowait({'type': 'websocket.connect'})
+
+    async def send(self, **frame):
+        await self.incoming.put({'type': 'websocket.receive', 'text': json.dumps(frame)})
+
+    async def receive(self):
+        event = await asyncio.wait_for(self.outgoing.get(), timeout=5)
+        return json.loads(event['text']) if event['type'] == 'websocket.send' else event
+
+    async def receive_until(self, frame_type):
+        frames = []
+        while not frames or frames[-1].get('type') != frame_type:
+            frames.append(await self.receive())
+        return frames
+
+    async def close(self):
+        await self.incoming.put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(self.task, timeout=5)
+
+
+async def slow_stream(*args, **kwargs):
+    yield 'first'
+    await asyncio.sleep(10)
+    yield 'never'
+
+
+async def quick_stream(*args, **kwargs):
+    for text in ['Hel', 'lo']:
+        yield text
+
+
+@pytest.fixture
+def token(user):
+    return str(AccessToken.for_user(user))
+
+
+@pytest.fixture(autouse=True)
+def no_vectors():
+    with patch('chatbot.async_views.AIService.aembed_query', return_value=None), \
+            patch('chatbot.async_views.AIService.aindex_message'):
+        yield
+
+
+@pytest.mark.django_db
+class TestChatSocket:
+    """Tests for the multiplexed chat WebSocket"""
+
+    def test_rejects_bad_token(self):
+        """Test that a connection without a valid auth frame is closed"""
+        async def scenario():
+            connection = Connection()
+            assert (await connection.receive())['type'] == 'websocket.accept'
+            await connection.send(type='auth', token='nope')
+            event = await connection.receive()
+            await asyncio.wait_for(connection.task, timeout=5)
+            return event
+        assert async_to_sync(scenario)() == {'type': 'websocket.close', 'code': 4401}
+
+    def test_unknown_path_closed(self):
+        """Test that other WebSocket paths are refused"""
+        async def scenario():
+            connection = Connection(path='/ws/other/')
+            return await connection.receive()
+        assert async_to_sync(scenario)()['code'] == 4404
+
+    @patch('chatbot.websocket.AIService.astream_response', side_effect=quick_stream)
+    def test_turns_in_two_chats(self, mock_stream, token, user):
+        """Test that one connection streams answers for several chats and saves them"""
+        first = Chat.objects.create(user=user, language='en')
+        second = Chat.objects.create(user=user, language='en')
+
+        async def scenario():
+            connection = Connection()
+            await connection.receive()
+            await connection.send(type='auth', token=token)
+            assert (await connection.receive())['type'] == 'ready'
+            await connection.send(type='message', chat_id=first.id, content='one', request_id='a')
+            await connection.send(type='message', chat_id=second.id, content='two', request_id='b')
+            frames = await connection.receive_until('done')
+            frames += await connection.receive_until('done')
+            await connection.close()
+            return frames
+
+        frames = async_to_sync(scenario)()
+        done = [frame for frame in frames if frame['type'] == 'done']
+        assert {frame['request_id'] for frame in done} == {'a', 'b'}
+        assert sum(frame['type'] == 'token' for frame in frames) == 4
+        assert Message.objects.filter(role='assistant', content='Hello').count() == 2
+
+    @patch('chatbot.websocket.AIService.astream_response', side_effect=slow_stream)
+    def test_cancel_stops_generation(self, mock_stream, token, chat):
+        """Test that a cancel frame stops the answer and keeps the partial reply as aborted"""
+        async def scenario():
+            connection = Connection()
+            await connection.receive()
+            await connection.send(type='auth', token=token)
+            await connection.receive()
+            await connection.send(type='message', chat_id=chat.id, content='long story', request_id='x')
+            frames = await connection.receive_until('token')
+            await connection.send(type='cancel', chat_id=chat.id)
+            frames += await connection.receive_until('cancelled')
+            await connection.close()
+            return frames
+
+        frames = async_to_sync(scenario)()
+        assert frames[-1]['type'] == 'cancelled'
+        assert frames[-1]['request_id'] == 'x'
+        assert frames[-1]['ai_message']['status'] == 'aborted'
+        reply = Message.objects.get(role='assistant')
+        assert (reply.content, reply.status) == ('first', Message.STATUS_ABORTED)
+
+    @patch('chatbot.websocket.AIService.astream_response', side_effect=quick_stream)
+    def test_cancel_while_indexing_keeps_complete_reply(self, mock_stream, token, chat):
+        """Test that a cancel after the last token returns the complete reply, saved once"""
+        indexing = asyncio.Event()
+
+        async def slow_index(message, embedding=None):
+            if message.role == 'assistant':
+                indexing.set()
+                await asyncio.sleep(0.2)
+
+        async def scenario():
+            connection = Connection()
+            await connection.receive()
+            await connection.send(type='auth', token=token)
+            await connection.receive()
+            await connection.send(type='message', chat_id=chat.id, content='hi', request_id='x')
+            await asyncio.wait_for(indexing.wait(), timeout=5)
+            await connection.send(type='cancel', chat_id=chat.id)
+            frames = await connection.receive_until('cancelled')
+            await connection.close()
+            return frames
+
+        with patch('chatbot.async_views.AIService.aindex_message', side_effect=slow_index):
+            frames = async_to_sync(scenario)()
+        assert frames[-1]['ai_message']['status'] == Message.STATUS_COMPLETE
+        reply = Message.objects.get(role='assistant')
+        assert (reply.content, reply.status) == ('Hello', Message.STATUS_COMPLETE)
+
+    @patch('chatbot.websocket.AIService.astream_response', side_effect=[slow_stream(), quick_stream()])
+    def test_asking_again_keeps_history_in_order(self, mock_stream, token, chat):
+        """Test that the superseded answer's partial reply is saved before the new question"""
+        from chatbot.async_views import _abort_turn
+
+        async def slow_abort(*args):
+            await asyncio.sleep(0.2)
+            return await _abort_turn(*args)
+
+        async def scenario():
+            connection = Connection()
+            await connection.receive()
+            await connection.send(type='auth', token=token)
+            await connection.receive()
+            await connection.send(type='message', chat_id=chat.id, content='long story', request_id='x')
+            await connection.receive_until('token')
+            await connection.send(type='message', chat_id=chat.id, content='short one', request_id='y')
+            frames = await connection.receive_until('done')
+            await connection.close()
+            return frames
+
+        with patch('chatbot.websocket._abort_turn', side_effect=slow_abort):
+            frames = async_to_sync(scenario)()
+        assert [frame['type'] for frame in frames][0] == 'cancelled'
+        history = Message.objects.filter(chat=chat).order_by('id')
+        assert [(m.role, m.content, m.status) for m in history] == [
+            ('user', 'long story', Message.STATUS_COMPLETE),
+            ('assistant', 'first', Message.STATUS_ABORTED),
+            ('user', 'short one', Message.STATUS_COMPLETE),
+            ('assistant', 'Hello', Message.STATUS_COMPLETE),
+        ]
+
+    @patch('chatbot.websocket.AIService.astream_response', side_effect=slow_stream)
+    def test_foreign_chat_and_disconnect(self, mock_stream, token, admin_user, chat):
+        """Test that other users' chats are refused and closing cancels answers in flight"""
+        foreign = Chat.objects.create(user=admin_user, language='en')
+
+        async def scenario():
+            connection = Connection()
+            await connection.receive()
+            await connection.send(type='auth', token=token)
+            await connection.receive()
+            await connection.send(type='message', chat_id=foreign.id, content='hi')
+            error = await connection.receive()
+            await connection.send(type='message', chat_id=chat.id, content='long story')
+            await connection.receive_until('token')
+            await connection.close()
+            return error
+
+        assert async_to_sync(scenario)()['error'] == 'Chat not found'
+        assert Message.objects.get(role='assistant').status == Message.STATUS_ABORTED
@@ -0,0 +1,44 @@
+"""
+Text normalization shared by the embedding cache, the retrieval gate and
+the lexical index.
+
+``fold_text`` maps the spelling variants users type interchangeably to one
+form: case, Arabic diacritics and tatweel, alef/yeh/teh marbuta variants
+and Arabic-Indic digits. ``tokenize`` splits folded text into index terms.
+"""
+
+import re
+import unicodedata
+from typing import List
+
+_WHITESPACE = re.compile(r"\s+")
+_ARABIC_MARKS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")  # diacritics, tatweel
+_ARABIC_LETTERS = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ئ": "ي", "ؤ": "و", "ة": "ه",
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+    **{chr(0x06F0 + digit): str(digit) for digit in range(10)},
+})
+_TOKEN = re.compile(r"\w+")
+# Definite article and its common attached prepositions, kept off short words
+_ARABIC_ARTICLE = re.compile(r"^(وال|بال|كال|فال|لل|ال)(?=\w{2,}$)")
+
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalize and collapse whitespace so trivial variants share a key."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def normalize_arabic(text: str) -> str:
+    """Drop diacritics and tatweel and unify alef, yeh, teh marbuta and digit variants."""
+    return _ARABIC_MARKS.sub("", text).translate(_ARABIC_LETTERS)
+
+
+def fold_text(text: str) -> str:
+    """Case- and spelling-insensitive form of ``text`` for matching."""
+    return normalize_arabic(normalize_text(text).casefold())
+
+
+def tokenize(text: str) -> List[str]:
+    """Index terms of ``text``: folded words, Arabic ones without the definite article."""
+    return [_ARABIC_ARTICLE.sub("", token) for token in _TOKEN.findall(fold_text(text))]
@@ -4,7 +4,8 @@ URL configuration for chatbot app
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ChatViewSet, MessageViewSet, UserSummaryViewSet, AIModelViewSet
+from .views import ChatViewSet, MessageViewSet, UserSummaryViewSet, AIModelViewSet, DocumentViewSet
+from . import async_views
 
 # Create router and register viewsets
 router = DefaultRouter()
@@ -12,7 +13,12 @@ router.register(r'chats', ChatViewSet, basename='chat')
 router.register(r'messages', MessageViewSet, basename='message')
 router.register(r'summaries', UserSummaryViewSet, basename='usersummary')
 router.register(r'ai-models', AIModelViewSet, basename='aimodelconfig')
+router.register(r'documents', DocumentViewSet, basename='document')
 
 urlpatterns = [
     path('', include(router.urls)),
+    # ASGI-native variants (see async_views)
+    path('async/chats/<int:pk>/send_message/', async_views.send_message, name='async-chat-send-message'),
+    path('async/chats/<int:pk>/stream_message/', async_views.stream_message, name='async-chat-stream-message'),
+    path('async/summaries/generate/', async_views.generate_summary, name='async-summary-generate'),
 ]
@@ -0,0 +1,497 @@
+"""
+Vector store construction and maintenance helpers for the RAG pipeline.
+"""
+
+import json
+import uuid
+import logging
+from dataclasses import dataclass, fields, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+# ======================================================
+# 🔹 Collection configuration
+# ======================================================
+# HNSW parameters Chroma fixes when the collection is built.
+HNSW_BUILD_PARAMS = ("space", "max_neighbors", "ef_construction")
+
+
+@dataclass(frozen=True)
+class CollectionConfig:
+    """HNSW index parameters and retrieval defaults of one collection."""
+
+    space: str = "l2"
+    max_neighbors: int = 16
+    ef_construction: int = 100
+    ef_search: int = 100
+    top_k: int = 4
+    score_threshold: float = 0.0
+
+    def hnsw(self) -> Dict:
+        """Chroma ``configuration["hnsw"]`` for a new collection."""
+        return {
+            "space": self.space,
+            "max_neighbors": self.max_neighbors,
+            "ef_construction": self.ef_construction,
+            "ef_search": self.ef_search,
+        }
+
+
+def collection_config(name: Optional[str] = None) -> CollectionConfig:
+    """
+    Configuration of collection ``name`` (default: ``CHROMA_COLLECTION_NAME``).
+
+    Defaults come from the ``CHROMA_HNSW_*``, ``RAG_SIMILARITY_TOP_K`` and
+    ``RAG_SCORE_THRESHOLD`` settings; ``RAG_COLLECTION_CONFIG`` overrides
+    any field per collection name.
+    """
+    name = name or settings.CHROMA_COLLECTION_NAME
+    overrides = settings.RAG_COLLECTION_CONFIG.get(name, {})
+    unknown = set(overrides) - {field.name for field in fields(CollectionConfig)}
+    if unknown:
+        raise ValueError(f"Unknown RAG_COLLECTION_CONFIG option(s) for '{name}': {', '.join(sorted(unknown))}")
+    return replace(
+        CollectionConfig(
+            space=settings.CHROMA_HNSW_SPACE,
+            max_neighbors=settings.CHROMA_HNSW_M,
+            ef_construction=settings.CHROMA_HNSW_EF_CONSTRUCTION,
+            ef_search=settings.CHROMA_HNSW_EF_SEARCH,
+            top_k=settings.RAG_SIMILARITY_TOP_K,
+            score_threshold=settings.RAG_SCORE_THRESHOLD,
+        ),
+        **overrides,
+    )
+
+
+def store_config(store) -> CollectionConfig:
+    """The ``CollectionConfig`` a store was built with (settings defaults otherwise)."""
+    config = getattr(store, "config", None)
+    return config if isinstance(config, CollectionConfig) else collection_config()
+
+
+def apply_hnsw_config(collection, config: CollectionConfig) -> None:
+    """
+    Bring an existing collection in line with ``config``.
+
+    ``ef_search`` is changed in place. Build parameters cannot change
+    without rebuilding the index, so a mismatch is only reported.
+    """
+    current = (collection.configuration or {}).get("hnsw") or {}
+    if current.get("ef_search") not in (None, config.ef_search):
+        collection.modify(configuration={"hnsw": {"ef_search": config.ef_search}})
+        logger.info(f"🎚️ {collection.name}: ef_search {current['ef_search']} → {config.ef_search}")
+    stale = [
+        f"{key}={current[key]} (configured {getattr(config, key)})"
+        for key in HNSW_BUILD_PARAMS
+        if current.get(key) not in (None, getattr(config, key))
+    ]
+    if stale:
+        logger.warning(
+            f"⚠️ {collection.name} was built with {', '.join(stale)}; "
+            f"run `manage.py compact_vector_store --rebuild` to apply the new index parameters"
+        )
+
+
+def search_with_relevance(store, embedding: List[float], k: int, filter: Optional[Dict] = None) -> List[Tuple]:
+    """
+    ``(document, relevance)`` pairs for a query vector, best first.
+
+    Relevance is the cosine similarity of query and document on every
+    backend and HNSW space (see ``cosine_relevance``), the scale
+    ``score_threshold`` is expressed in.
+    """
+    pairs = store.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=filter)
+    relevance = store._select_relevance_score_fn()
+    return [(doc, relevance(score)) for doc, score in pairs]
+
+
+# ======================================================
+# 🔹 Chroma
+# ======================================================
+# Chroma distance → cosine similarity, per HNSW space. ``l2`` is the squared
+# distance, 2 - 2·cos for unit vectors; ``ip`` is 1 - q·x, the cosine
+# distance for unit vectors (sentence-transformers models normalize).
+COSINE_FROM_DISTANCE: Dict[str, Callable[[float], float]] = {
+    "cosine": lambda distance: 1.0 - distance,
+    "ip": lambda distance: 1.0 - distance,
+    "l2": lambda distance: 1.0 - distance / 2,
+}
+
+
+def cosine_relevance(space: str) -> Callable[[float], float]:
+    """Map a Chroma distance in ``space`` to cosine similarity, the numpy store's score."""
+    try:
+        return COSINE_FROM_DISTANCE[space]
+    except KeyError:
+        raise ValueError(f"Unknown HNSW space '{space}'. Use one of {', '.join(COSINE_FROM_DISTANCE)}.")
+
+
+class ChromaStore(Chroma):
+    """
+    LangChain Chroma store that can also upsert precomputed vectors.
+
+    Relevance scores are cosine similarities whatever space the index was
+    built with, so one ``score_threshold`` means the same on every backend.
+    """
+
+    def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """Upsert texts with vectors the caller already computed (no re-embedding)."""
+        ids = [doc_id or str(uuid.uuid4()) for doc_id in (ids or [None] * len(texts))]
+        self._collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            documents=texts,
+            metadatas=[meta or None for meta in metadatas] if metadatas else None,
+        )
+        return ids
+
+    def iter_records(self, batch_size: int = 1000, offset: int = 0) -> Iterator[Dict[str, list]]:
+        return iter_collection(self._collection, batch_size, offset)
+
+    def existing_ids(self, ids: List[str]) -> set:
+        """Ids already stored, without fetching documents or vectors."""
+        return set(self._collection.get(ids=ids, include=[])["ids"]) if ids else set()
+
+    def count(self) -> int:
+        return self._collection.count()
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        if self.override_relevance_score_fn:
+            return self.override_relevance_score_fn
+        hnsw = (self._collection.configuration or {}).get("hnsw") or {}
+        return cosine_relevance(hnsw.get("space") or "l2")
+
+
+def build_chroma_client(persist_directory: Optional[str] = None):
+    """Open the on-disk Chroma database (created on first use)."""
+    from chromadb import PersistentClient
+    from chromadb.config import Settings
+
+    path = persist_directory or settings.CHROMA_PERSIST_DIR
+    Path(path).mkdir(parents=True, exist_ok=True)
+    return PersistentClient(path=str(path), settings=Settings(anonymized_telemetry=False))
+
+
+def build_chroma_store(
+    embeddings,
+    collection_name: Optional[str] = None,
+    client=None,
+    config: Optional[CollectionConfig] = None,
+):
+    """
+    Return the LangChain Chroma store backed by the persistent client.
+
+    A new collection is created with the HNSW parameters of ``config``
+    (default: ``collection_config(collection_name)``); an existing one
+    gets its ``ef_search`` updated. The config is kept on ``store.config``.
+    """
+    name = collection_name or settings.CHROMA_COLLECTION_NAME
+    config = config or collection_config(name)
+    store = ChromaStore(
+        client=client or build_chroma_client(),
+        collection_name=name,
+        embedding_function=embeddings,
+        collection_configuration={"hnsw": config.hnsw()},
+    )
+    apply_hnsw_config(store._collection, config)
+    store.config = config
+    return store
+
+
+def build_vector_store(embeddings, store_type: Optional[str] = None, version_key: str = ""):
+    """
+    Return the vector store selected by ``VECTOR_STORE_TYPE``.
+
+    ``chroma`` (default) is the persistent Chroma collection; ``numpy`` is
+    the memory-mapped exact-search store in ``NUMPY_STORE_DIR``. Both
+    expose the LangChain VectorStore API plus ``add_embeddings`` and
+    ``iter_records``. A non-empty ``version_key`` selects the collection of
+    another embedding model version (see ``embedding_versions``). Either
+    store carries its ``CollectionConfig`` as ``store.config``.
+    """
+    store_type = store_type or getattr(settings, 'VECTOR_STORE_TYPE', 'chroma')
+    name = settings.CHROMA_COLLECTION_NAME
+    name = f"{name}-{version_key}" if version_key else name
+    if store_type == 'chroma':
+        return build_chroma_store(embeddings, collection_name=name)
+    if store_type == 'numpy':
+        from .numpy_store import NumpyVectorStore
+        path = settings.NUMPY_STORE_DIR
+        store = NumpyVectorStore(
+            f"{path}-{version_key}" if version_key else path,
+            embeddings,
+            dtype=settings.NUMPY_STORE_DTYPE,
+            rescore=settings.NUMPY_STORE_RESCORE,
+        )
+        # Exact search: only the retrieval defaults apply.
+        store.config = collection_config(name)
+        return store
+    raise ValueError(f"Unknown VECTOR_STORE_TYPE '{store_type}'. Use 'chroma' or 'numpy'.")
+
+
+def copy_vector_store(source, target, batch_size: int = 1000) -> int:
+    """Copy every record with its stored vector from one backend to another."""
+    total = 0
+    for page in source.iter_records(batch_size):
+        target.add_embeddings(
+            texts=page["documents"],
+            embeddings=page["embeddings"],
+            metadatas=page["metadatas"],
+            ids=page["ids"],
+        )
+        total += len(page["ids"])
+    return total
+
+
+# ======================================================
+# 🔹 Wrappers
+# ======================================================
+class WrappedStore(VectorStore):
+    """
+    Base for a store layered over ``primary``: searches, writes and
+    anything not overridden (``compact``, ``path``, ``_collection``...)
+    go to the primary. Subclasses add side effects to writes and deletes.
+    """
+
+    def __init__(self, primary):
+        self.primary = primary
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "primary":
+            raise AttributeError(name)
+        return getattr(self.primary, name)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.primary.embeddings
+
+    def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        return self.primary.add_embeddings(texts, embeddings, metadatas, ids)
+
+    def add_texts(self, texts, metadatas: Optional[List[Dict]] = None, *, ids: Optional[List[str]] = None,
+                  **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        return self.add_embeddings(texts, self.primary.embeddings.embed_documents(texts), metadatas, ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        return self.primary.delete(ids=ids, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any):
+        return self.primary.similarity_search(query, k=k, **kwargs)
+
+    def similarity_search_with_score(self, *args: Any, **kwargs: Any):
+        return self.primary.similarity_search_with_score(*args, **kwargs)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any):
+        return self.primary.similarity_search_by_vector(embedding, k=k, **kwargs)
+
+    def similarity_search_by_vector_with_relevance_scores(self, embedding: List[float], k: int = 4,
+                                                         **kwargs: Any):
+        return self.primary.similarity_search_by_vector_with_relevance_scores(embedding, k=k, **kwargs)
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return self.primary._select_relevance_score_fn()
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs: Any):
+        raise NotImplementedError("Build the underlying stores and wrap them instead")
+
+
+def unwrap(store):
+    """The innermost store under any ``WrappedStore`` layers."""
+    while isinstance(store, WrappedStore):
+        store = store.primary
+    return store
+
+
+# ======================================================
+# 🔹 Payloads
+# ======================================================
+def payload_text(document) -> str:
+    """
+    Text to store with a vector.
+
+    With ``RAG_PAYLOAD_MODE=ids`` message chunks are stored without text:
+    the ``chatbot_message`` row is the single copy, read back by
+    ``hydrate_documents``. Uploaded document chunks always keep their text.
+    """
+    if settings.RAG_PAYLOAD_MODE == "ids" and "message_id" in (document.metadata or {}):
+        return ""
+    return document.page_content
+
+
+def hydrate_texts(texts: List[str], metadatas: List[Optional[Dict]]) -> List[Optional[str]]:
+    """
+    Fill in empty message payloads from the database with one ``in_bulk`` query.
+
+    A chunk's text is ``content[offset:offset + length]``; ``None`` marks a
+    record whose message no longer exists.
+    """
+    wanted = {
+        metadata["message_id"]
+        for text, metadata in zip(texts, metadatas)
+        if not text and metadata and "message_id" in metadata
+    }
+    if not wanted:
+        return list(texts)
+
+    from .models import Message
+    messages = Message.objects.only("content").in_bulk(wanted)
+    hydrated = []
+    for text, metadata in zip(texts, metadatas):
+        if text or not metadata or "message_id" not in metadata:
+            hydrated.append(text)
+            continue
+        message = messages.get(metadata["message_id"])
+        if message is None:
+            hydrated.append(None)
+            continue
+        offset = metadata.get("offset", 0)
+        length = metadata.get("length", len(message.content))
+        hydrated.append(message.content[offset:offset + length])
+    return hydrated
+
+
+def hydrate_documents(documents: List) -> List:
+    """Hydrate retrieved documents in place, dropping those whose message was deleted."""
+    texts = hydrate_texts([doc.page_content for doc in documents], [doc.metadata for doc in documents])
+    kept = []
+    for doc, text in zip(documents, texts):
+        if text is None:
+            continue
+        doc.page_content = text
+        kept.append(doc)
+    return kept
+
+
+# ======================================================
+# 🔹 Partitioning
+# ======================================================
+# ``user_id`` of shared knowledge (documents ingested without an owner); no user has pk 0
+SHARED_USER_ID = 0
+
+
+def partition_filter(
+    user_id: Optional[int] = None,
+    chat_id: Optional[int] = None,
+    language: Optional[str] = None,
+    include_shared: bool = False,
+) -> Optional[Dict]:
+    """
+    Build a Chroma ``where`` clause restricting search to one partition.
+
+    Chroma resolves the metadata filter first and only scores the matching
+    vectors, so search cost follows the size of the partition. With
+    ``include_shared`` the user's partition also covers shared knowledge.
+    """
+    owner = user_id
+    if user_id is not None and include_shared:
+        owner = {"$in": [user_id, SHARED_USER_ID]}
+    clauses = [
+        {key: value}
+        for key, value in (("user_id", owner), ("chat_id", chat_id), ("language", language))
+        if value is not None
+    ]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+# ======================================================
+# 🔹 Snapshots
+# ======================================================
+def iter_collection(collection, batch_size: int = 1000, offset: int = 0) -> Iterator[Dict[str, list]]:
+    """Page through a Chroma collection including stored embeddings."""
+    while True:
+        page = collection.get(
+            limit=batch_size,
+            offset=offset,
+            include=["embeddings", "documents", "metadatas"],
+        )
+        if not page["ids"]:
+            return
+        yield page
+        offset += len(page["ids"])
+
+
+def snapshot_collection(collection, path: str, batch_size: int = 1000) -> int:
+    """
+    Write every record of ``collection`` (vectors included) to ``path``.
+
+    The snapshot is a directory of compressed ``.npz`` parts plus a
+    manifest, so it can be streamed back without re-embedding anything.
+    """
+    target = Path(path)
+    target.mkdir(parents=True, exist_ok=True)
+    total = 0
+    parts = []
+    for index, page in enumerate(iter_collection(collection, batch_size)):
+        name = f"part-{index:05d}.npz"
+        np.savez_compressed(
+            target / name,
+            ids=np.array(page["ids"], dtype=str),
+            embeddings=np.asarray(page["embeddings"], dtype=np.float32),
+            documents=np.array([doc or "" for doc in page["documents"]], dtype=str),
+            metadatas=np.array([json.dumps(meta or {}) for meta in page["metadatas"]], dtype=str),
+        )
+        parts.append(name)
+        total += len(page["ids"])
+
+    hnsw = (collection.configuration or {}).get("hnsw") or {}
+    manifest = {
+        "collection": collection.name,
+        "count": total,
+        "parts": parts,
+        "hnsw": {key: hnsw[key] for key in (*HNSW_BUILD_PARAMS, "ef_search") if key in hnsw},
+    }
+    (target / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    logger.info(f"💾 Snapshot of {collection.name}: {total} records in {path}")
+    return total
+
+
+def snapshot_hnsw(path: str) -> Optional[Dict]:
+    """HNSW configuration recorded in a snapshot manifest (None for older snapshots)."""
+    return json.loads((Path(path) / "manifest.json").read_text()).get("hnsw") or None
+
+
+def restore_collection(collection, path: str) -> int:
+    """Upsert every record of a snapshot written by ``snapshot_collection``."""
+    source = Path(path)
+    manifest = json.loads((source / "manifest.json").read_text())
+    total = 0
+    for name in manifest["parts"]:
+        with np.load(source / name) as part:
+            ids: List[str] = part["ids"].tolist()
+            if not ids:
+                continue
+            metadatas = [json.loads(meta) or None for meta in part["metadatas"].tolist()]
+            collection.upsert(
+                ids=ids,
+                embeddings=part["embeddings"],
+                documents=part["documents"].tolist(),
+                metadatas=metadatas,
+            )
+            total += len(ids)
+    logger.info(f"♻️ Restored {total} records into {collection.name} from {path}")
+    return total
@@ -6,21 +6,30 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.renderers import JSONRenderer
 from django.db.models import Count, Q
 from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
+import os
 import logging
 import json
-from .models import Chat, Message, UserSummary, AIModelConfig
+import tempfile
+import time
+from .models import Chat, Message, UserSummary, AIModelConfig, Document
 from .serializers import (
     ChatSerializer, ChatDetailSerializer, ChatCreateSerializer,
     MessageSerializer, MessageCreateSerializer,
     UserSummarySerializer, AIModelPublicSerializer,
-    ChatStatisticsSerializer
+    ChatStatisticsSerializer, DocumentSerializer, DocumentUploadSerializer
 )
 from .ai_service import AIService, AIServiceException
 from .utils import translate_text  
+from .documents import schedule_document
+from .renderers import EventStreamRenderer, sse_event
 import re
 from django.db import transaction
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +45,7 @@ class ChatViewSet(viewsets.ModelViewSet):
     - PUT/PATCH /api/chats/{id}/ - Update chat
     - DELETE /api/chats/{id}/ - Delete chat
     - POST /api/chats/{id}/send_message/ - Send message and get AI response
+    - POST /api/chats/{id}/stream_message/ - Send message and stream the AI response (SSE)
     - POST /api/chats/{id}/archive/ - Archive chat
     - GET /api/chats/statistics/ - Get user's chat statistics
     """
@@ -71,6 +81,87 @@ class ChatViewSet(viewsets.ModelViewSet):
         
         return Response(output_serializer.data, status=status.HTTP_201_CREATED)
     
+    def _start_turn(self, chat, content, language):
+        """Save the user message; return it with the model's history and the query embedding."""
+        user_message = Message.objects.create(
+            chat=chat,
+            role='user',
+            content=content,
+            language=language
+        )
+
+        # ------------------------------
+        # 1️⃣ Get last 10 messages for context
+        # ------------------------------
+        history = (Message.objects.filter(chat=chat, status=Message.STATUS_COMPLETE)
+                   .order_by('-created_at')[:10])
+        messages_for_ai = [
+            {"role": msg.role, "content": msg.content}
+            for msg in reversed(history)
+        ]
+
+        # ------------------------------
+        # 4️⃣ Embed the message once (reused for search and upsert);
+        #    lexical-first retrieval embeds only when BM25 finds nothing,
+        #    otherwise the ingestion queue embeds it off the request path
+        # ------------------------------
+        query_embedding = None
+        if settings.RAG_RETRIEVAL_MODE != 'lexical_first':
+            query_embedding = AIService.embed_query(content)
+        return user_message, messages_for_ai, query_embedding
+
+    def _finish_turn(self, chat, user_message, query_embedding, response_text,
+                     ai_model, language, tokens_used, response_time):
+        """Index the user message, save and index the reply, and title a new chat."""
+        # ------------------------------
+        # 2️⃣ Add message to Chroma for semantic memory
+        # ------------------------------
+        AIService.index_message(user_message, embedding=query_embedding)
+
+        # ------------------------------
+        # 6️⃣ Save AI response
+        # ------------------------------
+        ai_message = Message.objects.create(
+            chat=chat,
+            role='assistant',
+            content=response_text,
+            ai_model=ai_model,
+            language=language,
+            tokens_used=tokens_used,
+            response_time=response_time
+        )
+        AIService.index_message(ai_message)
+
+        # ------------------------------
+        # 7️⃣ Update chat title if it's the first message
+        # ------------------------------
+        if not chat.title:
+            content = user_message.content
+            chat.title = content[:50] + ('...' if len(content) > 50 else '')
+            chat.save()
+        return ai_message
+
+    def _abort_turn(self, chat, user_message, query_embedding, partial_text,
+                    ai_model, language, response_time):
+        """
+        Record the reply of a turn whose client went away as ``aborted``
+        with the text generated so far. The partial reply is not indexed;
+        the user message is, with the vector it already has.
+        """
+        AIService.index_message(user_message, embedding=query_embedding)
+        ai_message = Message.objects.create(
+            chat=chat,
+            role='assistant',
+            content=partial_text,
+            ai_model=ai_model,
+            language=language,
+            tokens_used=len(partial_text.split()),
+            response_time=response_time,
+            status=Message.STATUS_ABORTED,
+        )
+        logger.info(f"🛑 Client left chat {chat.id}; saved {len(partial_text)} characters as aborted")
+        return ai_message
+
     @action(detail=True, methods=['post'])
     def send_message(self, request, pk=None):
         """
@@ -94,22 +185,7 @@ class ChatViewSet(viewsets.ModelViewSet):
         preferred_model = serializer.validated_data.get('ai_model')
         
         try:
-            # Save user message
-            user_message = Message.objects.create(
-                chat=chat,
-                role='user',
-                content=content,
-                language=language
-            )
-
-            # ------------------------------
-            # 1️⃣ Get last 10 messages for context
-            # ------------------------------
-            history = Message.objects.filter(chat=chat).order_by('-created_at')[:10]
-            messages_for_ai = [
-                {"role": msg.role, "content": msg.content}
-                for msg in reversed(history)
-            ]
+            user_message, messages_for_ai, query_embedding = self._start_turn(chat, content, language)
 
             # ------------------------------
             # 5️⃣ Generate AI response
@@ -117,35 +193,17 @@ class ChatViewSet(viewsets.ModelViewSet):
             response_text, model_used, tokens_used, response_time = AIService.generate_response(
                 messages=messages_for_ai,
                 language=language,
-                preferred_model="llama-3.3-70b-versatile"
+                preferred_model="llama-3.3-70b-versatile",
+                user_id=request.user.id,
+                chat_id=chat.id,
+                query_embedding=query_embedding,
             )
 
-            # ------------------------------
-            # 2️⃣ Add message to Chroma for semantic memory
-            # ------------------------------
-            AIService.add_document(content)
-            # ------------------------------
-      
-            # ------------------------------
-            # 6️⃣ Save AI response
-            # ------------------------------
-            ai_message = Message.objects.create(
-                chat=chat,
-                role='assistant',
-                content=response_text,
-                ai_model=preferred_model,
-                language=language,
-                tokens_used=tokens_used,
-                response_time=response_time
+            ai_message = self._finish_turn(
+                chat, user_message, query_embedding, response_text,
+                preferred_model, language, tokens_used, response_time,
             )
 
-            # ------------------------------
-            # 7️⃣ Update chat title if it's the first message
-            # ------------------------------
-            if not chat.title:
-                chat.title = content[:50] + ('...' if len(content) > 50 else '')
-                chat.save()
-
             # ------------------------------
             # 8️⃣ Return both messages
             # ------------------------------
@@ -167,6 +225,85 @@ class ChatViewSet(viewsets.ModelViewSet):
                 {'error': 'An unexpected error occurred'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    @action(detail=True, methods=['post'], renderer_classes=[EventStreamRenderer, JSONRenderer])
+    def stream_message(self, request, pk=None):
+        """
+        Send a message and stream the AI response as Server-Sent Events
+
+        POST /api/chats/{id}/stream_message/
+        Body: same as send_message
+        Events:
+        - user_message: the saved user message
+        - token: {"text": "..."} for each piece of the answer
+        - done: {"ai_message": {...}, "model_used": "...", "first_token_time": s}
+        - error: {"error": "..."}
+        The assistant message is saved when the stream ends.
+        """
+        chat = self.get_object()
+        serializer = MessageCreateSerializer(data=request.data)
+
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        content = serializer.validated_data['content']
+        language = serializer.validated_data.get('language', chat.language)
+        preferred_model = serializer.validated_data.get('ai_model')
+        model_used = "llama-3.3-70b-versatile"
+
+        def events():
+            user_message = stream = ai_message = None
+            parts = []
+            start = time.time()
+            try:
+                user_message, messages_for_ai, query_embedding = self._start_turn(chat, content, language)
+                yield sse_event('user_message', MessageSerializer(user_message).data)
+
+                start = time.time()
+                first_token_time = None
+                stream = AIService.stream_response(
+                    messages=messages_for_ai,
+                    language=language,
+                    preferred_model=model_used,
+                    user_id=request.user.id,
+                    chat_id=chat.id,
+                    query_embedding=query_embedding,
+                )
+                for text in stream:
+                    if first_token_time is None:
+                        first_token_time = round(time.time() - start, 2)
+                    parts.append(text)
+                    yield sse_event('token', {'text': text})
+
+                response_text = ''.join(parts)
+                ai_message = self._finish_turn(
+                    chat, user_message, query_embedding, response_text,
+                    preferred_model, language, len(response_text.split()), round(time.time() - start, 2),
+                )
+                yield sse_event('done', {
+                    'ai_message': MessageSerializer(ai_message).data,
+                    'model_used': model_used,
+                    'first_token_time': first_token_time,
+                })
+            except GeneratorExit:
+                # The server closes the stream when the client disconnects:
+                # stop the model and keep what was generated
+                if stream is not None:
+                    stream.close()
+                if stream is not None and ai_message is None:
+                    self._abort_turn(chat, user_message, query_embedding, ''.join(parts),
+                                     preferred_model, language, round(time.time() - start, 2))
+                raise
+            except AIServiceException as e:
+                logger.error(f"AI service error: {str(e)}")
+                yield sse_event('error', {'error': f'AI service error: {str(e)}'})
+            except Exception as e:
+                logger.error(f"Unexpected error: {str(e)}")
+                yield sse_event('error', {'error': 'An unexpected error occurred'})
+
+        response = StreamingHttpResponse(events(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # keep nginx from buffering the stream
+        return response
             
     @action(detail=True, methods=['post'])
     def archive(self, request, pk=None):
@@ -387,3 +524,56 @@ class AIModelViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         """Return active AI models"""
         return AIModelConfig.objects.filter(is_active=True)
+
+
+class DocumentViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet for knowledge documents ingested into RAG
+    
+    Endpoints:
+    - GET /api/documents/ - List user's documents with ingestion progress
+    - GET /api/documents/{id}/ - Get document status
+    - POST /api/documents/upload/ - Upload a .pdf, .docx or .txt document
+    """
+    
+    permission_classes = [IsAuthenticated]
+    serializer_class = DocumentSerializer
+    
+    def get_queryset(self):
+        """Return documents uploaded by the current user"""
+        return Document.objects.filter(user=self.request.user)
+    
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser, FormParser])
+    def upload(self, request):
+        """
+        Upload a document; it is parsed, chunked and embedded in the background.
+        
+        POST /api/documents/upload/  (multipart)
+        Body: {"file": <file>, "language": "en" or "ar"}  # language optional
+        """
+        serializer = DocumentUploadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        upload = serializer.validated_data['file']
+        language = serializer.validated_data.get(
+            'language', getattr(request.user, 'language_preference', 'en')
+        )
+        file_type = os.path.splitext(upload.name)[1].lower()
+        
+        # Stream the upload to disk in chunks; the parser workers read from this file
+        with tempfile.NamedTemporaryFile(suffix=file_type, delete=False) as target:
+            for chunk in upload.chunks():
+                target.write(chunk)
+        
+        document = Document.objects.create(
+            user=request.user,
+            name=upload.name[:255],
+            file_type=file_type,
+            size=upload.size,
+            language=language,
+        )
+        schedule_document(document, target.name)
+        document.refresh_from_db()
+        
+        return Response(DocumentSerializer(document).data, status=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,248 @@
+"""
+WebSocket chat channel (raw ASGI, routed in ``chatbot_backend/asgi.py``)
+
+One connection authenticates once and then carries turns of any number of
+the user's chats, each streamed as it is generated. Frames are JSON
+objects with a ``type``.
+
+Client → server:
+- ``{"type": "auth", "token": "<JWT access token>"}`` (first frame)
+- ``{"type": "message", "chat_id": 1, "content": "...", "language": "en", "request_id": "..."}``
+  Asking again in a chat that is still answering cancels the old answer; its
+  ``cancelled`` frame and partial reply come before the new question.
+- ``{"type": "cancel", "chat_id": 1}``: stop the chat's answer in flight
+- ``{"type": "ping"}``
+
+Server → client (every turn frame carries ``chat_id`` and ``request_id``):
+- ``ready`` after authentication, ``pong``
+- ``user_message`` / ``token`` / ``done``: as the SSE events of ``stream_message``
+- ``cancelled``: the answer was stopped; ``ai_message`` is the partial reply,
+  saved with status ``aborted`` and not indexed (or the complete reply when
+  the cancel arrived after its last token)
+- ``error``: ``{"error": "..."}``; without ``chat_id`` it concerns the connection
+
+Cancelling a turn cancels its task, which closes the upstream Groq stream,
+so no further tokens are generated or billed. Closing the socket cancels
+every turn in flight.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from typing import Dict, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .ai_service import AIService, AIServiceException
+from .async_views import CHAT_MODEL_NAME, _abort_turn, _finish_turn, _start_turn
+from .models import Chat
+from .serializers import MessageCreateSerializer, MessageSerializer
+
+logger = logging.getLogger(__name__)
+
+# Close codes (4000-4999 are free for applications)
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_AUTH_TIMEOUT = 4408
+
+
+def _authenticate(raw_token: str):
+    """User of a JWT access token; raises ``AuthenticationFailed``."""
+    auth = JWTAuthentication()
+    return auth.get_user(auth.get_validated_token(raw_token))
+
+
+class ChatSocket:
+    """State of one WebSocket connection."""
+
+    def __init__(self, send):
+        self._send = send
+        self._send_lock = asyncio.Lock()
+        self.user = None
+        # chat id → task generating its answer
+        self.turns: Dict[int, asyncio.Task] = {}
+
+    async def send(self, frame_type: str, **data) -> None:
+        # Turns stream concurrently; frames must not interleave
+        async with self._send_lock:
+            await self._send({"type": "websocket.send", "text": json.dumps({"type": frame_type, **data},
+                                                                            ensure_ascii=False, default=str)})
+
+    # ------------------------------------------------------------------
+    # Frames
+    # ------------------------------------------------------------------
+    async def authenticate(self, frame: Dict) -> bool:
+        if frame.get("type") != "auth" or not frame.get("token"):
+            return False
+        try:
+            self.user = await sync_to_async(_authenticate)(frame["token"])
+        except AuthenticationFailed:
+            return False
+        await self.send("ready", user_id=self.user.id)
+        return True
+
+    async def handle(self, frame: Dict) -> None:
+        frame_type = frame.get("type")
+        if frame_type == "message":
+            await self.start_turn(frame)
+        elif frame_type == "cancel":
+            self.cancel(frame.get("chat_id"))
+        elif frame_type == "ping":
+            await self.send("pong")
+        else:
+            await self.send("error", error=f"Unknown frame type '{frame_type}'")
+
+    async def start_turn(self, frame: Dict) -> None:
+        chat_id, request_id = frame.get("chat_id"), frame.get("request_id")
+        try:
+            chat = await Chat.objects.aget(pk=chat_id, user=self.user)
+        except (Chat.DoesNotExist, ValueError, TypeError):
+            await self.send("error", chat_id=chat_id, request_id=request_id, error="Chat not found")
+            return
+        serializer = MessageCreateSerializer(data=frame)
+        if not serializer.is_valid():
+            await self.send("error", chat_id=chat_id, request_id=request_id, error=serializer.errors)
+            return
+
+        # A new question in the same chat supersedes the unanswered one, whose
+        # partial reply is saved before the new question
+        superseded = self.turns.get(chat.id)
+        if self.cancel(chat.id):
+            with contextlib.suppress(asyncio.CancelledError):
+                await superseded
+        others = [task for task in self.turns.values() if not task.done()]
+        if len(others) >= settings.CHAT_WS_MAX_TURNS:
+            await self.send("error", chat_id=chat.id, request_id=request_id,
+                            error=f"At most {settings.CHAT_WS_MAX_TURNS} answers can be in flight per connection")
+            return
+        data = serializer.validated_data
+        task = asyncio.create_task(self.run_turn(
+            chat, data["content"], data.get("language", chat.language), data.get("ai_model"), request_id,
+        ))
+        self.turns[chat.id] = task
+        task.add_done_callback(lambda done: self._forget(chat.id, done))
+
+    def _forget(self, chat_id: int, task: asyncio.Task) -> None:
+        if self.turns.get(chat_id) is task:
+            del self.turns[chat_id]
+
+    def cancel(self, chat_id: Optional[int]) -> bool:
+        task = self.turns.pop(chat_id, None)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    # ------------------------------------------------------------------
+    # Turns
+    # ------------------------------------------------------------------
+    async def run_turn(self, chat, content, language, preferred_model, request_id) -> None:
+        """Stream one answer into the socket (``stream_message`` over WebSocket)."""
+        ids = {"chat_id": chat.id, "request_id": request_id}
+        user_message = finish = None
+        parts = []
+        start = time.time()
+        try:
+            user_message, messages_for_ai, query_embedding = await _start_turn(chat, content, language)
+            await self.send("user_message", **ids, message=MessageSerializer(user_message).data)
+
+            start = time.time()
+            first_token_time = None
+            async for text in AIService.astream_response(
+                messages=messages_for_ai,
+                language=language,
+                preferred_model=CHAT_MODEL_NAME,
+                user_id=self.user.id,
+                chat_id=chat.id,
+                query_embedding=query_embedding,
+            ):
+                if first_token_time is None:
+                    first_token_time = round(time.time() - start, 2)
+                parts.append(text)
+                await self.send("token", **ids, text=text)
+
+            response_text = "".join(parts)
+            finish = asyncio.ensure_future(_finish_turn(
+                chat, user_message, query_embedding, response_text,
+                preferred_model, language, len(response_text.split()), round(time.time() - start, 2),
+            ))
+            ai_message = await asyncio.shield(finish)
+            await self.send("done", **ids, ai_message=MessageSerializer(ai_message).data,
+                            model_used=CHAT_MODEL_NAME, first_token_time=first_token_time)
+        except asyncio.CancelledError:
+            logger.info(f"🛑 Cancelled answer in chat {chat.id}")
+            reply = None
+            if finish is not None:
+                reply = await finish
+            elif user_message is not None:
+                reply = await _abort_turn(chat, user_message, query_embedding, "".join(parts),
+                                          preferred_model, language, round(time.time() - start, 2))
+            try:
+                await self.send("cancelled", **ids,
+                                ai_message=MessageSerializer(reply).data if reply else None)
+            except Exception:
+                pass  # the socket is already gone
+            raise
+        except AIServiceException as e:
+            logger.error(f"AI service error: {str(e)}")
+            await self.send("error", **ids, error=f"AI service error: {str(e)}")
+        except Exception as e:
+            logger.error(f"Unexpected error: {str(e)}")
+            await self.send("error", **ids, error="An unexpected error occurred")
+
+    async def close(self) -> None:
+        tasks = [task for task in self.turns.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.turns.clear()
+
+
+async def chat_socket(scope, receive, send) -> None:
+    """ASGI application of the chat WebSocket."""
+    event = await receive()
+    if event["type"] != "websocket.connect":
+        return
+    await send({"type": "websocket.accept"})
+    await sync_to_async(close_old_connections)()
+    socket = ChatSocket(send)
+    try:
+        try:
+            event = await asyncio.wait_for(receive(), timeout=settings.CHAT_WS_AUTH_TIMEOUT)
+        except asyncio.TimeoutError:
+            await send({"type": "websocket.close", "code": CLOSE_AUTH_TIMEOUT})
+            return
+        if event["type"] != "websocket.receive":
+            return
+        frame = _frame(event)
+        if frame is None or not await socket.authenticate(frame):
+            await send({"type": "websocket.close", "code": CLOSE_UNAUTHORIZED})
+            return
+
+        while True:
+            event = await receive()
+            if event["type"] == "websocket.disconnect":
+                break
+            if event["type"] != "websocket.receive":
+                continue
+            frame = _frame(event)
+            if frame is None:
+                await socket.send("error", error="Frames must be JSON objects")
+                continue
+            await socket.handle(frame)
+    finally:
+        await socket.close()
+        await sync_to_async(close_old_connections)()
+
+
+def _frame(event) -> Optional[Dict]:
+    try:
+        frame = json.loads(event.get("text") or event.get("bytes") or b"")
+    except ValueError:
+        return None
+    return frame if isinstance(frame, dict) else None
@@ -2,6 +2,8 @@
 ASGI config for chatbot_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django; WebSocket connections to ``/ws/chat/`` go to the chat
+channel in ``chatbot.websocket``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -11,6 +13,29 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from chatbot.background import mark_server_process
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chatbot_backend.settings')
 
-application = get_asgi_application()
+# Warmup and background jobs start only in serving processes
+mark_server_process()
+
+django_application = get_asgi_application()
+
+# Imported after setup: the chat channel uses the ORM
+from chatbot.websocket import chat_socket  # noqa: E402
+
+WEBSOCKET_ROUTES = {
+    '/ws/chat/': chat_socket,
+}
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        route = WEBSOCKET_ROUTES.get(scope['path'])
+        if route is None:
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        await route(scope, receive, send)
+        return
+    await django_application(scope, receive, send)
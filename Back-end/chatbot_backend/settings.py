@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 from decouple import config, Csv
+import json
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.BASE_DIR = Path(__file__).resolve().parent.parent
@@ -223,6 +224,16 @@ RATELIMIT_USE_CACHE = config('RATELIMIT_USE_CACHE', default='default')
 GROQ_API_KEY = config('GROQ_API_KEY', default='')
 GROQ_MODEL = config('GROQ_MODEL', default='llama-3.3-70b-versatile')
 GROQ_TEMPERATURE = config('GROQ_TEMPERATURE', default=0.7, cast=float)
+# Shared keep-alive HTTP pool of the ChatGroq client registry (chatbot/llm_clients.py)
+GROQ_TIMEOUT = config('GROQ_TIMEOUT', default=60, cast=float)  # seconds per API call
+GROQ_MAX_CONNECTIONS = config('GROQ_MAX_CONNECTIONS', default=20, cast=int)
+GROQ_KEEPALIVE_SECONDS = config('GROQ_KEEPALIVE_SECONDS', default=120, cast=float)  # idle time before a connection closes
+LLM_CONFIG_CHECK_SECONDS = config('LLM_CONFIG_CHECK_SECONDS', default=30, cast=float)  # how fast workers notice AIModelConfig edits
+LLM_WARMUP_ON_BOOT = config('LLM_WARMUP_ON_BOOT', default=False, cast=bool)  # build clients and pre-connect at startup
+
+# WebSocket chat channel (ws://<host>/ws/chat/, chatbot/websocket.py)
+CHAT_WS_AUTH_TIMEOUT = config('CHAT_WS_AUTH_TIMEOUT', default=10, cast=float)  # seconds to send the auth frame
+CHAT_WS_MAX_TURNS = config('CHAT_WS_MAX_TURNS', default=4, cast=int)  # answers in flight per connection
 
 # LangChain provider settings
 LANGCHAIN_DEFAULT_PROVIDER = config('LANGCHAIN_DEFAULT_PROVIDER', default='groq')
@@ -230,11 +241,90 @@ LANGCHAIN_DEFAULT_PROVIDER = config('LANGCHAIN_DEFAULT_PROVIDER', default='groq'
 # Document Processing settings
 SUPPORTED_DOCUMENT_TYPES = ['.pdf', '.docx', '.txt']
 MAX_DOCUMENT_SIZE = config('MAX_DOCUMENT_SIZE', default=10485760, cast=int)  # 10MB in bytes
+CHUNK_SIZE = config('CHUNK_SIZE', default=1000, cast=int)  # characters per document chunk
+CHUNK_OVERLAP = config('CHUNK_OVERLAP', default=200, cast=int)
+DOCUMENT_EMBED_BATCH_SIZE = config('DOCUMENT_EMBED_BATCH_SIZE', default=64, cast=int)
+DOCUMENT_PARSE_WORKERS = config('DOCUMENT_PARSE_WORKERS', default=2, cast=int)  # 1 = parse in-process
 
 # RAG (Retrieval-Augmented Generation) settings
 RAG_ENABLED = config('RAG_ENABLED', default=True, cast=bool)
 RAG_SIMILARITY_TOP_K = config('RAG_SIMILARITY_TOP_K', default=4, cast=int)
-RAG_SCORE_THRESHOLD = config('RAG_SCORE_THRESHOLD', default=0.7, cast=float)
+RAG_SCORE_THRESHOLD = config('RAG_SCORE_THRESHOLD', default=0.7, cast=float)  # cosine similarity, on every backend
+# Retrieval gate: skip the vector search for small talk, follow-ups and short turns
+RAG_GATE_ENABLED = config('RAG_GATE_ENABLED', default=True, cast=bool)
+RAG_GATE_MIN_WORDS = config('RAG_GATE_MIN_WORDS', default=3, cast=int)
+RAG_GATE_MODEL_PATH = config('RAG_GATE_MODEL_PATH', default=str(BASE_DIR / 'retrieval_gate.npz'))  # train_retrieval_gate
+RAG_GATE_MIN_PROBABILITY = config('RAG_GATE_MIN_PROBABILITY', default=0.2, cast=float)
+# 'dense' (vectors only), 'lexical_first' (BM25, vectors when it finds no strong match) or 'hybrid' (both, fused)
+RAG_RETRIEVAL_MODE = config('RAG_RETRIEVAL_MODE', default='dense')
+RAG_LEXICAL_INDEX_PATH = config('RAG_LEXICAL_INDEX_PATH', default=str(BASE_DIR / 'lexical_index.sqlite3'))
+RAG_LEXICAL_MIN_SCORE = config('RAG_LEXICAL_MIN_SCORE', default=0.6, cast=float)  # share of a full BM25 match
+# Build embeddings, vector store and chat model at boot instead of on first use
+RAG_WARMUP_ON_BOOT = config('RAG_WARMUP_ON_BOOT', default=False, cast=bool)
+
+# Chroma vector store (persisted on disk, reopened on boot)
+CHROMA_PERSIST_DIR = config('CHROMA_PERSIST_DIR', default=str(BASE_DIR / 'chroma_db'))
+CHROMA_COLLECTION_NAME = config('CHROMA_COLLECTION_NAME', default='ai_memory')
+# HNSW index of new collections (space, M and ef_construction are fixed once built; ef_search applies on open)
+CHROMA_HNSW_SPACE = config('CHROMA_HNSW_SPACE', default='l2')  # l2, cosine or ip
+CHROMA_HNSW_M = config('CHROMA_HNSW_M', default=16, cast=int)
+CHROMA_HNSW_EF_CONSTRUCTION = config('CHROMA_HNSW_EF_CONSTRUCTION', default=100, cast=int)
+CHROMA_HNSW_EF_SEARCH = config('CHROMA_HNSW_EF_SEARCH', default=100, cast=int)
+# Per-collection overrides as JSON, e.g. {"ai_memory": {"ef_search": 64, "top_k": 6, "score_threshold": 0.5}}
+RAG_COLLECTION_CONFIG = config('RAG_COLLECTION_CONFIG', default='{}', cast=json.loads)
+
+# Vector store backend: 'chroma' or 'numpy' (memory-mapped exact search for single-node deployments)
+VECTOR_STORE_TYPE = config('VECTOR_STORE_TYPE', default='chroma')
+NUMPY_STORE_DIR = config('NUMPY_STORE_DIR', default=str(BASE_DIR / 'numpy_store'))
+NUMPY_STORE_DTYPE = config('NUMPY_STORE_DTYPE', default='float32')  # float32, float16 or int8 (per-vector scale)
+# Keep float32 vectors on disk and re-score the top candidates exactly (float16/int8/PCA stores only)
+NUMPY_STORE_RESCORE = config('NUMPY_STORE_RESCORE', default=True, cast=bool)
+# 'full' stores message text with each vector; 'ids' stores only ids/metadata and reads text from the DB
+RAG_PAYLOAD_MODE = config('RAG_PAYLOAD_MODE', default='full')
+
+# Vector store maintenance (`manage.py compact_vector_store`); 0 disables a rule
+RAG_DEDUP_ENABLED = config('RAG_DEDUP_ENABLED', default=True, cast=bool)
+RAG_DEDUP_NEAR_THRESHOLD = config('RAG_DEDUP_NEAR_THRESHOLD', default=0.98, cast=float)  # cosine similarity
+RAG_TTL_DAYS = config('RAG_TTL_DAYS', default=0, cast=float)
+RAG_MAX_DOCUMENTS_PER_USER = config('RAG_MAX_DOCUMENTS_PER_USER', default=0, cast=int)
+RAG_MAINTENANCE_REBUILD = config('RAG_MAINTENANCE_REBUILD', default=False, cast=bool)
+RAG_MAINTENANCE_INTERVAL_HOURS = config('RAG_MAINTENANCE_INTERVAL_HOURS', default=0, cast=float)  # 0 = no background job
+
+# Message ↔ vector store reconciler (`manage.py reconcile_vector_store`)
+RAG_RECONCILE_STATE_PATH = config('RAG_RECONCILE_STATE_PATH', default=str(BASE_DIR / 'reconcile_state.json'))
+RAG_RECONCILE_BATCH_SIZE = config('RAG_RECONCILE_BATCH_SIZE', default=200, cast=int)
+RAG_RECONCILE_GRACE_SECONDS = config('RAG_RECONCILE_GRACE_SECONDS', default=60, cast=float)  # skip messages still being ingested
+RAG_RECONCILE_INTERVAL_MINUTES = config('RAG_RECONCILE_INTERVAL_MINUTES', default=0, cast=float)  # 0 = no background job
+
+# Vector store ingestion: 'async' batches writes off the request path, 'sync' writes immediately
+RAG_INGEST_MODE = config('RAG_INGEST_MODE', default='async')
+RAG_INGEST_BATCH_SIZE = config('RAG_INGEST_BATCH_SIZE', default=32, cast=int)
+RAG_INGEST_MAX_AGE_MS = config('RAG_INGEST_MAX_AGE_MS', default=500, cast=float)
+RAG_INGEST_MAX_PENDING = config('RAG_INGEST_MAX_PENDING', default=1000, cast=int)
+RAG_INGEST_PUT_TIMEOUT = config('RAG_INGEST_PUT_TIMEOUT', default=1.0, cast=float)  # seconds before writing inline
+
+# Shared embedding worker (`manage.py run_embedding_worker`); empty = load the model in-process
+EMBEDDING_SERVICE_SOCKET = config('EMBEDDING_SERVICE_SOCKET', default='')
+EMBEDDING_BATCH_MAX_SIZE = config('EMBEDDING_BATCH_MAX_SIZE', default=32, cast=int)
+EMBEDDING_BATCH_MAX_WAIT_MS = config('EMBEDDING_BATCH_MAX_WAIT_MS', default=5.0, cast=float)
+
+# Embedding model; changing it starts a migration to a new versioned collection (see embedding_versions.py)
+EMBEDDING_MODEL_NAME = config('EMBEDDING_MODEL_NAME', default='sentence-transformers/all-mpnet-base-v2')
+EMBEDDING_VERSION_CHECK_SECONDS = config('EMBEDDING_VERSION_CHECK_SECONDS', default=30, cast=float)  # how fast workers notice a cutover
+RAG_BACKFILL_RATE = config('RAG_BACKFILL_RATE', default=50, cast=float)  # documents re-embedded per second (0 = unthrottled)
+RAG_BACKFILL_BATCH_SIZE = config('RAG_BACKFILL_BATCH_SIZE', default=64, cast=int)
+RAG_BACKFILL_INTERVAL_SECONDS = config('RAG_BACKFILL_INTERVAL_SECONDS', default=0, cast=float)  # 0 = no background job
+
+# Embedding inference backend: torch (fp32), onnx (fp32) or onnx-int8 (dynamic quantization)
+EMBEDDING_BACKEND = config('EMBEDDING_BACKEND', default='torch')
+EMBEDDING_ONNX_CACHE_DIR = config('EMBEDDING_ONNX_CACHE_DIR', default=str(BASE_DIR / 'onnx_models'))
+EMBEDDING_ONNX_QUANTIZATION = config('EMBEDDING_ONNX_QUANTIZATION', default='avx2')  # arm64, avx2, avx512, avx512_vnni
+
+# Content-addressed embedding cache (in-process LRU in front of a size-bounded SQLite file)
+EMBEDDING_CACHE_ENABLED = config('EMBEDDING_CACHE_ENABLED', default=True, cast=bool)
+EMBEDDING_CACHE_PATH = config('EMBEDDING_CACHE_PATH', default=str(BASE_DIR / 'embedding_cache.sqlite3'))
+EMBEDDING_CACHE_MAX_BYTES = config('EMBEDDING_CACHE_MAX_BYTES', default=268435456, cast=int)  # 256MB
+EMBEDDING_CACHE_LRU_SIZE = config('EMBEDDING_CACHE_LRU_SIZE', default=4096, cast=int)
 
 # Logging Configuration
 LOGGING = {
@@ -11,6 +11,11 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from chatbot.background import mark_server_process
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chatbot_backend.settings')
 
+# Warmup and background jobs start only in serving processes
+mark_server_process()
+
 application = get_wsgi_application()
@@ -1,7 +1,10 @@
 """
 Pytest configuration and fixtures for the entire test suite
 """
+import json
+import threading
 import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from rest_framework.test import APIClient
@@ -18,6 +21,13 @@ def disable_rate_limiting():
     settings.RATELIMIT_ENABLE = True
 
 
+@pytest.fixture(scope='session', autouse=True)
+def synchronous_ingestion():
+    """Write vector store documents immediately instead of batching them"""
+    settings.RAG_INGEST_MODE = 'sync'
+    yield
+
+
 @pytest.fixture
 def api_client():
     """Fixture for DRF API client"""
@@ -107,3 +117,50 @@ def ai_model_config():
         supports_arabic=True,
         priority=1
     )
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    """Groq chat completions endpoint that answers every request with "Hi there" over keep-alive"""
+    protocol_version = 'HTTP/1.1'
+    reply = ['Hi', ' there']
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests += 1
+        if request.get('stream'):
+            chunks = [{'id': 'c', 'object': 'chat.completion.chunk', 'created': 0, 'model': request['model'],
+                       'choices': [{'index': 0, 'delta': {'content': text}, 'finish_reason': None}]}
+                      for text in self.reply]
+            body = ''.join(f'data: {json.dumps(chunk)}\n\n' for chunk in chunks) + 'data: [DONE]\n\n'
+            content_type = 'text/event-stream'
+        else:
+            body = json.dumps({
+                'id': 'c', 'object': 'chat.completion', 'created': 0, 'model': request['model'],
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': ''.join(self.reply)}}],
+                'usage': {'prompt_tokens': 1, 'completion_tokens': 2, 'total_tokens': 3},
+            })
+            content_type = 'application/json'
+        body = body.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_groq(monkeypatch):
+    """Local Groq API stand-in; chat clients built while it runs talk to it"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeGroqHandler)
+    server.requests = 0
+    server.url = f'http://127.0.0.1:{server.server_port}'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv('GROQ_API_BASE', server.url)
+    monkeypatch.setenv('GROQ_API_KEY', 'test-key')
+    yield server
+    server.shutdown()
+    server.server_close()